@@ -1,17 +1,33 @@
 import os
 import json
 import re
+import argparse
 import pandas as pd
 import numpy as np
 from tqdm.auto import tqdm
-from sklearn.cluster import KMeans
 from sklearn.metrics.pairwise import cosine_similarity
-from sentence_transformers import SentenceTransformer
-from neo4j import GraphDatabase
-from groq import Groq
 from dotenv import load_dotenv
+from config.config import EMBEDDING_MODEL_NAME, EMBEDDING_CACHE_DIR, EMBEDDING_BACKEND, EMBEDDING_ONNX_INT8_FILE, LLM_MODELS
+from utils.embedding_store import EmbeddingStore
+from utils.encoder_backends import resolve_backend, store_key, load_encoder
+from utils.LLM_utils import chat_completion, BATCH
+from utils.corpus_store import load_processed, changed_since, paper_keys
+from utils.neo4j_writer import GraphWriter, RecordingDriver
+from utils.cluster_model import ClusterModel
+from utils.df_utils import clean_full_text
 load_dotenv()
 
+parser = argparse.ArgumentParser(description="Cluster papers, summarise clusters with an LLM and push them to Neo4j.")
+parser.add_argument("--since-version", type=int, default=None,
+                    help="Only push papers added or updated after this corpus version (see data/corpus_versions.json)")
+parser.add_argument("--refit", action="store_true", help="Refit the clusters even if the saved centroids have not drifted")
+parser.add_argument("--drift-threshold", type=float, default=0.15,
+                    help="Refit once the mean distance to the saved centroids grows by this fraction (default 0.15)")
+parser.add_argument("--minibatch", action="store_true", help="Refit with MiniBatchKMeans (faster on large corpora)")
+parser.add_argument("--batch-size", type=int, default=500, help="Rows per UNWIND write transaction")
+parser.add_argument("--dry-run", action="store_true", help="Record Neo4j writes in-process instead of connecting")
+args = parser.parse_args()
+
 def extract_json_from_text(text: str):
     """Try to extract the first valid JSON object from a messy string."""
     try:
@@ -33,39 +49,61 @@ DATA_FILE = os.path.join(DATA_DIR, "extracted_all_with_sections.csv")
 NEO4J_URI = os.getenv("NEO4J_URI")
 NEO4J_USER = os.getenv("NEO4J_USERNAME")
 NEO4J_PASS = os.getenv("NEO4J_PASSWORD")
+NEO4J_DATABASE = os.getenv("NEO4J_DATABASE") or None
 
 NUM_CLUSTERS = 10  # adjust based on dataset size
-MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
-# GROQ_MODEL = "llama-3.3-70b-versatile"
-GROQ_MODEL = "qwen/qwen3-32b"
+CLUSTER_MODEL_DIR = os.path.join(DATA_DIR, "cluster_model")
+SUMMARIES_FILE = os.path.join(DATA_DIR, "cluster_summaries.json")
+MODEL_NAME = EMBEDDING_MODEL_NAME
+ENCODER_BACKEND = resolve_backend(EMBEDDING_BACKEND)
+EMBEDDING_KEY = store_key(MODEL_NAME, ENCODER_BACKEND)
+KG_LLM_MODEL = LLM_MODELS["kg"]
 
 
 print("📂 Loading data...")
-df = pd.read_csv(DATA_FILE)
-
-def clean_text(txt):
-    if not isinstance(txt, str):
-        return ""
-    return " ".join(txt.replace("\n", " ").split())
+df = load_processed(DATA_FILE)
 
-df["clean_full_text"] = (
-    df["Title"].fillna("") + ". " +
-    df["abstract"].fillna("") + " " +
-    df["conclusion"].fillna("")
-).apply(clean_text)
+# Same text as the API embeds, so the shared embedding store serves both
+df["clean_full_text"] = clean_full_text(df)
 
 print(f"Loaded {len(df)} papers ✅")
 
 
-print("🧠 Loading embedding model...")
-embedding_model = SentenceTransformer(MODEL_NAME)
+# Shared with main.py: only papers whose text changed since the last run get encoded,
+# and the model is only loaded if there is something to encode.
+embedding_store = EmbeddingStore(EMBEDDING_KEY, EMBEDDING_CACHE_DIR)
 
-print("🔢 Encoding papers...")
-text_embeddings = embedding_model.encode(df["clean_full_text"].tolist(), show_progress_bar=True)
+def load_model():
+    global EMBEDDING_KEY
+    model, backend = load_encoder(MODEL_NAME, ENCODER_BACKEND, EMBEDDING_ONNX_INT8_FILE)
+    if backend != ENCODER_BACKEND:
+        # Vectors of the fallback model are cached (and clustered) under its own key
+        EMBEDDING_KEY = store_key(MODEL_NAME, backend)
+        embedding_store.open(EMBEDDING_KEY)
+    return model
 
-print(f"📊 Clustering into {NUM_CLUSTERS} groups...")
-kmeans = KMeans(n_clusters=NUM_CLUSTERS, random_state=42)
-df["cluster"] = kmeans.fit_predict(text_embeddings)
+print("🔢 Encoding papers...")
+text_embeddings = np.asarray(embedding_store.encode(
+    df["clean_full_text"].tolist(),
+    load_model,
+    show_progress_bar=True,
+))
+
+# Saved centroids keep cluster ids stable between runs: new papers go to their nearest
+# centroid, and KMeans is only refitted once the corpus has drifted away from them.
+cluster_model = ClusterModel(CLUSTER_MODEL_DIR)
+refit = args.refit or not cluster_model.compatible(EMBEDDING_KEY, NUM_CLUSTERS)
+if not refit:
+    drift = cluster_model.drift(text_embeddings)
+    print(f"📐 Drift since the last fit: {drift:+.1%} (threshold {args.drift_threshold:.0%})")
+    refit = drift > args.drift_threshold
+
+if refit:
+    print(f"📊 Clustering into {NUM_CLUSTERS} groups...")
+    cluster_model.fit(text_embeddings, NUM_CLUSTERS, EMBEDDING_KEY, minibatch=args.minibatch)
+else:
+    print(f"📌 Assigning papers to the {NUM_CLUSTERS} saved centroids...")
+df["cluster"], _ = cluster_model.assign(text_embeddings)
 
 # Compute cluster embeddings (mean of embeddings)
 cluster_embeddings = []
@@ -73,13 +111,25 @@ for i in range(NUM_CLUSTERS):
     cluster_embeddings.append(text_embeddings[df["cluster"] == i].mean(axis=0))
 cluster_embeddings = np.vstack(cluster_embeddings)
 
+# Without a refit only papers added or updated since the last push are written,
+# and clusters keep their saved summaries
+since_version = args.since_version
+if since_version is None and not refit:
+    since_version = cluster_model.state.get("pushed_version")
+changed_df = changed_since(df, since_version)
+if since_version is not None:
+    print(f"🔁 {len(changed_df)} papers changed since version {since_version}.")
+
 
-print("💬 Summarizing clusters via Groq LLM...")
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+print("💬 Summarizing clusters via LLM...")
 
 cluster_outputs = {}
+if not refit and os.path.exists(SUMMARIES_FILE):
+    with open(SUMMARIES_FILE, "r") as f:
+        cluster_outputs = {int(cid): summary for cid, summary in json.load(f).items()}
+clusters_to_summarize = [cid for cid in range(NUM_CLUSTERS) if cid not in cluster_outputs]
 
-for cluster_id in tqdm(range(NUM_CLUSTERS)):
+for cluster_id in tqdm(clusters_to_summarize):
     subset = df[df["cluster"] == cluster_id].head(10)  # limit to first 10 papers
     cluster_text = "\n\n".join(subset["clean_full_text"].tolist())
 
@@ -111,11 +161,7 @@ Return **only JSON** in this format:
     """
 
     try:
-        response_summary = groq_client.chat.completions.create(
-            model=GROQ_MODEL,
-            messages=[{"role": "user", "content": groq_input}],
-        )
-        result = response_summary.choices[0].message.content.strip()
+        result = chat_completion(groq_input, endpoint="kg-ingestion", model=KG_LLM_MODEL, priority=BATCH)
         json_result = extract_json_from_text(result)
 
         if json_result:
@@ -128,74 +174,78 @@ Return **only JSON** in this format:
         continue
 
 # save cluster outputs for inspection
-with open(os.path.join(DATA_DIR, "cluster_summaries.json"), "w") as f:
-    json.dump(cluster_outputs, f, indent=2)
-
-print("🕸️ Connecting to Neo4j...")
-driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
+with open(SUMMARIES_FILE, "w") as f:
+    json.dump(dict(sorted(cluster_outputs.items())), f, indent=2)
 
-with driver.session() as session:
+def graph_rows(cluster_outputs, clusters, papers):
+    """
+    Flatten the cluster summaries and papers into parameter rows for each bulk write step.
+    Cluster, topic and entity rows are built for `clusters` only; `papers` link to the
+    summaries of whichever cluster they were assigned to.
+    """
+    graph = {step: [] for step in ("clusters", "topics", "entities", "relations", "papers", "paper_topics", "paper_entities")}
+    names = {}
     for cid, summary in cluster_outputs.items():
-        topics = summary.get("topics", [])
-        entities = summary.get("entities", [])
-        relations = summary.get("relations", [])
-        cluster_summary = summary.get("cluster_summary", "")
-
-        # 1️⃣ Create cluster
-        session.run("""
-            MERGE (c:Cluster {id:$cid})
-            SET c.summary=$summary
-        """, cid=cid, summary=cluster_summary)
-
-        # 2️⃣ Create topics and link to cluster
-        for t in topics:
-            session.run("""
-                MERGE (t:Topic {name:$name})
-                MERGE (c:Cluster {id:$cid})-[:HAS_TOPIC]->(t)
-            """, name=t, cid=cid)
-
-        # 3️⃣ Create entities and link to cluster
-        for e in entities:
-            session.run("""
-                MERGE (en:Entity {name:$name})
-                SET en.type=$type
-                MERGE (c:Cluster {id:$cid})-[:CONTAINS]->(en)
-            """, name=e["name"], type=e.get("type", "Unknown"), cid=cid)
-
-        # 4️⃣ Create relations between entities
-        for r in relations:
-            session.run("""
-                MATCH (a:Entity {name:$src}), (b:Entity {name:$tgt})
-                MERGE (a)-[rel:RELATION {type:$type}]->(b)
-            """, src=r["source"], tgt=r["target"], type=r.get("type", "related_to"))
-
-        # 5️⃣ Create Paper nodes and link to cluster, topics, entities
-        papers_in_cluster = df[df["cluster"] == cid]
-        for idx, paper in papers_in_cluster.iterrows():
-            paper_id = f"PAPER_{idx}"
-            session.run("""
-                MERGE (p:Paper {id:$paper_id})
-                SET p.title=$title, p.year=$year, p.abstract=$abstract
-                MERGE (c:Cluster {id:$cid})
-                MERGE (p)-[:BELONGS_TO]->(c)
-            """, paper_id=paper_id,
-                 title=paper['Title'],
-                 year=int(paper.get('year', 0)),
-                 abstract=paper.get('abstract', ''),
-                 cid=cid)
-
-            # Link papers to topics
-            for t in topics:
-                session.run("""
-                    MATCH (p:Paper {id:$paper_id}), (t:Topic {name:$tname})
-                    MERGE (p)-[:MENTIONS]->(t)
-                """, paper_id=paper_id, tname=t)
-
-            # Link papers to entities
-            for e in entities:
-                session.run("""
-                    MATCH (p:Paper {id:$paper_id}), (en:Entity {name:$ename})
-                    MERGE (p)-[:REPORTS]->(en)
-                """, paper_id=paper_id, ename=e["name"])
+        topics = [t for t in summary.get("topics", []) if isinstance(t, str)]
+        entities = [e for e in summary.get("entities", []) if isinstance(e, dict) and e.get("name")]
+        names[cid] = (topics, [e["name"] for e in entities])
+        if cid not in clusters:
+            continue
+
+        graph["clusters"].append({"id": cid, "summary": summary.get("cluster_summary", "")})
+        graph["topics"].extend({"cluster": cid, "name": t} for t in topics)
+        graph["entities"].extend({"cluster": cid, "name": e["name"], "type": e.get("type", "Unknown")} for e in entities)
+        graph["relations"].extend(
+            {"source": r["source"], "target": r["target"], "type": r.get("type", "related_to")}
+            for r in summary.get("relations", [])
+            if isinstance(r, dict) and r.get("source") and r.get("target")
+        )
 
+    # PMC ids (or links, for non-PMC papers) stay stable across incremental refreshes, row numbers do not
+    for paper_id, (_, paper) in zip(paper_keys(papers), papers.iterrows()):
+        cid = int(paper["cluster"])
+        if cid not in names:
+            continue
+        topics, entity_names = names[cid]
+        abstract = paper.get("abstract", "")
+        graph["papers"].append({
+            "id": paper_id,
+            "cluster": cid,
+            "title": paper["Title"],
+            "year": int(paper.get("year", 0)),
+            "abstract": abstract if isinstance(abstract, str) else None,
+        })
+        if topics:
+            graph["paper_topics"].append({"paper": paper_id, "names": topics})
+        if entity_names:
+            graph["paper_entities"].append({"paper": paper_id, "names": entity_names})
+    return graph
+
+# After a refit every cluster is rewritten; otherwise only newly summarised ones
+graph = graph_rows(cluster_outputs, clusters_to_summarize, changed_df)
+
+if args.dry_run:
+    print("🧪 Dry run: recording Neo4j writes instead of sending them...")
+    driver = RecordingDriver()
+else:
+    print("🕸️ Connecting to Neo4j...")
+    from neo4j import GraphDatabase
+    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
+
+writer = GraphWriter(driver, batch_size=args.batch_size, database=NEO4J_DATABASE)
+writer.ensure_constraints()
+writer.drop_legacy_papers()
+writer.write_graph(graph)
+driver.close()
+
+if args.dry_run:
+    print("🧪 Dry run: cluster model not saved.")
+else:
+    # Papers of clusters without a summary are retried on the next run
+    if set(changed_df["cluster"].astype(int)) <= set(cluster_outputs):
+        cluster_model.state["pushed_version"] = int(df["ingest_version"].max())
+    cluster_model.save()
+
+print("📈 Neo4j write throughput:")
+writer.report()
 print("✅ Papers, topics, entities, and relations pushed successfully!")
@@ -0,0 +1,111 @@
+"""
+Compare the encoder inference backends (utils/encoder_backends.py) on our corpus:
+load time, batch throughput, single-query latency, and agreement with the
+PyTorch fp32 vectors (per-text cosine and top-10 neighbour overlap).
+
+Run from backend/:
+    python -m benchmarks.bench_encoder_backends
+    python -m benchmarks.bench_encoder_backends --backends torch onnx --texts 256 --json report.json
+    python -m benchmarks.bench_encoder_backends --model /path/to/local/model   # offline, or another model
+"""
+import json
+import time
+import argparse
+import numpy as np
+from config.config import EMBEDDING_MODEL_NAME, EMBEDDING_ONNX_INT8_FILE
+from utils.columnar_store import load_papers
+from utils.df_utils import clean_full_text
+from utils.encoder_backends import BACKENDS, REFERENCE_BACKEND, backend_available, load_encoder
+
+
+def corpus_texts(limit):
+    df = load_papers(columns=["Title", "abstract", "conclusion"]).head(limit)
+    return clean_full_text(df).tolist()
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+def top_k(queries, corpus, k):
+    return np.argsort(-(queries @ corpus.T), axis=1)[:, :k]
+
+def bench_backend(model_name, backend, texts, queries, batch_size):
+    started = time.perf_counter()
+    model, loaded = load_encoder(model_name, backend, EMBEDDING_ONNX_INT8_FILE)
+    load_seconds = time.perf_counter() - started
+
+    model.encode(texts[:batch_size], batch_size=batch_size, convert_to_numpy=True)  # warm-up
+    started = time.perf_counter()
+    corpus = model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+    batch_seconds = time.perf_counter() - started
+
+    # /post-mission encodes one query per request
+    latencies, query_vectors = [], []
+    for query in queries:
+        started = time.perf_counter()
+        query_vectors.append(model.encode(query, convert_to_numpy=True))
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    return {
+        "backend": backend,
+        "loaded": loaded,
+        "load_seconds": round(load_seconds, 2),
+        "texts_per_second": round(len(texts) / batch_seconds, 1),
+        "query_p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "query_p95_ms": round(float(np.percentile(latencies, 95)), 2),
+    }, normalize(corpus), normalize(query_vectors)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=EMBEDDING_MODEL_NAME, help="Model name or local directory")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--texts", type=int, default=512, help="Corpus texts to encode")
+    parser.add_argument("--queries", type=int, default=100, help="Single-text encodes for the latency figures")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--k", type=int, default=10, help="Neighbours compared for the retrieval overlap")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    texts = corpus_texts(args.texts)
+    # Queries: paper titles, short like a mission summary
+    queries = [t.split(". ")[0] for t in texts[:args.queries]]
+    print(f"Corpus: {len(texts)} texts, {len(queries)} queries, model {args.model}")
+
+    backends = [REFERENCE_BACKEND] + [b for b in args.backends if b != REFERENCE_BACKEND]
+    results, reference = [], None
+    for backend in backends:
+        if backend != REFERENCE_BACKEND and not backend_available(backend):
+            print(f"⏭️ {backend}: not installed, skipped")
+            continue
+        row, corpus, query_vectors = bench_backend(args.model, backend, texts, queries, args.batch_size)
+        if reference is None:
+            reference = (corpus, query_vectors)
+        ref_corpus, ref_queries = reference
+        cosine = (corpus * ref_corpus).sum(axis=1)
+        expected = top_k(ref_queries, ref_corpus, args.k)
+        found = top_k(query_vectors, corpus, args.k)
+        overlap = np.mean([len(set(e) & set(f)) / args.k for e, f in zip(expected, found)])
+        row.update(
+            cosine_mean=round(float(cosine.mean()), 5),
+            cosine_min=round(float(cosine.min()), 5),
+            topk_overlap=round(float(overlap), 4),
+        )
+        results.append(row)
+
+    print(f"{'backend':<12}{'load':>8}{'texts/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'cos mean':>10}{'cos min':>9}{f'top{args.k}':>8}")
+    base = results[0]["texts_per_second"] if results else 0
+    for r in results:
+        name = r["backend"] if r["loaded"] == r["backend"] else f"{r['backend']}*"
+        print(f"{name:<12}{r['load_seconds']:>7.1f}s{r['texts_per_second']:>10.1f}{r['query_p50_ms']:>9.2f}"
+              f"{r['query_p95_ms']:>9.2f}{r['cosine_mean']:>10.4f}{r['cosine_min']:>9.4f}{r['topk_overlap']:>8.2f}"
+              f"   {r['texts_per_second'] / base:.2f}x")
+    if any(r["loaded"] != r["backend"] for r in results):
+        print(f"* failed to load, measured the {REFERENCE_BACKEND} fallback")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"model": args.model, "onnx_int8_file": EMBEDDING_ONNX_INT8_FILE, "texts": len(texts),
+                       "queries": len(queries), "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
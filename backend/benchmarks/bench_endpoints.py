@@ -0,0 +1,312 @@
+"""
+Latency / throughput / memory benchmarks for the API endpoints over synthetic
+corpora at several scales (x the bundled dataset).
+
+Each scale runs in its own process: synthetic data is generated into a work
+directory, the app is imported there with the stub LLM provider (latency set
+by --llm-latency-ms) and driven in-process through httpx' ASGI transport,
+first one request at a time, then with --concurrency requests in flight.
+Reports p50/p95/p99, throughput and peak RSS per endpoint and writes them as
+JSON so runs from different commits can be compared.
+
+Run from backend/ (needs httpx):
+    python -m benchmarks.bench_endpoints --scales 1 10 100
+    python -m benchmarks.bench_endpoints --scales 10 --endpoints papers post-mission --concurrency 32
+    python -m benchmarks.bench_endpoints --url http://localhost:8000      # a running server instead
+    python -m benchmarks.bench_endpoints --compare old.json new.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+import subprocess
+import numpy as np
+import httpx
+from config.config import category_names
+
+RESULTS_DIR = os.path.join("benchmarks", "results")
+# p95 growth (new / old) reported as a regression by --compare
+REGRESSION_RATIO = 1.10
+
+MISSION = {
+    "type": "Mars", "phase": "Planning", "objective": "Scientific Research", "deltaV": 5.6,
+    "duration": 540, "fuel": 12000, "payload": 3500, "crew": 4, "commsLatency": 720,
+    "gravity": 3.71, "radDose": 300, "power_kW": 40, "edlDifficulty": 8, "coordinates": "18.4,77.5",
+}
+
+
+def mission(rng):
+    return {**MISSION, "fuel": rng.randint(5000, 20000), "crew": rng.randint(2, 8), "duration": rng.randint(90, 900)}
+
+def papers_request(rng, n_papers):
+    params = {"offset": rng.randrange(max(1, n_papers - 20)), "limit": 20}
+    kind = rng.randrange(4)
+    if kind == 1:
+        params["category"] = rng.choice(category_names)
+    elif kind == 2:
+        params["q"] = rng.choice(["space", "cell", "radiation", "plant", "bone"])
+    elif kind == 3:
+        params.update(year_from=rng.randint(1990, 2010), year_to=rng.randint(2011, 2024))
+    return "GET", "/papers", params, None
+
+# name -> fn(rng, n_papers) -> (method, path, query params, json body)
+ENDPOINTS = {
+    "papers": papers_request,
+    "paper": lambda rng, n: ("GET", f"/papers/{rng.randrange(n)}", None, None),
+    "research-evolution": lambda rng, n: ("GET", "/research-evolution", None, None),
+    "nasa-budget": lambda rng, n: ("GET", "/nasa-budget", None, None),
+    "ai-tabs": lambda rng, n: ("GET", "/ai-tabs", {"dataset": "bioscience"}, None),
+    "ask-ai": lambda rng, n: ("POST", "/ask-ai", None, {"question": f"Which category grew most after {rng.randint(1995, 2020)}?"}),
+    "search": lambda rng, n: ("GET", "/search", {
+        "q": " ".join(rng.sample(["radiation", "bone", "microgravity", "plant", "cells", "exposure", "gene"], 2)),
+        "mode": rng.choice(["hybrid", "lexical"]),
+    }, None),
+    "post-mission": lambda rng, n: ("POST", "/post-mission", None, {"mission": mission(rng)}),
+    "generate-pdf": lambda rng, n: ("POST", "/generate-pdf", None, {
+        "mission": mission(rng),
+        "insights": {"missionInsight": "**Radiation** exposure dominates.\nPlan shielding."},
+        "topPapers": [{"title": f"Paper {i}", "link": None, "similarity": 0.5} for i in range(5)],
+    }),
+}
+
+
+class HashingEncoder:
+    """
+    Bag-of-words hashing encoder with SentenceTransformer's `encode()`
+    signature (--encoder hash): keeps 100x/1000x corpora from being dominated
+    by hours of model inference while still producing meaningful similarities.
+    """
+
+    def __init__(self, dim=384):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        self.vectorizer = HashingVectorizer(n_features=dim, alternate_sign=False, norm="l2")
+
+    def encode(self, texts, convert_to_numpy=True, **kwargs):
+        single = isinstance(texts, str)
+        vectors = self.vectorizer.transform([texts] if single else list(texts)).toarray().astype(np.float32)
+        return vectors[0] if single else vectors
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource  # peak rather than current outside Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class RSSSampler(threading.Thread):
+    """Samples this process' RSS in the background; `reset()` starts a new peak window."""
+
+    def __init__(self, interval=0.01):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = rss_bytes()
+
+    def reset(self):
+        self.peak = rss_bytes()
+
+    def run(self):
+        while True:
+            self.peak = max(self.peak, rss_bytes())
+            time.sleep(self.interval)
+
+
+async def drive(client, make_request, n_requests, concurrency, seed, before_request=None):
+    rng = random.Random(seed)
+    requests = [make_request(rng) for _ in range(n_requests)]
+    latencies, errors = [], 0
+    next_request = iter(requests)
+
+    async def worker():
+        nonlocal errors
+        for method, path, params, body in next_request:
+            if before_request:
+                before_request()
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, params=params, json=body)
+                await response.aread()
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies.append(time.perf_counter() - started)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    ms = np.array(latencies) * 1000
+    return {
+        "requests": n_requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "mean_ms": round(float(ms.mean()), 2),
+        "throughput_rps": round(n_requests / wall, 1),
+    }
+
+async def run_endpoints(client, endpoints, n_papers, args, sampler=None, before_request=None):
+    results = {}
+    for name in endpoints:
+        make_request = lambda rng, fn=ENDPOINTS[name]: fn(rng, n_papers)
+        await drive(client, make_request, 1, 1, seed=-1)  # warm-up: first-call caches, lazy imports
+        results[name] = {}
+        for mode, concurrency in (("serial", 1), ("concurrent", args.concurrency)):
+            if sampler:
+                sampler.reset()
+            n = args.serial_requests if mode == "serial" else args.requests
+            row = await drive(client, make_request, n, concurrency, seed=len(results), before_request=before_request)
+            row["peak_rss_mb"] = round(sampler.peak / 2**20, 1) if sampler else None
+            results[name][mode] = row
+            print(f"   {name:<20}{mode:<11}p50 {row['p50_ms']:>8.1f}ms  p95 {row['p95_ms']:>8.1f}ms  "
+                  f"p99 {row['p99_ms']:>8.1f}ms  {row['throughput_rps']:>8.1f} req/s  errors {row['errors']}", flush=True)
+    return results
+
+
+def run_scale(args):
+    """Child process: generate data for one scale, import the app over it and drive it."""
+    from benchmarks.synthetic_data import generate
+
+    rows = generate(args.workdir, args.scale, args.seed)
+    os.chdir(args.workdir)
+    if args.encoder == "hash":
+        import utils.app_state
+        utils.app_state.load_encoder = lambda *a: (HashingEncoder(), "hash")
+
+    sampler = RSSSampler()
+    sampler.start()
+    started = time.perf_counter()
+    import main  # STARTUP_MODE=eager: warm-up runs at import
+    startup_seconds = time.perf_counter() - started
+    if not main.state.is_ready("dataset", "paper_embeddings", "image_embeddings", "model"):
+        raise SystemExit(f"warm-up failed: {main.state.status()['stages']}")
+    print(f"🧪 scale x{args.scale:g}: {rows}, warm-up {startup_seconds:.1f}s, RSS {rss_bytes() / 2**20:.0f} MB", flush=True)
+
+    def clear_caches():
+        main.response_cache.entries.clear()
+        if main.mission_cache is not None:
+            main.mission_cache.entries.clear()
+
+    async def go():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            return await run_endpoints(client, args.endpoints, rows["papers"], args, sampler,
+                                       clear_caches if args.cold else None)
+
+    endpoints = asyncio.run(go())
+    return {"scale": args.scale, "rows": rows, "startup_seconds": round(startup_seconds, 2),
+            "startup_rss_mb": round(sampler.peak / 2**20, 1), "endpoints": endpoints}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    old_runs = {(r["scale"], e, m): v for r in old["runs"] for e, modes in r["endpoints"].items() for m, v in modes.items()}
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    print(f"{'scale':>6}  {'endpoint':<20}{'mode':<11}{'p95 old':>10}{'p95 new':>10}{'ratio':>8}{'rps ratio':>11}")
+    regressions = 0
+    for run in new["runs"]:
+        for endpoint, modes in run["endpoints"].items():
+            for mode, v in modes.items():
+                o = old_runs.get((run["scale"], endpoint, mode))
+                if o is None:
+                    continue
+                ratio = v["p95_ms"] / o["p95_ms"] if o["p95_ms"] else float("inf")
+                rps = v["throughput_rps"] / o["throughput_rps"] if o["throughput_rps"] else float("inf")
+                flag = "  ⚠️ slower" if ratio > REGRESSION_RATIO else ""
+                regressions += bool(flag)
+                print(f"{run['scale'] or 'url':>6}  {endpoint:<20}{mode:<11}{o['p95_ms']:>10.1f}{v['p95_ms']:>10.1f}"
+                      f"{ratio:>8.2f}{rps:>11.2f}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", nargs="+", type=float, default=[1, 10], help="Corpus sizes as multiples of the bundled data")
+    parser.add_argument("--endpoints", nargs="+", default=list(ENDPOINTS), choices=list(ENDPOINTS))
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint under concurrent load")
+    parser.add_argument("--serial-requests", type=int, default=50, help="Requests per endpoint one at a time")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--llm-latency-ms", type=int, default=300, help="Stub LLM latency per call")
+    parser.add_argument("--llm-jitter-ms", type=int, default=100)
+    parser.add_argument("--encoder", choices=["hash", "model"], default="hash",
+                        help="hash: fast bag-of-words encoder; model: the configured SentenceTransformer")
+    parser.add_argument("--cold", action="store_true", help="Clear the response and mission caches before every request")
+    parser.add_argument("--mission-cache", action="store_true", help="Leave the /post-mission semantic cache on")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="Where synthetic data is generated (default: a temporary directory)")
+    parser.add_argument("--out", help="Results file (default: benchmarks/results/endpoints-<time>-<commit>.json)")
+    parser.add_argument("--url", help="Benchmark a running server at this URL instead (its own data, no RSS)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two results files and exit")
+    parser.add_argument("--scale", type=float, help=argparse.SUPPRESS)  # child process
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare) else 0)
+    if args.scale is not None:
+        result = run_scale(args)
+        with open(args.out, "w") as f:
+            json.dump(result, f)
+        return
+
+    commit = git_commit()
+    out = args.out or os.path.join(RESULTS_DIR, f"endpoints-{time.strftime('%Y%m%d-%H%M%S')}-{commit or 'nogit'}.json")
+    report = {"commit": commit, "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "args": vars(args), "runs": []}
+
+    if args.url:
+        async def go():
+            async with httpx.AsyncClient(base_url=args.url, timeout=None) as client:
+                n_papers = (await client.get("/papers", params={"limit": 1})).json()["total"]
+                return await run_endpoints(client, args.endpoints, n_papers, args)
+        print(f"🌐 {args.url}")
+        report["runs"].append({"scale": None, "url": args.url, "endpoints": asyncio.run(go())})
+    else:
+        env = {
+            **os.environ,
+            "LLM_PROVIDER": "stub",
+            "LLM_STUB_LATENCY_MS": str(args.llm_latency_ms),
+            "LLM_STUB_JITTER_MS": str(args.llm_jitter_ms),
+            "LLM_CACHE_ENABLED": "0",
+            "MISSION_CACHE_ENABLED": "1" if args.mission_cache else "0",
+            "STARTUP_MODE": "eager",
+            "PYTHONPATH": os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")])),
+        }
+        for scale in args.scales:
+            workdir = args.workdir and os.path.join(args.workdir, f"x{scale:g}")
+            with tempfile.TemporaryDirectory(prefix=f"bench-x{scale:g}-") as tmp:
+                workdir = os.path.abspath(workdir or tmp)
+                result_path = os.path.join(tmp, "result.json")
+                cmd = [sys.executable, "-m", "benchmarks.bench_endpoints", "--scale", str(scale), "--workdir", workdir,
+                       "--out", result_path, "--encoder", args.encoder, "--requests", str(args.requests),
+                       "--serial-requests", str(args.serial_requests), "--concurrency", str(args.concurrency),
+                       "--seed", str(args.seed), "--endpoints", *args.endpoints] + (["--cold"] if args.cold else [])
+                subprocess.run(cmd, env=env, check=True)
+                with open(result_path) as f:
+                    report["runs"].append(json.load(f))
+
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"📄 Results written to {out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark the streaming JATS parser against the old regex extraction.
+
+Run from backend/:
+    python -m benchmarks.bench_jats_parser                      # synthetic batch
+    python -m benchmarks.bench_jats_parser --xml saved_efetch.xml
+"""
+import re
+import time
+import random
+import argparse
+import tracemalloc
+from utils.jats_parser import parse_articles
+
+
+def clean_text(raw_text):
+    text = re.sub(r"<.*?>", " ", raw_text)
+    text = re.sub(r"\s+", " ", text).strip()
+    return text
+
+def regex_extract_sections(xml):
+    """The regex path fetch_publication_details.py used before the streaming parser."""
+    abstract = ""
+    match = re.search(r"<abstract[^>]*>(.*?)</abstract>", xml, re.DOTALL | re.IGNORECASE)
+    if match:
+        abstract = clean_text(match.group(1))
+
+    conclusion = ""
+    conc_match = re.search(r'<sec[^>]*sec-type="conclusion"[^>]*>(.*?)</sec>', xml, re.DOTALL | re.IGNORECASE)
+    if conc_match:
+        conclusion = clean_text(conc_match.group(1))
+    else:
+        conc_match2 = re.search(r"<sec[^>]*>.*?<title> *Conclusion[s]* *</title>(.*?)</sec>", xml, re.DOTALL | re.IGNORECASE)
+        if conc_match2:
+            conclusion = clean_text(conc_match2.group(1))
+
+    dates = {}
+    for pattern, dtype in [
+        (r'<pub-date pub-type="epub">(.*?)</pub-date>', "epub"),
+        (r'<pub-date pub-type="collection">(.*?)</pub-date>', "collection"),
+        (r'<date date-type="accepted">(.*?)</date>', "accepted"),
+    ]:
+        match = re.search(pattern, xml, re.DOTALL | re.IGNORECASE)
+        if match:
+            block = match.group(1)
+            year = re.search(r"<year>(\d+)</year>", block)
+            month = re.search(r"<month>(\d+)</month>", block)
+            day = re.search(r"<day>(\d+)</day>", block)
+            dates[dtype] = f"{year.group(1) if year else ''}-{month.group(1).zfill(2) if month else '01'}-{day.group(1).zfill(2) if day else '01'}"
+    best_date = dates.get("epub") or dates.get("collection") or dates.get("accepted") or ""
+
+    return {"abstract": abstract, "conclusion": conclusion, "best_date": best_date}
+
+def regex_parse_articles(xml):
+    articles = {}
+    for article in re.findall(r"<article[\s>].*?</article>", xml, re.DOTALL):
+        match = re.search(r'<article-id pub-id-type="pmc(?:id)?">\s*(?:PMC)?(\d+)\s*</article-id>', article)
+        if match:
+            articles["PMC" + match.group(1)] = regex_extract_sections(article)
+    return articles
+
+
+WORDS = ("microgravity bone muscle radiation spaceflight gene expression cell plant root "
+         "arabidopsis mice astronaut immune stress oxidative tissue protein signaling").split()
+
+def paragraph(rng, n_words):
+    return "<p>" + " ".join(rng.choice(WORDS) for _ in range(n_words)) + "</p>"
+
+def synthetic_article(rng, pmc, paragraphs):
+    body = []
+    for s in range(4):
+        inner = "".join(paragraph(rng, 80) for _ in range(paragraphs))
+        nested = f"<sec><title>Subsection {s}</title>{paragraph(rng, 60)}</sec>"
+        body.append(f"<sec id=\"s{s}\"><title>Section {s}</title>{inner}{nested}{inner}</sec>")
+    # Conclusion with a nested subsection: the lazy regex stops at the inner </sec>
+    conclusion = (f"<sec><title>Conclusions</title>{paragraph(rng, 50)}"
+                  f"<sec><title>Outlook</title>{paragraph(rng, 40)}</sec>{paragraph(rng, 30)}</sec>")
+    return (
+        f'<article article-type="research-article"><front><article-meta>'
+        f'<article-id pub-id-type="pmc">{pmc}</article-id>'
+        f'<pub-date pub-type="epub"><day>{rng.randint(1, 28)}</day><month>{rng.randint(1, 12)}</month>'
+        f'<year>{rng.randint(2000, 2024)}</year></pub-date>'
+        f'<abstract>{paragraph(rng, 200)}</abstract></article-meta></front>'
+        f'<body>{"".join(body)}{conclusion}</body></article>'
+    )
+
+def synthetic_batch(n_articles, paragraphs, seed=0):
+    rng = random.Random(seed)
+    articles = "".join(synthetic_article(rng, 1000000 + i, paragraphs) for i in range(n_articles))
+    return f'<?xml version="1.0"?><pmc-articleset>{articles}</pmc-articleset>'
+
+
+def measure(fn, xml, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(xml)
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    fn(xml)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, best, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--xml", help="Saved efetch response to parse instead of synthetic data")
+    parser.add_argument("--articles", type=int, default=20, help="Articles in the synthetic batch")
+    parser.add_argument("--paragraphs", type=int, default=20, help="Paragraphs per synthetic section")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.xml:
+        with open(args.xml, "r", encoding="utf-8") as f:
+            xml = f.read()
+    else:
+        xml = synthetic_batch(args.articles, args.paragraphs)
+    print(f"Input: {len(xml) / 1e6:.1f} MB")
+
+    streamed, stream_time, stream_peak = measure(parse_articles, xml.encode("utf-8"), args.repeat)
+    regexed, regex_time, regex_peak = measure(regex_parse_articles, xml, args.repeat)
+
+    print(f"{'path':<10}{'articles':>10}{'best time':>12}{'MB/s':>9}{'peak alloc':>13}")
+    for name, result, seconds, peak in [
+        ("regex", regexed, regex_time, regex_peak),
+        ("streaming", streamed, stream_time, stream_peak),
+    ]:
+        print(f"{name:<10}{len(result):>10}{seconds * 1000:>10.1f}ms{len(xml) / 1e6 / seconds:>9.1f}{peak / 1e6:>11.2f}MB")
+    print(f"Speed-up: {regex_time / stream_time:.2f}x")
+
+    ids = regexed.keys() & streamed.keys()
+    for field in ("abstract", "best_date", "conclusion"):
+        same = sum(regexed[i][field] == streamed[i][field] for i in ids)
+        longer = sum(len(streamed[i][field]) > len(regexed[i][field]) for i in ids)
+        print(f"{field:<11} identical for {same}/{len(ids)}, longer in streaming output for {longer}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Memory and recall of the compressed vector representations (utils/vector_codecs.py)
+on our paper embeddings: bytes held by the brute-force index, recall@k against
+exact float32 search, and query latency, with and without exact re-ranking.
+
+Vectors come from the embedding store (encoded with the configured model if
+missing); --encoder hash uses the benchmarks' bag-of-words hashing encoder
+instead, for machines without the model. --scale tiles the corpus with small
+noise to project the figures to a larger corpus.
+
+Run from backend/:
+    python -m benchmarks.bench_vector_compression
+    python -m benchmarks.bench_vector_compression --k 5 10 --rerank 0 20 50 --pca-dims 64 128 --json report.json
+"""
+import json
+import time
+import argparse
+import numpy as np
+from config.config import EMBEDDING_MODEL_NAME, EMBEDDING_CACHE_DIR, EMBEDDING_BACKEND, EMBEDDING_ONNX_INT8_FILE
+from utils.columnar_store import load_papers
+from utils.df_utils import clean_full_text
+from utils.embedding_store import EmbeddingStore
+from utils.encoder_backends import resolve_backend, store_key, load_encoder
+from utils.vector_index import BruteForceIndex, normalize, top_k_indices
+
+
+def corpus_texts():
+    df = load_papers(columns=["Title", "abstract", "conclusion"])
+    texts = clean_full_text(df)
+    return texts.tolist(), df["Title"].fillna("").tolist()
+
+def embed(texts, titles, encoder):
+    if encoder == "hash":
+        from benchmarks.bench_endpoints import HashingEncoder
+
+        model = HashingEncoder()
+        return model.encode(texts), model.encode(titles)
+    # The queries need the model anyway; loading it first picks the store of the backend actually loaded
+    model, backend = load_encoder(EMBEDDING_MODEL_NAME, resolve_backend(EMBEDDING_BACKEND), EMBEDDING_ONNX_INT8_FILE)
+    store = EmbeddingStore(store_key(EMBEDDING_MODEL_NAME, backend), EMBEDDING_CACHE_DIR)
+    return np.asarray(store.encode(texts, lambda: model)), model.encode(titles, convert_to_numpy=True)
+
+def tile(vectors, scale, seed=0):
+    """`scale` noisy copies of the corpus, so neighbours stay realistic at larger sizes."""
+    if scale <= 1:
+        return vectors
+    rng = np.random.default_rng(seed)
+    copies = [vectors] + [vectors + rng.normal(0, 0.02, vectors.shape).astype(np.float32) for _ in range(scale - 1)]
+    return np.concatenate(copies)
+
+def bench(corpus, queries, compression, pca_dim, rerank, ks, truth):
+    started = time.perf_counter()
+    index = BruteForceIndex(corpus, compression=compression, pca_dim=pca_dim, rerank=rerank)
+    build_seconds = time.perf_counter() - started
+
+    latencies, found = [], []
+    for q in queries:
+        started = time.perf_counter()
+        idxs, _ = index.search(q, max(ks))
+        latencies.append((time.perf_counter() - started) * 1000)
+        found.append(idxs)
+    row = {
+        "compression": compression,
+        "pca_dim": pca_dim if compression == "pca" else None,
+        "rerank": rerank if compression != "none" else 0,
+        "index_mb": round(index.codec.nbytes / 2**20, 2),
+        "bytes_per_vector": round(index.codec.nbytes / len(corpus), 1),
+        "build_seconds": round(build_seconds, 2),
+        "query_p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "query_p95_ms": round(float(np.percentile(latencies, 95)), 3),
+    }
+    for k in ks:
+        row[f"recall@{k}"] = round(float(np.mean([len(set(f[:k]) & set(t[:k])) / k for f, t in zip(found, truth)])), 4)
+    return row
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--encoder", choices=["model", "hash"], default="model")
+    parser.add_argument("--scale", type=int, default=1, help="Tile the corpus this many times")
+    parser.add_argument("--queries", type=int, default=200, help="Paper titles used as queries")
+    parser.add_argument("--k", type=int, nargs="+", default=[5, 10])
+    parser.add_argument("--rerank", type=int, nargs="+", default=[0, 50], help="Re-ranked candidates (0 = none)")
+    parser.add_argument("--pca-dims", type=int, nargs="+", default=[64, 128])
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    texts, titles = corpus_texts()
+    corpus, queries = embed(texts, titles, args.encoder)
+    corpus = tile(np.asarray(corpus, dtype=np.float32), args.scale)
+    rng = np.random.default_rng(0)
+    queries = np.asarray(queries, dtype=np.float32)[rng.permutation(len(queries))[:args.queries]]
+    print(f"Corpus: {len(corpus)} x {corpus.shape[1]} ({args.encoder} encoder), {len(queries)} queries")
+
+    exact = normalize(corpus)
+    truth = [top_k_indices(exact @ q, max(args.k)) for q in normalize(queries)]
+    configs = [("none", None, 0), ("float16", None, 0), ("int8", None, 0)]
+    configs += [("pca", d, 0) for d in args.pca_dims]
+    configs += [(c, d, r) for c, d, _ in configs[1:] for r in args.rerank if r]
+
+    results = [bench(corpus, queries, c, d or 128, r, args.k, truth) for c, d, r in configs]
+    base = results[0]["index_mb"]
+    recalls = [f"recall@{k}" for k in args.k]
+    print(f"{'compression':<14}{'rerank':>7}{'index MB':>10}{'saved':>8}{'B/vec':>8}{'p50 ms':>9}{'p95 ms':>9}"
+          + "".join(f"{r:>11}" for r in recalls))
+    for r in results:
+        name = f"pca-{r['pca_dim']}" if r["compression"] == "pca" else r["compression"]
+        print(f"{name:<14}{r['rerank']:>7}{r['index_mb']:>10.2f}{1 - r['index_mb'] / base:>8.0%}{r['bytes_per_vector']:>8.0f}"
+              f"{r['query_p50_ms']:>9.3f}{r['query_p95_ms']:>9.3f}" + "".join(f"{r[k]:>11.4f}" for k in recalls))
+    print("Re-ranking reads only the candidate rows of the float32 embeddings (memory-mapped from the store).")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"encoder": args.encoder, "corpus": list(corpus.shape), "queries": len(queries), "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
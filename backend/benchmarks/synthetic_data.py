@@ -0,0 +1,104 @@
+"""
+Synthetic datasets in the layout main.py reads (`data/` under a work directory),
+scaled relative to the bundled corpus.
+
+    python -m benchmarks.synthetic_data /tmp/bench-x10 --scale 10
+"""
+import os
+import json
+import random
+import argparse
+import numpy as np
+import pandas as pd
+from config.config import CATEGORIES
+
+# Size of the bundled datasets, i.e. scale 1
+BASE_PAPERS = 607
+BASE_BUDGET_YEARS = 15
+BASE_IMAGES = 24
+
+GENERAL_WORDS = ("study results spaceflight samples analysis increased decreased significant "
+                 "exposure conditions ground control flight mission observed effects data").split()
+PROGRAMS = ["Deep Space Exploration Systems", "Common Exploration Systems Dev.", "Artemis Campaign Dev.",
+            "Mars Campaign Dev.", "Space Operations", "Planetary Science", "Earth Science",
+            "Astrophysics & Heliophysics", "Aeronautics Research", "Biological & Physical Sciences",
+            "STEM Engagement & Education", "Facilities & Construction"]
+MILESTONES = ["ISS Construction & Shuttle Phase-Out", "Constellation Program", "Commercial Crew",
+              "Artemis Ramp-Up", "Mars Sample Return", "Science Expansion", "Budget Consolidation"]
+
+
+def _vocabularies():
+    """Per-category word lists, so the synthetic papers spread over the real categories."""
+    vocab = []
+    for description in CATEGORIES.values():
+        words = [w.strip(".,()").lower() for w in description.split() if len(w.strip(".,()")) > 4]
+        vocab.append(words)
+    return vocab
+
+def _sentence(rng, words, n):
+    return " ".join(rng.choice(words) if rng.random() < 0.6 else rng.choice(GENERAL_WORDS) for _ in range(n))
+
+def papers(n, seed=0):
+    rng = random.Random(seed)
+    vocab = _vocabularies()
+    dates = pd.to_datetime("1990-01-01") + pd.to_timedelta(np.random.default_rng(seed).integers(0, 35 * 365, n), unit="D")
+    rows = []
+    for i in range(n):
+        words = vocab[rng.randrange(len(vocab))]
+        rows.append({
+            "Title": _sentence(rng, words, rng.randint(6, 14)).capitalize(),
+            "Link": f"https://www.ncbi.nlm.nih.gov/pmc/articles/PMC{9000000 + i}/",
+            "abstract": ". ".join(_sentence(rng, words, rng.randint(15, 30)) for _ in range(rng.randint(5, 9))),
+            "conclusion": ". ".join(_sentence(rng, words, rng.randint(15, 30)) for _ in range(rng.randint(1, 4))),
+            "date": dates[i].strftime("%Y-%m-%d"),
+        })
+    return pd.DataFrame(rows)
+
+def budget(n_years, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n_years):
+        values = {p: rng.randint(0, 8000) for p in PROGRAMS}
+        rows.append({
+            "Year": 2000 + i,
+            **values,
+            "Total Budget (Millions $)": sum(values.values()),
+            "Key Milestone": rng.choice(MILESTONES),
+            "Description": _sentence(rng, GENERAL_WORDS, 12),
+        })
+    return pd.DataFrame(rows)
+
+def image_metadata(n, n_papers, seed=0):
+    rng = random.Random(seed)
+    vocab = _vocabularies()
+    return [
+        {
+            "image": f"./data/paper_images/PMC{9000000 + rng.randrange(n_papers)}_p{rng.randint(1, 12)}_{i}.png",
+            "caption": f"Figure {rng.randint(1, 8)}. " + _sentence(rng, vocab[i % len(vocab)], 10),
+            "description": _sentence(rng, vocab[i % len(vocab)], 60),
+            "pdf": f"PMC{9000000 + rng.randrange(n_papers)}.pdf",
+        }
+        for i in range(n)
+    ]
+
+def generate(workdir, scale, seed=0):
+    """Write papers, budget and image metadata at `scale` x the bundled sizes; returns the row counts."""
+    data_dir = os.path.join(workdir, "data")
+    os.makedirs(os.path.join(data_dir, "paper_images"), exist_ok=True)
+    n_papers = max(1, round(BASE_PAPERS * scale))
+    n_years = max(2, round(BASE_BUDGET_YEARS * scale))
+    n_images = max(1, round(BASE_IMAGES * scale))
+
+    papers(n_papers, seed).to_csv(os.path.join(data_dir, "extracted_all_with_sections.csv"), index=False)
+    budget(n_years, seed).to_csv(os.path.join(data_dir, "NASABudgetMilestonesDataset.csv"), index=False)
+    with open(os.path.join(data_dir, "paper_images_metadata.json"), "w", encoding="utf-8") as f:
+        json.dump(image_metadata(n_images, n_papers, seed), f)
+    return {"papers": n_papers, "budget_years": n_years, "images": n_images}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("workdir")
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(generate(args.workdir, args.scale, args.seed))
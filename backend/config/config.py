@@ -1,11 +1,100 @@
 
 
 import os
-from groq import Groq
 from dotenv import load_dotenv
 load_dotenv()
 
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# LLM provider: "groq", or "stub" for a deterministic offline provider (local runs, load tests)
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq")
+LLM_STUB_LATENCY_MS = int(os.getenv("LLM_STUB_LATENCY_MS", "0"))
+LLM_STUB_JITTER_MS = int(os.getenv("LLM_STUB_JITTER_MS", "0"))
+LLM_MODELS = {
+    "chat": os.getenv("LLM_CHAT_MODEL", "llama-3.1-8b-instant"),
+    "kg": os.getenv("LLM_KG_MODEL", "qwen/qwen3-32b"),
+    "vision": os.getenv("LLM_VISION_MODEL", "meta-llama/llama-4-scout-17b-16e-instruct"),
+}
+# Upstream rate limits; 0 disables the limit
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+# Share the limits (and interactive-before-batch priority) between every process on the host
+# (API workers, ingestion scripts) through this SQLite file; 0 keeps a separate budget per process
+LLM_SCHEDULER_SHARED = os.getenv("LLM_SCHEDULER_SHARED", "1") == "1"
+LLM_SCHEDULER_PATH = os.path.join("data", "llm_scheduler.sqlite3")
+
+# Max in-flight LLM requests per worker on the async path
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_CACHE_DIR = os.path.join("data", "embeddings")
+# Encoder inference backend (utils/encoder_backends.py): "torch", "torch-int8", "onnx" or "onnx-int8".
+# Falls back to "torch" when the backend's packages are missing.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+# Quantised graph in the model repo used by "onnx-int8" (pick the one matching your CPU)
+EMBEDDING_ONNX_INT8_FILE = os.getenv("EMBEDDING_ONNX_INT8_FILE", "onnx/model_quint8_avx2.onnx")
+
+# Vector index for paper/image retrieval: "brute" (exact), "ivf" or "hnsw" (approximate).
+VECTOR_INDEX_BACKEND = os.getenv("VECTOR_INDEX_BACKEND", "brute")
+VECTOR_INDEX_DIR = os.path.join(EMBEDDING_CACHE_DIR, "indexes")
+VECTOR_INDEX_PARAMS = {
+    # Brute force can scan compressed vectors (utils/vector_codecs.py): "none" (float32), "float16",
+    # "int8" (per-dimension scalar quantisation) or "pca" (VECTOR_PCA_DIM dimensions), then re-rank
+    # the best VECTOR_RERANK candidates exactly against the float32 embeddings (0 = no re-ranking).
+    "brute": {
+        "compression": os.getenv("VECTOR_COMPRESSION", "none"),
+        "pca_dim": int(os.getenv("VECTOR_PCA_DIM", "128")),
+        "rerank": int(os.getenv("VECTOR_RERANK", "50")),
+    },
+    "ivf": {"n_probe": int(os.getenv("IVF_N_PROBE", "8"))},  # more probes = higher recall
+    "hnsw": {"ef_search": int(os.getenv("HNSW_EF_SEARCH", "64"))},  # higher ef = higher recall
+}
+
+# /search: BM25 over clean_full_text (utils/lexical_index.py) fused with the dense top candidates
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+SEARCH_CANDIDATES = int(os.getenv("SEARCH_CANDIDATES", "100"))  # per ranking, before fusion
+SEARCH_RRF_K = int(os.getenv("SEARCH_RRF_K", "60"))
+
+# LLM completion cache (utils/llm_cache.py): in-memory LRU backed by SQLite
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_PATH = os.path.join("data", "llm_cache.sqlite3")
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+# Endpoints that always call the LLM, e.g. "ask-ai,mission-insight"
+LLM_CACHE_DISABLED_ENDPOINTS = {
+    e.strip() for e in os.getenv("LLM_CACHE_DISABLED_ENDPOINTS", "").split(",") if e.strip()
+}
+
+# /post-mission semantic cache (utils/semantic_cache.py): reuse the result of a prior mission with the
+# same type/phase/objective whose other fields embed within this cosine similarity
+MISSION_CACHE_ENABLED = os.getenv("MISSION_CACHE_ENABLED", "1") == "1"
+MISSION_CACHE_THRESHOLD = float(os.getenv("MISSION_CACHE_THRESHOLD", "0.97"))
+MISSION_CACHE_MAX_ENTRIES = int(os.getenv("MISSION_CACHE_MAX_ENTRIES", "256"))
+MISSION_CACHE_TTL_SECONDS = int(os.getenv("MISSION_CACHE_TTL_SECONDS", "3600"))
+# Numeric mission fields must match exactly unless given a relative tolerance, e.g. "fuel=0.02,payload=0.05"
+MISSION_CACHE_TOLERANCES = {
+    name.strip(): float(tolerance)
+    for name, tolerance in (
+        item.split("=", 1) for item in os.getenv("MISSION_CACHE_TOLERANCES", "").split(",") if "=" in item
+    )
+}
+
+# Per-request sampling profiler (needs pyinstrument): requests with `X-Profile: 1` write an HTML report here
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "0") == "1"
+PROFILE_DIR = os.path.join("data", "profiles")
+
+# PDF reports (utils/pdf_report.py) render in a pool of this many threads, off the event loop;
+# /generate-pdf/bulk accepts at most PDF_BULK_MAX_REPORTS missions per request and renders
+# them in its own pool of PDF_BULK_WORKERS threads, so it never queues ahead of /generate-pdf
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "2"))
+PDF_BULK_WORKERS = max(1, int(os.getenv("PDF_BULK_WORKERS", "1")))
+PDF_BULK_MAX_REPORTS = int(os.getenv("PDF_BULK_MAX_REPORTS", "100"))
+
+# "background": bind right away and warm up in a worker thread (see /ready).
+# "eager": load datasets, model and embeddings at import, before serving.
+# "snapshot": attach to data and embeddings shared by all workers (utils/shared_snapshot.py).
+STARTUP_MODE = os.getenv("STARTUP_MODE", "background")
+# Where "snapshot" mode publishes; a tmpfs such as /dev/shm keeps it in shared memory
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join("data", "snapshot"))
 
 TAB_PROMPTS = {
     "SUMMARY": "Provide a concise summary of recent NASA bioscience research trends.",
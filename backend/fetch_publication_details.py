@@ -1,11 +1,21 @@
 import os
 import json
+import time
+import random
+import argparse
+import threading
 import numpy as np
 import pandas as pd
 import requests
-import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm.auto import tqdm
 from dotenv import load_dotenv
+from utils.rate_limit import TokenBucket
+from utils.jats_parser import iter_articles, parse_articles
+from utils.columnar_store import write_papers, refresh_budget
+from utils.corpus_store import (
+    CorpusManifest, extract_pmc_id, paper_keys, load_processed, diff_corpus, upsert,
+)
 
 load_dotenv()
 
@@ -14,134 +24,278 @@ os.makedirs(DATA_DIR, exist_ok=True)
 
 INPUT_FILE = os.path.join(DATA_DIR, "SB_publication_PMC.csv")
 OUTPUT_FILE = os.path.join(DATA_DIR, "extracted_all_with_sections.csv")
+CHECKPOINT_FILE = os.path.join(DATA_DIR, "fetch_checkpoint.jsonl")
+# Separate so an interrupted incremental refresh resumes without mixing in full-run results
+INCREMENTAL_CHECKPOINT_FILE = os.path.join(DATA_DIR, "fetch_checkpoint.incremental.jsonl")
 
-df = pd.read_csv(INPUT_FILE, header=None, names=["Title", "Link"])
-df = df.dropna(subset=["Title"]).reset_index(drop=True)
-minimized_df = df[1:]  # Skip header row if present
-
-def extract_pmc_id(url):
-    if not isinstance(url, str):
-        return None
-    url = url.strip()
-    if "ncbi.nlm.nih.gov/pmc/articles" in url:
-        parts = url.rstrip("/").split("/")
-        pmc_part = parts[-1]
-        if pmc_part.upper().startswith("PMC"):
-            return pmc_part.upper()
-    return None
-
-def clean_text(raw_text):
-    text = re.sub(r"<.*?>", " ", raw_text)
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
-
-def fetch_pmc_sections(pmc_id):
-    if not pmc_id.startswith("PMC"):
-        pmc_id = "PMC" + str(pmc_id)
+# Point this at a local mock E-utilities server for testing
+EUTILS_BASE_URL = os.getenv("EUTILS_BASE_URL", "https://eutils.ncbi.nlm.nih.gov/entrez/eutils")
+# NCBI allows 3 requests/s without an API key and 10 requests/s with one
+NCBI_API_KEY = os.getenv("NCBI_API_KEY")
 
-    url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
-    params = {"db": "pmc", "id": pmc_id, "retmode": "xml"}
+EMPTY_SECTIONS = {"abstract": "", "conclusion": "", "best_date": ""}
 
-    try:
-        r = requests.get(url, params=params, timeout=10)
+
+def load_publications():
+    df = pd.read_csv(INPUT_FILE, header=None, names=["Title", "Link"])
+    df = df.dropna(subset=["Title"]).reset_index(drop=True)
+    return df[1:]  # Skip header row if present
+
+def efetch(pmc_ids, session=None, timeout=30):
+    """Stream the efetch XML for `pmc_ids` as byte chunks."""
+    params = {"db": "pmc", "id": ",".join(pmc_ids), "retmode": "xml"}
+    if NCBI_API_KEY:
+        params["api_key"] = NCBI_API_KEY
+    with (session or requests).get(f"{EUTILS_BASE_URL}/efetch.fcgi", params=params, timeout=timeout, stream=True) as r:
         r.raise_for_status()
-        xml = r.text
-
-        # Extract abstract
-        abstract = ""
-        match = re.search(r"<abstract[^>]*>(.*?)</abstract>", xml, re.DOTALL | re.IGNORECASE)
-        if match:
-            abstract = clean_text(match.group(1))
-
-        # Extract conclusion
-        conclusion = ""
-        conc_match = re.search(r'<sec[^>]*sec-type="conclusion"[^>]*>(.*?)</sec>', xml, re.DOTALL | re.IGNORECASE)
-        if conc_match:
-            conclusion = clean_text(conc_match.group(1))
-        else:
-            conc_match2 = re.search(r"<sec[^>]*>.*?<title> *Conclusion[s]* *</title>(.*?)</sec>", xml, re.DOTALL | re.IGNORECASE)
-            if conc_match2:
-                conclusion = clean_text(conc_match2.group(1))
-
-        # Extract publication and history dates
-        pub_dates = []
-        for tag, dtype in [
-            (r'<pub-date pub-type="epub">(.*?)</pub-date>', "epub"),
-            (r'<pub-date pub-type="collection">(.*?)</pub-date>', "collection"),
-        ]:
-            match = re.search(tag, xml, re.DOTALL | re.IGNORECASE)
-            if match:
-                date_block = match.group(1)
-                year = re.search(r"<year>(\d+)</year>", date_block)
-                month = re.search(r"<month>(\d+)</month>", date_block)
-                day = re.search(r"<day>(\d+)</day>", date_block)
-                pub_dates.append({
-                    "type": dtype,
-                    "year": year.group(1) if year else "",
-                    "month": month.group(1).zfill(2) if month else "01",
-                    "day": day.group(1).zfill(2) if day else "01",
-                })
-
-        history_dates = []
-        match = re.search(r'<date date-type="accepted">(.*?)</date>', xml, re.DOTALL | re.IGNORECASE)
-        if match:
-            block = match.group(1)
-            year = re.search(r"<year>(\d+)</year>", block)
-            month = re.search(r"<month>(\d+)</month>", block)
-            day = re.search(r"<day>(\d+)</day>", block)
-            history_dates.append({
-                "type": "accepted",
-                "year": year.group(1) if year else "",
-                "month": month.group(1).zfill(2) if month else "01",
-                "day": day.group(1).zfill(2) if day else "01",
-            })
-
-        def get_best_pub_date(pub_dates, history_dates):
-            for d in pub_dates:
-                if d["type"] == "epub":
-                    return f"{d['year']}-{d['month']}-{d['day']}"
-            for d in pub_dates:
-                if d["type"] == "collection":
-                    return f"{d['year']}-{d['month']}-{d['day']}"
-            for d in history_dates:
-                if d["type"] == "accepted":
-                    return f"{d['year']}-{d['month']}-{d['day']}"
-            return ""
-
-        best_date = get_best_pub_date(pub_dates, history_dates)
-
-        return {
-            "abstract": abstract or "",
-            "conclusion": conclusion or "",
-            "best_date": best_date,
-        }
+        yield from r.iter_content(chunk_size=64 * 1024)
+
+def fetch_pmc_sections(pmc_id, all_sections=False):
+    if not pmc_id.startswith("PMC"):
+        pmc_id = "PMC" + str(pmc_id)
 
+    try:
+        for _, sections in iter_articles(efetch([pmc_id], timeout=10), all_sections):
+            return sections
+        return dict(EMPTY_SECTIONS)
     except Exception as e:
         print("Error fetching", pmc_id, e)
-        return {"abstract": "", "conclusion": "", "best_date": ""}
+        return dict(EMPTY_SECTIONS)
+
+def fetch_batch(pmc_ids, session, limiter, retries=4, backoff=1.0, all_sections=False):
+    """
+    Fetch one batch of ids with retry and exponential backoff. Ids missing from
+    a successful response get empty sections; a batch that keeps failing raises.
+    """
+    for attempt in range(retries + 1):
+        limiter.acquire()
+        try:
+            articles = parse_articles(efetch(pmc_ids, session=session), all_sections)
+            return {pmc_id: articles.get(pmc_id, dict(EMPTY_SECTIONS)) for pmc_id in pmc_ids}
+        except requests.RequestException as e:
+            if attempt == retries:
+                raise
+            status = getattr(e.response, "status_code", None)
+            if status is not None and status < 500 and status != 429:
+                raise
+            retry_after = e.response.headers.get("Retry-After") if e.response is not None else None
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else backoff * 2 ** attempt
+            time.sleep(delay + random.uniform(0, backoff))
+
+def load_checkpoint(path=CHECKPOINT_FILE, corpus_version=None):
+    """
+    Sections fetched by an interrupted run. With `corpus_version`, a checkpoint
+    started from another corpus version (i.e. left by a run that completed,
+    whose results are already in the output) is deleted instead of resumed.
+    """
+    done = {}
+    started_from = None
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # half-written line from a crash
+                if "pmc_id" not in record:
+                    started_from = record.get("corpus_version")
+                    continue
+                done[record.pop("pmc_id")] = record
+        if corpus_version is not None and started_from != corpus_version:
+            print(f"🧹 Discarding checkpoint {path} from corpus version {started_from}.")
+            os.remove(path)
+            return {}
+        # Terminate a half-written last line so the next record appended starts on its own line
+        with open(path, "rb+") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size:
+                f.seek(size - 1)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+    return done
+
+def fetch_all(pmc_ids, batch_size=20, concurrency=4, requests_per_second=3.0, retries=4,
+              checkpoint_path=CHECKPOINT_FILE, resume=True, all_sections=False, corpus_version=None):
+    """
+    Fetch sections for every id: batched efetch calls run concurrently under a
+    shared rate limit, and each finished id is appended to a JSONL checkpoint
+    so an interrupted run resumes where it stopped. The checkpoint starts with
+    the `corpus_version` the run is based on and is only resumed from that
+    version. Returns (sections by id, ids whose batch still failed after
+    retries); failed ids are not in the checkpoint, so a rerun fetches them again.
+    """
+    if not resume and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    results = load_checkpoint(checkpoint_path, corpus_version)
+    if not os.path.exists(checkpoint_path):
+        with open(checkpoint_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"corpus_version": corpus_version}) + "\n")
+    todo = [pmc_id for pmc_id in dict.fromkeys(pmc_ids) if pmc_id not in results]
+    if results:
+        print(f"♻️ Resuming: {len(results)} ids already fetched, {len(todo)} to go.")
+
+    batches = [todo[i:i + batch_size] for i in range(0, len(todo), batch_size)]
+    limiter = TokenBucket(requests_per_second * 60, capacity=max(1, requests_per_second))
+    lock = threading.Lock()
+    failed = []
+
+    with requests.Session() as session, ThreadPoolExecutor(max_workers=concurrency) as pool, \
+            open(checkpoint_path, "a", encoding="utf-8") as checkpoint, \
+            tqdm(total=len(todo)) as progress:
+        futures = {pool.submit(fetch_batch, batch, session, limiter, retries, all_sections=all_sections): batch for batch in batches}
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                batch_results = future.result()
+            except Exception as e:
+                print(f"Error fetching batch starting at {batch[0]}: {e}")
+                failed.extend(batch)
+                progress.update(len(batch))
+                continue
+            with lock:
+                for pmc_id, sections in batch_results.items():
+                    checkpoint.write(json.dumps({"pmc_id": pmc_id, **sections}) + "\n")
+                    results[pmc_id] = sections
+                checkpoint.flush()
+            progress.update(len(batch))
 
-print("Fetching abstracts, conclusions & dates...")
-abstracts, conclusions, dates = [], [], []
+    if failed:
+        print(f"⚠️ {len(failed)} ids failed after retries.")
+    return results, failed
 
-for idx, row in tqdm(minimized_df.iterrows(), total=len(minimized_df)):
-    pmc_id = extract_pmc_id(row["Link"])
-    if pmc_id:
-        sections = fetch_pmc_sections(pmc_id)
+def build_output(minimized_df, sections_by_id, all_sections=False):
+    abstracts, conclusions, dates, titled_sections = [], [], [], []
+    for link in minimized_df["Link"]:
+        pmc_id = extract_pmc_id(link)
+        sections = sections_by_id.get(pmc_id, EMPTY_SECTIONS) if pmc_id else EMPTY_SECTIONS
         abstract = sections["abstract"]
         conclusion = sections["conclusion"]
-        best_date = sections["best_date"]
-    else:
-        abstract, conclusion, best_date = "", "", ""
+        abstracts.append(abstract if len(abstract) > 50 else "")
+        conclusions.append(conclusion if len(conclusion) > 20 else "")
+        dates.append(sections["best_date"])
+        titled_sections.append(json.dumps(sections.get("sections", [])))
+
+    minimized_df = minimized_df.copy()
+    minimized_df["abstract"] = abstracts
+    minimized_df["conclusion"] = conclusions
+    minimized_df["date"] = dates
+    if all_sections:
+        minimized_df["sections"] = titled_sections
+    minimized_df["pmc_id"] = minimized_df["Link"].map(extract_pmc_id)
+    return minimized_df
+
+def fetch_sequential(minimized_df, all_sections=False):
+    """Original one-request-per-paper path, kept for comparison."""
+    sections_by_id = {}
+    for idx, row in tqdm(minimized_df.iterrows(), total=len(minimized_df)):
+        pmc_id = extract_pmc_id(row["Link"])
+        if pmc_id:
+            sections_by_id[pmc_id] = fetch_pmc_sections(pmc_id, all_sections)
+    return sections_by_id
+
+def fetch_sections(minimized_df, args, corpus_version, checkpoint_path=CHECKPOINT_FILE):
+    """Returns (sections by PMC id, PMC ids that could not be fetched)."""
+    if args.sequential:
+        return fetch_sequential(minimized_df, args.all_sections), []
+    pmc_ids = [pmc_id for pmc_id in minimized_df["Link"].map(extract_pmc_id) if pmc_id]
+    return fetch_all(
+        pmc_ids,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        requests_per_second=args.rate,
+        retries=args.retries,
+        checkpoint_path=checkpoint_path,
+        resume=not args.no_resume,
+        all_sections=args.all_sections,
+        corpus_version=corpus_version,
+    )
+
+def refresh_full(args):
+    minimized_df = load_publications()
+
+    manifest = CorpusManifest()
+    print("Fetching abstracts, conclusions & dates...")
+    sections_by_id, failed = fetch_sections(minimized_df, args, manifest.current_version)
+
+    # The files are written before the version is recorded, so a crash in between leaves the
+    # manifest (and the checkpoint, which is then still resumed) at the previous version
+    version = manifest.next_version
+    output = build_output(minimized_df, sections_by_id, args.all_sections).assign(ingest_version=version)
+    output.to_csv(OUTPUT_FILE, index=False)
+    write_papers(output)
+    # Failed papers are written with empty sections and retried by the next --incremental run
+    manifest.record("full", added=len(minimized_df), pending=failed)
+    # The output now holds these results; resuming from them would skip the next full refresh's fetches
+    if os.path.exists(CHECKPOINT_FILE):
+        os.remove(CHECKPOINT_FILE)
 
-    abstracts.append(abstract if len(abstract) > 50 else "")
-    conclusions.append(conclusion if len(conclusion) > 20 else "")
-    dates.append(best_date)
+    if failed:
+        print(f"⚠️ {len(failed)} papers have no sections yet; the next --incremental run retries them.")
+    print(f"✅ Saved CSV and Parquet to {OUTPUT_FILE} (corpus version {version})")
 
-minimized_df = minimized_df.copy()
-minimized_df["abstract"] = abstracts
-minimized_df["conclusion"] = conclusions
-minimized_df["date"] = dates
+def refresh_incremental(args):
+    """
+    Fetch only papers that are new to the publication list (or whose title
+    changed, or whose last fetch failed) and upsert them into the processed
+    CSV under a new version. Papers that fail again are left out of the
+    upsert: new ones stay missing and changed ones keep their old row, and
+    both are recorded as pending for the next run.
+    """
+    if not os.path.exists(OUTPUT_FILE):
+        print(f"No {OUTPUT_FILE} yet, running a full refresh.")
+        return refresh_full(args)
 
-minimized_df.to_csv(OUTPUT_FILE, index=False)
+    minimized_df = load_publications()
+    processed_df = load_processed(OUTPUT_FILE)
+    # Keep the optional sections column complete once it exists
+    args.all_sections = args.all_sections or "sections" in processed_df.columns
+
+    manifest = CorpusManifest()
+    source_keys = paper_keys(minimized_df)
+    new, changed, removed = diff_corpus(minimized_df, processed_df)
+    retry = (set(manifest.pending) & set(source_keys)) - new - changed
+    print(f"🔍 {len(new)} new, {len(changed)} changed, {len(removed)} removed papers, {len(retry)} failed last time.")
+    if not new and not changed and not removed and not retry:
+        print("✅ Corpus is up to date.")
+        return
+
+    delta_df = minimized_df[source_keys.isin(new | changed | retry)]
+    print(f"Fetching abstracts, conclusions & dates for {len(delta_df)} papers...")
+    sections_by_id, failed = fetch_sections(delta_df, args, manifest.current_version, INCREMENTAL_CHECKPOINT_FILE)
+    failed = set(failed)
+
+    version = manifest.next_version
+    updated_df = build_output(delta_df[~paper_keys(delta_df).isin(failed)], sections_by_id, args.all_sections)
+    # A new paper with no sections yet has no row to carry over: leave it out until it is fetched
+    output = upsert(minimized_df[~source_keys.isin(failed & new)], processed_df, updated_df, version)
+    output.to_csv(OUTPUT_FILE, index=False)
+    write_papers(output)
+    manifest.record("incremental", added=len(new), changed=len(changed), removed=len(removed), pending=failed)
+    if os.path.exists(INCREMENTAL_CHECKPOINT_FILE):
+        os.remove(INCREMENTAL_CHECKPOINT_FILE)
+    if failed:
+        print(f"⚠️ {len(failed)} papers were not updated; the next --incremental run retries them.")
+
+    print(f"✅ Upserted {len(updated_df)} papers into {OUTPUT_FILE} (corpus version {version})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch abstracts, conclusions and dates from PMC.")
+    parser.add_argument("--batch-size", type=int, default=20, help="PMC ids per efetch request")
+    parser.add_argument("--concurrency", type=int, default=4, help="Batches in flight at once")
+    parser.add_argument("--rate", type=float, default=10.0 if NCBI_API_KEY else 3.0, help="Max efetch requests per second")
+    parser.add_argument("--retries", type=int, default=4, help="Retries per batch on network errors, 429 and 5xx")
+    parser.add_argument("--no-resume", action="store_true", help="Ignore the checkpoint and fetch everything again")
+    parser.add_argument("--all-sections", action="store_true", help="Also store every titled body section as a JSON column")
+    parser.add_argument("--incremental", action="store_true", help="Only fetch papers not yet in the processed CSV and upsert them")
+    parser.add_argument("--sequential", action="store_true", help="Use the original one-request-per-paper path")
+    args = parser.parse_args()
+
+    if args.incremental:
+        refresh_incremental(args)
+    else:
+        refresh_full(args)
+    # The API reads the budget from Parquet too; convert it here rather than on the first request
+    refresh_budget()
 
-print(f"✅ Saved CSV to {OUTPUT_FILE}")
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,38 @@
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 import pandas as pd
 import numpy as np
-import re
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-from fastapi.responses import JSONResponse
-import os
+from fastapi.responses import JSONResponse, PlainTextResponse
 from itertools import product
-from fastapi import FastAPI, HTTPException
-from groq import Groq
-from config.config import groq_client, TAB_PROMPTS, category_names, category_texts, tooltips
+from config.config import (
+    TAB_PROMPTS, tooltips, STARTUP_MODE, PROFILER_ENABLED, PROFILE_DIR, PDF_BULK_MAX_REPORTS,
+    SEARCH_CANDIDATES, SEARCH_RRF_K,
+    MISSION_CACHE_ENABLED, MISSION_CACHE_THRESHOLD, MISSION_CACHE_MAX_ENTRIES, MISSION_CACHE_TTL_SECONDS,
+    MISSION_CACHE_TOLERANCES,
+)
 from models.request_models import AskAIRequest
-from utils.df_utils import clean_text, generate_budget_summary_with_trends, generate_df_summary
+from utils.df_utils import generate_budget_summary_with_trends, generate_df_summary
 from models.mission_request import MissionRequest, MissionData, Paper
-from utils.LLM_utils import generate_mission_summary, parse_markdown
+from utils.LLM_utils import (
+    agenerate_mission_summary, achat_completion, astream_chat_completion,
+    llm_cache, provider, scheduler,
+)
+from utils.sse import sse_event, sse_response
+from utils.app_state import AppState
+from utils.paper_catalog import encode_cursor, decode_cursor
+from utils.http_cache import ResponseCache
+from utils.semantic_cache import SemanticCache, mission_key, mission_numbers, mission_text
+from utils.metrics import MetricsMiddleware, registry, timed
+from utils.pdf_report import arender_report, stream_report_zip
+from utils.lexical_index import highlight, highlight_title
+from utils.hybrid_search import FUSIONS, hybrid_rank
+from utils.vector_index import top_k_indices
 from io import BytesIO
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_LEFT
 from fastapi.responses import StreamingResponse
-import json
+import asyncio
+from typing import List, Optional
+from functools import lru_cache
+from fastapi.concurrency import run_in_threadpool
 from dotenv import load_dotenv
 load_dotenv()
 from fastapi.staticfiles import StaticFiles
@@ -37,65 +47,67 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware, profile_dir=PROFILE_DIR if PROFILER_ENABLED else None)
 
 app.mount("/paper_images", StaticFiles(directory="./data/paper_images"), name="paper_images")
 
-DATA_DIR = "data"
-
-INPUT_FILE = os.path.join(DATA_DIR, "extracted_all_with_sections.csv")
-df = pd.read_csv(INPUT_FILE)
-
-df["clean_full_text"] = (
-    df["Title"].fillna("")
-    + " "
-    + df["abstract"].fillna("")
-    + " "
-    + df["conclusion"].fillna("")
-).apply(clean_text)
+state = AppState()
+response_cache = ResponseCache()
+mission_cache = (
+    SemanticCache(MISSION_CACHE_THRESHOLD, MISSION_CACHE_MAX_ENTRIES, MISSION_CACHE_TTL_SECONDS, MISSION_CACHE_TOLERANCES)
+    if MISSION_CACHE_ENABLED else None
+)
 
-df["date"] = pd.to_datetime(df["date"], errors="coerce")
-df["year"] = df["date"].dt.year
-df['date'] = df['date'].astype(str)
+if STARTUP_MODE == "eager":
+    # Old behaviour: build everything before the app is importable.
+    state.warm_up()
 
-print("🚀 Loading SentenceTransformer model...")
-embedding_model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
 
-print("🔬 Generating category embeddings...")
-category_embeddings = embedding_model.encode(category_texts, convert_to_numpy=True)
+@app.on_event("startup")
+async def start_warm_up():
+    if STARTUP_MODE == "snapshot":
+        # Several workers: share one published copy of the data and embeddings.
+        asyncio.get_running_loop().run_in_executor(None, state.warm_up_from_snapshot)
+    elif STARTUP_MODE != "eager":
+        # Bind immediately and build heavy state off the event loop.
+        asyncio.get_running_loop().run_in_executor(None, state.warm_up)
 
-print("🧠 Generating paper embeddings...")
-text_embeddings = embedding_model.encode(df["clean_full_text"].tolist(), convert_to_numpy=True)
 
-print("🪐 Performing semantic categorization...")
-similarities = cosine_similarity(text_embeddings, category_embeddings)
-best_idxs = np.argmax(similarities, axis=1)
-df["primary_category"] = [category_names[i] for i in best_idxs]
+def require_stages(*stages):
+    """Raise 503 until the given warm-up stages are ready."""
+    if not state.is_ready(*stages):
+        pending = [s for s in stages if state.stages[s]["status"] != "ready"]
+        raise HTTPException(
+            status_code=503,
+            detail=f"Service warming up, waiting for: {', '.join(pending)}",
+            headers={"Retry-After": "5"},
+        )
 
 
-IMAGE_METADATA_FILE = "./data/paper_images_metadata.json"
+def require_dataset(dataset):
+    if dataset not in DATASET_STAGES:
+        raise HTTPException(status_code=400, detail="Invalid dataset specified.")
+    require_stages(*DATASET_STAGES[dataset])
 
-with open(IMAGE_METADATA_FILE, "r", encoding="utf-8") as f:
-    all_images_metadata = json.load(f)
 
-# Compute embeddings for caption + description
-image_texts = [
-    (f"{img['caption']} {img.get('description', '')}").strip()
-    for img in all_images_metadata
-]
+# Warm-up stages each dataset needs before it can be served.
+DATASET_STAGES = {
+    "nasa-budget": ["dataset"],
+    "bioscience": ["dataset", "paper_embeddings"],
+}
 
-print(f"🔹 Generating embeddings for {len(image_texts)} images...")
-image_embeddings = embedding_model.encode(image_texts, convert_to_numpy=True)
-print("✅ Image embeddings ready.")
 
-def get_top_images(mission_summary, top_k=3):
-    mission_embedding = embedding_model.encode(mission_summary, convert_to_numpy=True)
+def get_top_images(mission_summary, top_k=3, mission_embedding=None):
+    if mission_embedding is None:
+        with timed("mission.query_encoding"):
+            mission_embedding = state.get_model().encode(mission_summary, convert_to_numpy=True)
 
-    similarities = cosine_similarity(image_embeddings, mission_embedding.reshape(1, -1)).flatten()
-    top_idxs = np.argsort(similarities)[::-1][:top_k]
+    with timed("mission.image_search"):
+        top_idxs, _ = state.image_index.search(mission_embedding, top_k)
 
     top_images = []
     for idx in top_idxs:
-        img = all_images_metadata[idx]
+        img = state.all_images_metadata[idx]
         image_url = f"/paper_images/{img['image'].split('/')[-1]}"  # relative URL for frontend
         top_images.append({
             "image": image_url,
@@ -106,38 +118,172 @@ def get_top_images(mission_summary, top_k=3):
 
     return top_images
 
-# Load NASA budget data
-BUDGET_FILE = os.path.join(DATA_DIR, "NASABudgetMilestonesDataset.csv")
-df_nasa_budget = pd.read_csv(
-    BUDGET_FILE,
-    quotechar='"',
-    encoding="utf-8-sig",
-    engine="python"
-)
-
-if "Total Budget" in df_nasa_budget.columns:
-    df_nasa_budget["Deviation"] = df_nasa_budget["Total Budget"].pct_change().fillna(0) * 100
-
-DATASETS = {
-    "nasa-budget": df_nasa_budget,
-    "bioscience": df,
-}
-
 @app.get("/health")
 def read_root():
     return {"message": "Welcome to the NASA Bioscience API"}
 
+@app.get("/ready")
+def ready():
+    """Report warm-up progress per stage; 503 until every stage is ready."""
+    status = state.status()
+    return JSONResponse(content=status, status_code=200 if status["ready"] else 503)
+
+@app.get("/cache-stats")
+def cache_stats():
+    """Hit/miss counters for the HTTP response, mission result and LLM completion caches."""
+    return {
+        "responses": response_cache.stats(),
+        "missions": mission_cache.stats() if mission_cache is not None else None,
+        "llm": llm_cache.stats() if llm_cache is not None else None,
+    }
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text format: request counts/latency per route, pipeline stages, LLM calls and tokens, warm-up."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/llm-stats")
+def llm_stats():
+    """LLM provider in use and rate-limit scheduler queueing metrics."""
+    return {"provider": provider.name, "scheduler": scheduler.stats()}
+
 @app.get("/papers")
-def get_all_papers():
-    """Return all paper data."""
-    clean_df = df.replace({np.nan: None})
-    clean_df = clean_df.drop(columns=["clean_full_text"])
-    return JSONResponse(content=clean_df.to_dict(orient="records"))
+def get_all_papers(
+    request: Request,
+    offset: int = Query(0, ge=0, description="Number of matching papers to skip"),
+    limit: int = Query(20, ge=1, le=500, description="Page size"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page (overrides offset)"),
+    category: Optional[str] = Query(None, description="Filter on primary_category"),
+    year_from: Optional[int] = Query(None, description="First publication year to include"),
+    year_to: Optional[int] = Query(None, description="Last publication year to include"),
+    q: Optional[str] = Query(None, description="Case-insensitive substring of the title, abstract or conclusion"),
+    since_version: Optional[int] = Query(None, description="Only papers added or updated after this corpus version"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. Title,Link,primary_category,year"),
+):
+    """Return one page of paper data, filtered and optionally projected."""
+    require_dataset("bioscience")
+    catalog = state.paper_catalog
+
+    if cursor:
+        try:
+            offset = decode_cursor(cursor)
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+    field_list = None
+    if fields:
+        field_list = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in field_list if f not in catalog.fields]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    def build():
+        total, items = catalog.query(
+            offset=offset,
+            limit=limit,
+            category=category,
+            year_from=year_from,
+            year_to=year_to,
+            q=q,
+            since_version=since_version,
+            fields=field_list,
+        )
+        next_offset = offset + len(items)
+        return {
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "next_cursor": encode_cursor(next_offset) if next_offset < total else None,
+            "categories": catalog.categories,
+            "items": items,
+        }
+
+    return response_cache.respond(request, state.dataset_version, build)
+
+@app.get("/papers/{paper_id}")
+def get_paper(request: Request, paper_id: int):
+    """Return the full record (abstract and conclusion included) for one paper."""
+    require_dataset("bioscience")
+    paper = state.paper_catalog.get(paper_id)
+    if paper is None:
+        raise HTTPException(status_code=404, detail="Paper not found.")
+    return response_cache.respond(request, state.dataset_version, lambda: paper)
+
+SEARCH_FIELDS = ["id", "Title", "Link", "primary_category", "year"]
+# Text the highlight snippets are cut from
+SNIPPET_FIELDS = ["abstract", "conclusion"]
+
+@app.get("/search")
+def search_papers(
+    request: Request,
+    q: str = Query(..., min_length=1, description="Free-text query; exact terms (organisms, genes, missions) match lexically"),
+    k: int = Query(10, ge=1, le=100, description="Number of results"),
+    mode: str = Query("hybrid", description="hybrid, lexical (BM25 only) or semantic (embeddings only)"),
+    fusion: str = Query("rrf", description="rrf (reciprocal rank) or weighted, for hybrid mode"),
+    alpha: float = Query(0.5, ge=0, le=1, description="Weight of the semantic score in weighted fusion"),
+):
+    """Top-k papers for a query with BM25 / cosine scores and highlighted snippets."""
+    if mode not in ("hybrid", "lexical", "semantic"):
+        raise HTTPException(status_code=400, detail="mode must be hybrid, lexical or semantic.")
+    if fusion not in FUSIONS:
+        raise HTTPException(status_code=400, detail=f"fusion must be one of {', '.join(FUSIONS)}.")
+    require_dataset("bioscience")
+    require_stages("lexical_index", *(["model"] if mode != "lexical" else []))
+
+    def build():
+        lexical_index = state.lexical_index
+        with timed("search.lexical"):
+            lexical_scores = lexical_index.scores(q)
+        if mode == "lexical":
+            matches = np.flatnonzero(lexical_scores)
+            ids = matches[top_k_indices(lexical_scores[matches], k)]
+            ranked = [(int(i), float(lexical_scores[i]), float(lexical_scores[i]), None) for i in ids]
+        else:
+            with timed("search.query_encoding"):
+                query_vector = state.get_model().encode(q, convert_to_numpy=True)
+            with timed("search.semantic"):
+                semantic_ids, semantic_scores = state.paper_index.search(query_vector, SEARCH_CANDIDATES)
+            if mode == "semantic":
+                ranked = [(int(i), float(s), float(lexical_scores[i]), float(s)) for i, s in zip(semantic_ids[:k], semantic_scores[:k])]
+            else:
+                with timed("search.fusion"):
+                    ranked = hybrid_rank(
+                        lexical_scores, semantic_ids, query_vector, state.text_embeddings, k,
+                        candidates=SEARCH_CANDIDATES, fusion=fusion, alpha=alpha, rrf_k=SEARCH_RRF_K,
+                    )
+
+        terms = lexical_index.query_terms(q)
+        papers = state.paper_catalog.records([idx for idx, *_ in ranked], SEARCH_FIELDS + SNIPPET_FIELDS)
+        results = []
+        for paper, (_, score, lexical, semantic) in zip(papers, ranked):
+            results.append({
+                **{f: paper[f] for f in SEARCH_FIELDS},
+                "score": round(score, 6),
+                "lexical_score": round(lexical, 4),
+                "semantic_score": round(semantic, 4) if semantic is not None else None,
+                "highlights": {
+                    "title": highlight_title(paper["Title"], terms),
+                    "snippets": highlight(" ".join(filter(None, [paper[f] for f in SNIPPET_FIELDS])), terms),
+                },
+            })
+        return {
+            "query": q,
+            "mode": mode,
+            "fusion": fusion if mode == "hybrid" else None,
+            "lexical_matches": int(np.count_nonzero(lexical_scores)),
+            "results": results,
+        }
+
+    return response_cache.respond(request, state.dataset_version, build)
 
 @app.get("/research-evolution")
-def get_research_evolution():
+def get_research_evolution(request: Request):
     """Return category evolution over time with zero-filled missing categories."""
-    evolution = df.groupby(["year", "primary_category"]).size().reset_index(name="count")
+    require_dataset("bioscience")
+    return response_cache.respond(request, state.dataset_version, lambda: build_research_evolution(state.df))
+
+def build_research_evolution(df):
+    evolution = df.groupby(["year", "primary_category"], observed=True).size().reset_index(name="count")
 
     all_years = df['year'].dropna().unique()
     all_categories = df['primary_category'].unique()
@@ -152,61 +298,26 @@ def get_research_evolution():
     # Pivot so each row is a year, each column is a category
     pivot_df = merged.pivot(index="year", columns="primary_category", values="count").reset_index()
 
-    return JSONResponse(content=pivot_df.to_dict(orient="records"))
+    return pivot_df.to_dict(orient="records")
 
-@app.get("/ai-tabs")
-def get_ai_tabs(dataset: str = Query("bioscience", description="Dataset to use")):
-    if dataset not in DATASETS:
-        raise HTTPException(status_code=400, detail="Invalid dataset specified.")
-    if dataset == "nasa-budget":
-        df_summary = generate_budget_summary_with_trends(DATASETS[dataset])
-        df_summary = "NASA Budget Data Summary:\n\n" + df_summary + "\n\nall the numbers under program columns are in millions of dollars, and the \"Total Budget\" column sums all program allocations (roughly matches the sum of the columns)."
-    else:
-        df_summary = generate_df_summary(DATASETS[dataset])
-        df_summary = "NASA Bioscience Data Summary:\n\n" + df_summary + "\n\nAll the numbers are counts of research papers."
-
-        
-    tab_results = {}
-    for tab, prompt in TAB_PROMPTS.items():
-        full_prompt = f"""
-                Answer the following question based on the data:
-                {prompt}
-
-                {df_summary} 
+def data_summary(dataset):
+    """Data summary used in the AI prompts; rebuilt only when the dataset version changes."""
+    return _data_summary(dataset, state.dataset_version)
 
-                Provide answer within 100 words. Return only the answer, no other text. 
-                Do not mention the data source. 
-                Don't add any disclaimers or commentary.
-                """
-        try:
-            response_summary = groq_client.chat.completions.create(
-                    model="llama-3.1-8b-instant",
-                    messages=[
-                        {"role": "user", "content": full_prompt}
-                    ]
-                )
-            content = response_summary.choices[0].message.content.strip()
-
-            tab_results[tab] = content
-        except Exception as e:
-            tab_results[tab] = f"Error fetching AI content: {str(e)}"
-    return JSONResponse(content=tab_results)
-
-@app.post("/ask-ai")
-def ask_ai(request: AskAIRequest, dataset: str = Query("bioscience", description="Dataset to use")):
-    if dataset not in DATASETS:
-        raise HTTPException(status_code=400, detail="Invalid dataset specified.")
+@lru_cache(maxsize=8)
+def _data_summary(dataset, version):
     if dataset == "nasa-budget":
-        df_summary = generate_budget_summary_with_trends(DATASETS[dataset])
+        df_summary = generate_budget_summary_with_trends(state.datasets[dataset])
         df_summary = "NASA Budget Data Summary:\n\n" + df_summary + "\n\nall the numbers under program columns are in millions of dollars, and the \"Total Budget\" column sums all program allocations (roughly matches the sum of the columns)."
     else:
-        df_summary = generate_df_summary(DATASETS[dataset])
+        df_summary = generate_df_summary(state.datasets[dataset])
         df_summary = "NASA Bioscience Data Summary:\n\n" + df_summary + "\n\nAll the numbers are counts of research papers."
+    return df_summary
 
-    user_question = request.question
-    full_prompt = f"""
+def data_question_prompt(question, df_summary):
+    return f"""
         Answer the following question based on the data:
-        {user_question}
+        {question}
 
         {df_summary} 
 
@@ -214,42 +325,62 @@ def ask_ai(request: AskAIRequest, dataset: str = Query("bioscience", description
         Do not mention the data source. 
         Don't add any disclaimers or commentary.
         """
+
+@app.get("/ai-tabs")
+async def get_ai_tabs(dataset: str = Query("bioscience", description="Dataset to use")):
+    require_dataset(dataset)
+    df_summary = await run_in_threadpool(data_summary, dataset)
+
+    async def fetch_tab(prompt):
+        # Each tab fails on its own; the others are still returned
+        try:
+            return await achat_completion(data_question_prompt(prompt, df_summary), endpoint="ai-tabs")
+        except Exception as e:
+            return f"Error fetching AI content: {str(e)}"
+
+    contents = await asyncio.gather(*(fetch_tab(prompt) for prompt in TAB_PROMPTS.values()))
+    tab_results = dict(zip(TAB_PROMPTS.keys(), contents))
+    return JSONResponse(content=tab_results)
+
+@app.post("/ask-ai")
+async def ask_ai(
+    request: AskAIRequest,
+    dataset: str = Query("bioscience", description="Dataset to use"),
+    stream: bool = Query(False, description="Stream the answer as Server-Sent Events"),
+):
+    require_dataset(dataset)
+    df_summary = await run_in_threadpool(data_summary, dataset)
+
+    full_prompt = data_question_prompt(request.question, df_summary)
+    if stream:
+        return sse_response(stream_answer(full_prompt))
     try:
-        response_summary = groq_client.chat.completions.create(
-                    model="llama-3.1-8b-instant",
-                    messages=[
-                        {"role": "user", "content": full_prompt}
-                    ]
-                )
-        content = response_summary.choices[0].message.content.strip()
+        content = await achat_completion(full_prompt, endpoint="ask-ai")
         return JSONResponse(content={"answer": content})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI request failed: {str(e)}")
 
+async def stream_answer(full_prompt):
+    """SSE events for /ask-ai: `token` per delta, then `done` with the full answer."""
+    parts = []
+    try:
+        async for delta in astream_chat_completion(full_prompt, endpoint="ask-ai"):
+            parts.append(delta)
+            yield sse_event("token", {"text": delta})
+    except Exception as e:
+        yield sse_event("error", {"detail": f"AI request failed: {str(e)}"})
+        return
+    yield sse_event("done", {"answer": "".join(parts).strip()})
+
 @app.get("/nasa-budget")
-def nasa_budget():
+def nasa_budget(request: Request):
     """Return NASA budget data as JSON for React charts"""
-    return df_nasa_budget.to_dict(orient="records")
-
-@app.post("/post-mission")
-def post_mission(request: MissionRequest):
-    mission_data = request.mission
-
-    # Generate mission summary
-    mission_summary = generate_mission_summary(mission_data)
-
-    # Compute mission embedding
-    mission_embedding = embedding_model.encode(mission_summary, convert_to_numpy=True)
-
-    # Get top papers
-    similarities = cosine_similarity(text_embeddings, mission_embedding.reshape(1, -1)).flatten()
-    top_idxs = np.argsort(similarities)[::-1][:5]
-    top_papers = df.iloc[top_idxs].to_dict(orient="records")
-    top_scores = similarities[top_idxs].tolist()
+    require_dataset("nasa-budget")
+    return response_cache.respond(request, state.dataset_version, lambda: state.df_nasa_budget.to_dict(orient="records"))
 
-    # LLM insights
+def mission_insight_prompt(top_papers, mission_summary):
     paper_content = "\n\n".join([paper.get("clean_full_text", "") for paper in top_papers])
-    groq_input = f"""
+    return f"""
     You are given a set of research papers:
 
     {paper_content}
@@ -264,14 +395,20 @@ def post_mission(request: MissionRequest):
     - Provide insights relevant to the mission.
     - Return the insights as a numbered list in Markdown format.
     """
-    response_summary = groq_client.chat.completions.create(
-        model="llama-3.1-8b-instant",
-        messages=[{"role": "user", "content": groq_input}]
-    )
-    mission_insight = response_summary.choices[0].message.content.strip()
+
+def retrieve_for_mission(mission_summary):
+    """Encode the mission summary and look up the top papers and images (CPU-bound)."""
+    with timed("mission.query_encoding"):
+        mission_embedding = state.get_model().encode(mission_summary, convert_to_numpy=True)
+
+    # Get top papers
+    with timed("mission.paper_search"):
+        top_idxs, top_scores = state.paper_index.search(mission_embedding, 5)
+    top_papers = state.df.iloc[top_idxs].to_dict(orient="records")
+    top_scores = top_scores.tolist()
 
     # Get top images
-    top_images = get_top_images(mission_summary, top_k=3)
+    top_images = get_top_images(mission_summary, top_k=3, mission_embedding=mission_embedding)
 
     results = [
         {
@@ -281,75 +418,151 @@ def post_mission(request: MissionRequest):
         }
         for paper, score in zip(top_papers, top_scores)
     ]
+    return top_papers, results, top_images
 
-    return JSONResponse(content={
+def mission_cache_lookup(mission_data, bypass):
+    """
+    Embed the mission for the semantic cache and look it up (CPU-bound).
+    Returns (key, vector, cache metadata, cached result or None).
+    """
+    key = mission_key(mission_data, state.dataset_version)
+    with timed("mission.cache_lookup"):
+        vector = state.get_model().encode(mission_text(mission_data), convert_to_numpy=True)
+    if bypass:
+        mission_cache.bypass()
+        return key, vector, {"hit": False, "bypassed": True}, None
+    cached, similarity, age = mission_cache.lookup(key, vector, mission_numbers(mission_data))
+    if cached is None:
+        best = round(similarity, 4) if similarity is not None else None
+        return key, vector, {"hit": False, "best_similarity": best}, None
+    meta = {
+        "hit": True,
+        "similarity": round(similarity, 4),
+        "age_seconds": round(age, 1),
+        "cached_mission": cached["mission"],
+    }
+    return key, vector, meta, cached
+
+def mission_response(mission_data, mission_insight, results, top_images, cache_meta):
+    return {
         "message": "Mission processed successfully",
         "mission": mission_data,
         "mission_insight": mission_insight,
         "top_papers": results,
-        "top_images": top_images
-    })
+        "top_images": top_images,
+        "cache": cache_meta,
+    }
 
-@app.post("/generate-pdf")
-async def generate_pdf(data: MissionData):
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        rightMargin=30,
-        leftMargin=30,
-        topMargin=30,
-        bottomMargin=18
-    )
-    styles = getSampleStyleSheet()
-    normal = styles['Normal']
-    normal.alignment = TA_LEFT
-    elements = []
-
-    # Title
-    elements.append(Paragraph("Mission Details", styles['Title']))
-    elements.append(Spacer(1, 12))
-
-    # Mission Information
-    elements.append(Paragraph("Mission Information:", styles['Heading2']))
-    for key, val in data.mission.items():
-        elements.append(Paragraph(f"<b>{key}:</b> {val}", normal))
-    elements.append(Spacer(1, 12))
-
-    # Mission Insights
-    elements.append(Paragraph("Mission Insights:", styles['Heading2']))
-    mission_insight = data.insights.get("missionInsight") or "No insights available."
-    mission_insight = parse_markdown(mission_insight)
-    elements.append(Paragraph(mission_insight, normal))
-    elements.append(Spacer(1, 12))
-
-    # Relevant Publications
-    elements.append(Paragraph("Relevant Publications:", styles['Heading2']))
-    if data.topPapers:
-        for paper in data.topPapers:
-            if paper.link:
-                elements.append(
-                    Paragraph(f'<a href="{paper.link}">{paper.title}</a>', normal)
-                )
-            else:
-                elements.append(Paragraph(paper.title, normal))
-            elements.append(Spacer(1, 2))
-    else:
-        elements.append(Paragraph("No relevant publications found.", normal))
-    elements.append(Spacer(1, 12))
+@app.post("/post-mission")
+async def post_mission(
+    request: MissionRequest,
+    stream: bool = Query(False, description="Stream stage results and insight tokens as Server-Sent Events"),
+    bypass_cache: bool = Query(False, description="Skip the semantic mission cache; the fresh result still replaces it"),
+):
+    require_stages("dataset", "paper_embeddings", "image_embeddings", "model")
+    mission_data = request.mission
+
+    # Near-identical missions (same type/phase/objective) reuse a prior result: no LLM calls, no retrieval
+    cache_key = cache_vector = cached = None
+    cache_meta = {"hit": False, "enabled": False}
+    if mission_cache is not None:
+        cache_key, cache_vector, cache_meta, cached = await run_in_threadpool(
+            mission_cache_lookup, mission_data, bypass_cache
+        )
 
-    # Tooltips / Notes
-    if data.tooltips:
-        elements.append(Paragraph("Tooltips / Notes:", styles['Heading2']))
-        for key, val in data.tooltips.items():
-            elements.append(Paragraph(f"<b>{key}:</b> {val}", normal))
-        elements.append(Spacer(1, 12))
+    if stream:
+        return sse_response(stream_mission(mission_data, cache_key, cache_vector, cache_meta, cached))
 
-    doc.build(elements)
-    buffer.seek(0)
+    if cached is not None:
+        return JSONResponse(content=mission_response(
+            mission_data, cached["mission_insight"], cached["top_papers"], cached["top_images"], cache_meta
+        ))
 
+    # Generate mission summary
+    with timed("mission.summary"):
+        mission_summary = await agenerate_mission_summary(mission_data)
+
+    # Encoding and vector search run in the threadpool so the event loop stays free
+    with timed("mission.retrieval"):
+        top_papers, results, top_images = await run_in_threadpool(retrieve_for_mission, mission_summary)
+
+    # LLM insights
+    with timed("mission.insight"):
+        mission_insight = await achat_completion(
+            mission_insight_prompt(top_papers, mission_summary), endpoint="mission-insight"
+        )
+
+    if cache_key is not None:
+        mission_cache.add(cache_key, cache_vector, {
+            "mission": mission_data, "mission_insight": mission_insight, "top_papers": results, "top_images": top_images,
+        }, mission_numbers(mission_data))
+    return JSONResponse(content=mission_response(mission_data, mission_insight, results, top_images, cache_meta))
+
+async def stream_mission(mission_data, cache_key=None, cache_vector=None, cache_meta=None, cached=None):
+    """
+    SSE events for /post-mission, sent as each stage finishes: `summary`,
+    `top_papers`, `top_images`, one `token` per insight delta, then `done`
+    with the same payload the non-streaming endpoint returns. A cache hit
+    skips `summary` and sends the whole insight as one `token`.
+    """
+    if cached is not None:
+        yield sse_event("top_papers", cached["top_papers"])
+        yield sse_event("top_images", cached["top_images"])
+        yield sse_event("token", {"text": cached["mission_insight"]})
+        yield sse_event("done", mission_response(
+            mission_data, cached["mission_insight"], cached["top_papers"], cached["top_images"], cache_meta
+        ))
+        return
+
+    try:
+        with timed("mission.summary"):
+            mission_summary = await agenerate_mission_summary(mission_data)
+        yield sse_event("summary", {"mission_summary": mission_summary})
+
+        with timed("mission.retrieval"):
+            top_papers, results, top_images = await run_in_threadpool(retrieve_for_mission, mission_summary)
+        yield sse_event("top_papers", results)
+        yield sse_event("top_images", top_images)
+
+        parts = []
+        # Includes the time the client takes to read the stream
+        with timed("mission.insight"):
+            async for delta in astream_chat_completion(
+                mission_insight_prompt(top_papers, mission_summary), endpoint="mission-insight"
+            ):
+                parts.append(delta)
+                yield sse_event("token", {"text": delta})
+    except Exception as e:
+        yield sse_event("error", {"detail": f"Mission processing failed: {str(e)}"})
+        return
+
+    mission_insight = "".join(parts).strip()
+    if cache_key is not None:
+        mission_cache.add(cache_key, cache_vector, {
+            "mission": mission_data, "mission_insight": mission_insight, "top_papers": results, "top_images": top_images,
+        }, mission_numbers(mission_data))
+    yield sse_event("done", mission_response(
+        mission_data, mission_insight, results, top_images, cache_meta or {"hit": False, "enabled": False}
+    ))
+
+@app.post("/generate-pdf")
+async def generate_pdf(data: MissionData):
+    pdf = await arender_report(data)
     return StreamingResponse(
-        buffer,
+        BytesIO(pdf),
         media_type="application/pdf",
         headers={"Content-Disposition": "attachment; filename=mission-details.pdf"}
-    )
\ No newline at end of file
+    )
+
+@app.post("/generate-pdf/bulk")
+async def generate_pdf_bulk(missions: List[MissionData]):
+    """ZIP of one report per mission, streamed as the reports finish rendering."""
+    if not missions:
+        raise HTTPException(status_code=400, detail="No missions given.")
+    if len(missions) > PDF_BULK_MAX_REPORTS:
+        raise HTTPException(status_code=413, detail=f"At most {PDF_BULK_MAX_REPORTS} missions per request.")
+    return StreamingResponse(
+        stream_report_zip(missions),
+        media_type="application/zip",
+        headers={"Content-Disposition": "attachment; filename=mission-reports.zip"}
+    )
@@ -1,18 +1,34 @@
 import os
 import fitz  # PyMuPDF
 from pathlib import Path
-from PIL import Image
-import io
 import json
 import re
+import time
 import base64
-from config.config import groq_client
+import asyncio
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from config.config import LLM_MODELS
+from utils.LLM_utils import achat_completion, BATCH
+from utils.image_manifest import ImageManifest, file_sha256, image_fingerprint
 
 PDF_FOLDER = "./data/papers"
 IMAGE_FOLDER = "./data/paper_images"
 OUTPUT_JSON = "./data/paper_images_metadata.json"
+ERRORS_JSON = "./data/paper_images_errors.json"
+MANIFEST_JSON = "./data/paper_images_manifest.json"
 
-os.makedirs(IMAGE_FOLDER, exist_ok=True)
+MIN_IMAGE_SIZE = 200  # px; smaller images are icons/decorations
+IMAGE_EXTENSIONS = {"png": "png", "jpg": "jpeg", "jpeg": "jpeg", "tiff": "tiff"}
+
+DESCRIBE_PROMPT = (
+    "You are an expert at interpreting scientific figures. "
+    "Describe this image in a detailed, structured way suitable for semantic search. "
+    "Include: 1) main objects/components, "
+    "2) relationships/interactions, "
+    "3) patterns, trends, or anomalies, "
+    "4) textual elements like labels or axes."
+)
 
 
 def extract_nearby_caption(page_text, image_index):
@@ -22,93 +38,235 @@ def extract_nearby_caption(page_text, image_index):
             return line.strip()
     return ""  # fallback if no caption found
 
-def encode_image(img_path):
-    """Convert image to base64 string for Groq LLM."""
-    with open(img_path, "rb") as f:
-        return base64.b64encode(f.read()).decode("utf-8")
-
-all_images_metadata = []
-
-pdf_files = [f for f in os.listdir(PDF_FOLDER) if f.lower().endswith(".pdf")]
-
-for pdf_file in pdf_files:
-    pdf_path = os.path.join(PDF_FOLDER, pdf_file)
+def extract_pdf_images(pdf_path):
+    """
+    Stage 1 (runs in a worker process): pull every usable image out of one PDF.
+    Returns (images, errors); images keep their bytes in memory.
+    """
+    pdf_file = os.path.basename(pdf_path)
+    images, errors = [], []
     try:
         doc = fitz.open(pdf_path)
     except Exception as e:
-        print(f"⚠️ Failed to open {pdf_file}: {e}")
-        continue
+        return images, [{"pdf": pdf_file, "page": None, "image": None, "stage": "open", "error": str(e)}]
+
+    with doc:
+        for page_index in range(len(doc)):
+            page = doc[page_index]
+            page_text = page.get_text()
+            for img_index, img_info in enumerate(page.get_images(full=True)):
+                try:
+                    base_image = doc.extract_image(img_info[0])
+                    image_bytes = base_image.get("image")
+                    if not image_bytes:
+                        continue
+                    if base_image.get("width", 0) < MIN_IMAGE_SIZE or base_image.get("height", 0) < MIN_IMAGE_SIZE:
+                        continue  # skip tiny images
+                    ext = base_image.get("ext", "png").lower()
+                    if ext not in IMAGE_EXTENSIONS:
+                        continue
+                    sha256, dhash, _, _ = image_fingerprint(image_bytes)
+                    images.append({
+                        "pdf": pdf_file,
+                        "page": page_index + 1,
+                        "index": img_index + 1,
+                        "ext": ext,
+                        "bytes": image_bytes,
+                        "sha256": sha256,
+                        "dhash": dhash,
+                        "width": base_image["width"],
+                        "height": base_image["height"],
+                        "caption": extract_nearby_caption(page_text, img_index),
+                    })
+                except Exception as e:
+                    errors.append({"pdf": pdf_file, "page": page_index + 1, "image": img_index + 1,
+                                   "stage": "extract", "error": str(e)})
+    return images, errors
+
+def describe_messages(image):
+    """Stage 2: base64 the in-memory bytes (no write/re-read round trip) into a vision prompt."""
+    base64_image = base64.b64encode(image["bytes"]).decode("utf-8")
+    mime = IMAGE_EXTENSIONS[image["ext"]]
+    return [
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": DESCRIBE_PROMPT},
+                {"type": "image_url", "image_url": {"url": f"data:image/{mime};base64,{base64_image}"}},
+            ],
+        }
+    ]
 
-    for page_index in range(len(doc)):
-        page = doc[page_index]
-        page_text = page.get_text()
-        images = page.get_images(full=True)
+async def describe_image(image, semaphore):
+    """Stage 3: one vision-model call, bounded by `semaphore`."""
+    async with semaphore:
+        return await achat_completion(
+            messages=describe_messages(image),
+            endpoint="image-description",
+            model=LLM_MODELS["vision"],
+            priority=BATCH,
+        )
 
-        for img_index, img_info in enumerate(images):
+def save_image(image):
+    image_name = f"{Path(image['pdf']).stem}_p{image['page']}_{image['index']}.{image['ext']}"
+    image_path = os.path.join(IMAGE_FOLDER, image_name)
+    with open(image_path, "wb") as f:
+        f.write(image["bytes"])
+    return image_path
+
+async def ingest(pdf_paths, manifest, workers=None, concurrency=4, near=True):
+    """
+    Pipelined ingestion: PDFs are extracted in a process pool and each PDF's
+    images are queued for description as soon as it is done, so extraction
+    and LLM calls overlap. Images already in `manifest` (same bytes, or the
+    same dHash and dimensions) reuse their description, and identical images in
+    the same run share one call. Results come back in (PDF, page, image)
+    order regardless of completion order; failures are collected per image.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = []
+    described = []  # (pdf position, page, index, metadata)
+    in_flight = {}  # image sha256 -> description task
+    counts = {"exact": 0, "near": 0, "llm": 0}
+
+    async def describe(position, image, image_path):
+        description, match = manifest.find(image["sha256"], image["dhash"], image["width"], image["height"], near)
+        try:
+            if description is None:
+                task = in_flight.get(image["sha256"])
+                if task is None:
+                    task = in_flight[image["sha256"]] = asyncio.ensure_future(describe_image(image, semaphore))
+                    counts["llm"] += 1
+                else:
+                    match = "exact"
+                description = await task
+                manifest.add_image(image["sha256"], image["dhash"], image["width"], image["height"], description)
+        except Exception as e:
+            errors.append({"pdf": image["pdf"], "page": image["page"], "image": image["index"],
+                           "stage": "describe", "error": str(e)})
+            return
+        if match:
+            counts[match] += 1
+        described.append((position, image["page"], image["index"], {
+            "image": image_path,
+            "caption": image["caption"],
+            "description": description,
+            "pdf": image["pdf"],
+        }))
+
+    async def process(pool, position, pdf_path):
+        images, extract_errors = await loop.run_in_executor(pool, extract_pdf_images, pdf_path)
+        errors.extend(extract_errors)
+        tasks = []
+        for image in images:
             try:
-                xref = img_info[0]
-                base_image = doc.extract_image(xref)
-                image_bytes = base_image.get("image")
-                if not image_bytes:
-                    continue
-
-                im = Image.open(io.BytesIO(image_bytes))
-                if im.width < 200 or im.height < 200:
-                    continue  # skip tiny images
-
-                ext = base_image.get("ext", "png").lower()
-                if ext not in ["png", "jpg", "jpeg", "tiff"]:
-                    continue
-
-                image_name = f"{Path(pdf_file).stem}_p{page_index+1}_{img_index+1}.{ext}"
-                image_path = os.path.join(IMAGE_FOLDER, image_name)
-                with open(image_path, "wb") as f:
-                    f.write(image_bytes)
-
-                # Extract caption
-                caption = extract_nearby_caption(page_text, img_index)
-
-                # Encode image and get semantic description from Groq
-                base64_image = encode_image(image_path)
-                chat_completion = groq_client.chat.completions.create(
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "text",
-                                    "text": (
-                                        "You are an expert at interpreting scientific figures. "
-                                        "Describe this image in a detailed, structured way suitable for semantic search. "
-                                        "Include: 1) main objects/components, "
-                                        "2) relationships/interactions, "
-                                        "3) patterns, trends, or anomalies, "
-                                        "4) textual elements like labels or axes."
-                                    )
-                                },
-                                {
-                                    "type": "image_url",
-                                    "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}
-                                },
-                            ],
-                        }
-                    ],
-                    model="meta-llama/llama-4-scout-17b-16e-instruct",
-                )
-                description = chat_completion.choices[0].message.content
-
-                all_images_metadata.append({
-                    "image": image_path,
-                    "caption": caption,
-                    "description": description,
-                    "pdf": pdf_file
-                })
-
-            except Exception as img_e:
-                print(f"⚠️ Error extracting or describing image {img_index+1} on page {page_index+1} of {pdf_file}: {img_e}")
-
-# Save metadata to JSON
-with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
-    json.dump(all_images_metadata, f, indent=2)
-
-print(f"✅ Extraction complete. {len(all_images_metadata)} images saved with descriptions. Metadata in {OUTPUT_JSON}")
+                image_path = save_image(image)
+            except OSError as e:
+                errors.append({"pdf": image["pdf"], "page": image["page"], "image": image["index"],
+                               "stage": "save", "error": str(e)})
+                continue
+            tasks.append(describe(position, image, image_path))
+        await asyncio.gather(*tasks)
+        print(f"📄 {os.path.basename(pdf_path)}: {len(images)} images")
+
+    if pdf_paths:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            await asyncio.gather(*(process(pool, i, path) for i, path in enumerate(pdf_paths)))
+
+    described.sort(key=lambda item: item[:3])
+    errors.sort(key=lambda e: (e["pdf"], e["page"] or 0, e["image"] or 0))
+    return [item[3] for item in described], errors, counts
+
+def load_metadata():
+    if not os.path.exists(OUTPUT_JSON):
+        return []
+    with open(OUTPUT_JSON, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def remove_stale_images(old_entries, new_entries):
+    """Delete image files of changed/removed PDFs that the new run did not produce again."""
+    keep = {e["image"] for e in new_entries}
+    for entry in old_entries:
+        if entry["image"] not in keep and os.path.exists(entry["image"]):
+            os.remove(entry["image"])
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract figures from PDFs and describe them with a vision model.")
+    parser.add_argument("--workers", type=int, default=None, help="Extraction processes (default: CPU count)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Vision-model requests in flight at once")
+    parser.add_argument("--force", action="store_true", help="Ignore the manifest: reprocess every PDF and describe every image")
+    parser.add_argument("--no-near-duplicates", action="store_true", help="Only reuse descriptions of byte-identical images, not re-encoded copies")
+    args = parser.parse_args()
+
+    os.makedirs(IMAGE_FOLDER, exist_ok=True)
+    pdf_files = sorted(f for f in os.listdir(PDF_FOLDER) if f.lower().endswith(".pdf"))
+
+    start = time.perf_counter()
+    metadata = load_metadata()
+    manifest = ImageManifest(MANIFEST_JSON)
+    if args.force:
+        manifest.pdfs, manifest.images = {}, {}
+    elif not manifest and metadata:
+        # First run with a manifest: reuse the descriptions we already paid for
+        print(f"🧾 Seeded manifest with {manifest.adopt(metadata)} described images.")
+
+    entries_by_pdf = {}
+    for entry in metadata:
+        entries_by_pdf.setdefault(entry["pdf"], []).append(entry)
+
+    hashes, changed = {}, []
+    for pdf_file in pdf_files:
+        hashes[pdf_file] = file_sha256(os.path.join(PDF_FOLDER, pdf_file))
+        known = manifest.pdfs.get(pdf_file)
+        unchanged = (
+            known is not None
+            and known["sha256"] == hashes[pdf_file]
+            and known["images"] == len(entries_by_pdf.get(pdf_file, []))
+        )
+        if not unchanged:
+            changed.append(pdf_file)
+    print(f"🔍 {len(pdf_files) - len(changed)} unchanged PDFs skipped, {len(changed)} to process.")
+
+    new_entries, errors, counts = asyncio.run(ingest(
+        [os.path.join(PDF_FOLDER, f) for f in changed],
+        manifest,
+        args.workers,
+        args.concurrency,
+        not args.no_near_duplicates,
+    ))
+
+    # Incremental update: unchanged PDFs keep their entries, changed ones are replaced
+    new_by_pdf = {}
+    for entry in new_entries:
+        new_by_pdf.setdefault(entry["pdf"], []).append(entry)
+    failed_pdfs = {e["pdf"] for e in errors}
+    all_images_metadata = []
+    for pdf_file in pdf_files:
+        if pdf_file in changed:
+            all_images_metadata.extend(new_by_pdf.get(pdf_file, []))
+            remove_stale_images(entries_by_pdf.get(pdf_file, []), new_by_pdf.get(pdf_file, []))
+            if pdf_file not in failed_pdfs:  # retried next run otherwise
+                manifest.pdfs[pdf_file] = {"sha256": hashes[pdf_file], "images": len(new_by_pdf.get(pdf_file, []))}
+        else:
+            all_images_metadata.extend(entries_by_pdf.get(pdf_file, []))
+    for pdf_file in set(entries_by_pdf) - set(pdf_files):
+        remove_stale_images(entries_by_pdf[pdf_file], [])
+    manifest.pdfs = {f: manifest.pdfs[f] for f in pdf_files if f in manifest.pdfs}
+    manifest.save()
+
+    # Save metadata to JSON
+    with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
+        json.dump(all_images_metadata, f, indent=2)
+    with open(ERRORS_JSON, "w", encoding="utf-8") as f:
+        json.dump(errors, f, indent=2)
+
+    for e in errors:
+        print(f"⚠️ {e['stage']} failed for {e['pdf']} page {e['page']} image {e['image']}: {e['error']}")
+    print(f"♻️ Descriptions reused: {counts['exact']} identical, {counts['near']} re-encoded copies; "
+          f"{counts['llm']} vision-model calls.")
+    print(f"✅ Extraction complete in {time.perf_counter() - start:.1f}s. {len(all_images_metadata)} images saved "
+          f"with descriptions, {len(errors)} errors. Metadata in {OUTPUT_JSON}")
+
+if __name__ == "__main__":
+    main()
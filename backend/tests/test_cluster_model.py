@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from utils.cluster_model import ClusterModel
+
+CENTERS = np.array([[0, 0], [10, 0], [0, 10], [10, 10]], dtype=np.float32)
+
+
+def blobs(seed, shift=0.0, n=50):
+    rng = np.random.default_rng(seed)
+    return np.concatenate([c + shift + rng.standard_normal((n, 2)) for c in CENTERS]).astype(np.float32)
+
+
+def test_refit_keeps_cluster_ids(tmp_path):
+    model = ClusterModel(str(tmp_path))
+    model.fit(blobs(0), 4, "minilm", random_state=0)
+    model.save()
+    labels, _ = model.assign(CENTERS)
+    before = model.centroids.copy()
+
+    reloaded = ClusterModel(str(tmp_path))
+    assert reloaded.compatible("minilm", 4)
+    assert not reloaded.compatible("mpnet", 4) and not reloaded.compatible("minilm", 5)
+    # A different seed numbers the clusters differently; alignment maps them back
+    reloaded.fit(blobs(1, shift=0.5), 4, "minilm", random_state=7)
+    assert np.abs(reloaded.centroids - before).max() < 1.5
+    assert reloaded.assign(CENTERS)[0].tolist() == labels.tolist()
+
+
+def test_assign_and_drift(tmp_path):
+    model = ClusterModel(str(tmp_path))
+    model.fit(blobs(0), 4, "minilm")
+    labels, distances = model.assign(model.centroids + 0.1)
+    assert labels.tolist() == [0, 1, 2, 3]
+    assert distances == pytest.approx(np.full(4, np.sqrt(0.02)), abs=1e-3)
+
+    assert model.drift(blobs(0)) == pytest.approx(0.0, abs=1e-6)
+    assert model.drift(blobs(0, shift=3.0)) > 1.0
+    assert model.state["fitted_papers"] == 200 and model.state["pushed_version"] is None
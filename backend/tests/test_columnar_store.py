@@ -0,0 +1,18 @@
+import os
+import pandas as pd
+from utils.columnar_store import load_budget, refresh_budget
+
+
+def test_refresh_budget_writes_parquet_only_when_stale(tmp_path):
+    csv_path, parquet_path = str(tmp_path / "budget.csv"), str(tmp_path / "budget.parquet")
+    pd.DataFrame({"Year": [2020, 2021], "Total Budget": [22.6, 23.3], "Key Milestone": ["A", "B"]}).to_csv(csv_path, index=False)
+
+    assert refresh_budget(csv_path, parquet_path)
+    assert not refresh_budget(csv_path, parquet_path)
+    assert load_budget(csv_path, parquet_path)["Total Budget"].tolist() == [22.6, 23.3]
+
+    # An edited CSV is converted again
+    pd.DataFrame({"Year": [2022], "Total Budget": [24.0], "Key Milestone": ["C"]}).to_csv(csv_path, index=False)
+    os.utime(csv_path, (os.path.getmtime(parquet_path) + 10,) * 2)
+    assert refresh_budget(csv_path, parquet_path)
+    assert load_budget(csv_path, parquet_path)["Year"].tolist() == [2022]
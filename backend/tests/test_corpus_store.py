@@ -0,0 +1,72 @@
+import pandas as pd
+from utils.corpus_store import CorpusManifest, diff_corpus, upsert, changed_since, paper_keys
+
+
+def link(pmc_id):
+    return f"https://www.ncbi.nlm.nih.gov/pmc/articles/{pmc_id}/"
+
+
+def source(*rows):
+    return pd.DataFrame({"Title": [t for _, t in rows], "Link": [link(p) for p, _ in rows]})
+
+
+def processed(*rows):
+    return pd.DataFrame({
+        "Title": [t for _, t, _ in rows],
+        "Link": [link(p) for p, _, _ in rows],
+        "abstract": [f"old {p}" for p, _, _ in rows],
+        "pmc_id": [p for p, _, _ in rows],
+        "ingest_version": [v for _, _, v in rows],
+    })
+
+
+def test_paper_keys_fall_back_to_the_link():
+    df = pd.DataFrame({"Title": ["a", "b"], "Link": [link("pmc7"), " https://example.org/paper "]})
+    assert paper_keys(df).tolist() == ["PMC7", "https://example.org/paper"]
+
+
+def test_diff_corpus():
+    src = source(("PMC1", "One"), ("PMC2", "Two, revised"), ("PMC4", "Four"))
+    done = processed(("PMC1", "One", 1), ("PMC2", "Two", 1), ("PMC3", "Three", 1))
+    assert diff_corpus(src, done) == ({"PMC4"}, {"PMC2"}, {"PMC3"})
+
+
+def test_upsert_stamps_updated_rows_and_keeps_the_rest():
+    src = source(("PMC4", "Four"), ("PMC1", "One"), ("PMC2", "Two, revised"))
+    done = processed(("PMC1", "One", 1), ("PMC2", "Two", 1), ("PMC3", "Three", 1))
+    updated = processed(("PMC2", "Two, revised", 0), ("PMC4", "Four", 0)).assign(abstract=["new PMC2", "new PMC4"])
+
+    merged = upsert(src, done, updated, version=2)
+
+    # Publication-list order, removed papers dropped, titles and links from the list
+    assert merged["pmc_id"].tolist() == ["PMC4", "PMC1", "PMC2"]
+    assert merged["Title"].tolist() == ["Four", "One", "Two, revised"]
+    assert merged["abstract"].tolist() == ["new PMC4", "old PMC1", "new PMC2"]
+    assert merged["ingest_version"].tolist() == [2, 1, 2]
+    assert changed_since(merged, 1)["pmc_id"].tolist() == ["PMC4", "PMC2"]
+    assert len(changed_since(merged, None)) == 3
+
+
+def test_upsert_leaves_out_rows_missing_from_both_tables():
+    src = source(("PMC1", "One"), ("PMC2", "Two"))
+    done = processed(("PMC1", "One", 1))
+    updated = processed(("PMC2", "Two", 0)).iloc[:0]
+
+    merged = upsert(src[paper_keys(src) != "PMC2"], done, updated, version=2)
+
+    assert merged["pmc_id"].tolist() == ["PMC1"]
+    assert merged["ingest_version"].tolist() == [1]
+
+
+def test_manifest_records_versions_and_pending(tmp_path):
+    path = str(tmp_path / "corpus_versions.json")
+    manifest = CorpusManifest(path)
+    assert manifest.current_version == 0
+
+    assert manifest.record("full", added=3, pending=["PMC9", "PMC2"]) == 1
+    assert manifest.record("incremental", added=1, changed=2) == 2
+
+    reloaded = CorpusManifest(path)
+    assert reloaded.current_version == 2
+    assert reloaded.pending == []
+    assert [(v["mode"], v["failed"]) for v in reloaded.versions] == [("full", 2), ("incremental", 0)]
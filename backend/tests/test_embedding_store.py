@@ -0,0 +1,151 @@
+import json
+import numpy as np
+import pytest
+import utils.embedding_store as embedding_store
+from utils.embedding_store import EmbeddingStore, text_hash
+
+
+class FakeModel:
+    """Deterministic 3-d vectors derived from the text."""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, convert_to_numpy=True, **kwargs):
+        self.encoded.extend(texts)
+        return np.array([[len(t), sum(map(ord, t)) % 97, 1.0] for t in texts], dtype=np.float32)
+
+
+def expected(texts):
+    return FakeModel().encode(texts)
+
+
+@pytest.fixture
+def model():
+    return FakeModel()
+
+
+def test_only_missing_texts_are_encoded(tmp_path, model):
+    store = EmbeddingStore("model", str(tmp_path))
+    assert np.array_equal(store.encode(["a", "bb", "a"], lambda: model), expected(["a", "bb", "a"]))
+    assert model.encoded == ["a", "bb"]
+
+    reopened = EmbeddingStore("model", str(tmp_path))
+    assert np.array_equal(reopened.encode(["bb", "ccc"], lambda: model), expected(["bb", "ccc"]))
+    assert model.encoded == ["a", "bb", "ccc"]
+    assert reopened.get(["a", "missing"]) is None
+
+
+def test_model_is_not_loaded_when_everything_is_stored(tmp_path, model):
+    EmbeddingStore("model", str(tmp_path)).encode(["a"], lambda: model)
+
+    def fail():
+        raise AssertionError("model loaded")
+
+    assert np.array_equal(EmbeddingStore("model", str(tmp_path)).encode(["a"], fail), expected(["a"]))
+
+
+def test_appends_write_segments_and_leave_existing_ones_untouched(tmp_path, model):
+    store = EmbeddingStore("model", str(tmp_path))
+    store.encode(["a", "b"], lambda: model)
+    first = store.segments[0][0]
+    mtime = (tmp_path / "model" / first).stat().st_mtime_ns
+    store.encode(["c"], lambda: model)
+    store.encode(["d", "e"], lambda: model)
+
+    assert [len(vectors) for _, vectors in store.segments] == [2, 1, 2]
+    assert (tmp_path / "model" / first).stat().st_mtime_ns == mtime
+    texts = ["e", "a", "c", "d", "b"]
+    assert np.array_equal(store.get(texts), expected(texts))
+    # A contiguous block inside one segment comes straight from the memory map
+    assert isinstance(store.get(["d", "e"]), np.memmap)
+
+
+def test_compact_merges_segments_and_prunes(tmp_path, model):
+    store = EmbeddingStore("model", str(tmp_path))
+    for text in ["a", "b", "c", "d"]:
+        store.encode([text], lambda: model)
+
+    assert store.compact() == 0
+    assert len(store.segments) == 1
+    assert store.compact(keep_texts=["d", "b"]) == 2
+
+    reopened = EmbeddingStore("model", str(tmp_path))
+    assert len(reopened) == 2
+    assert np.array_equal(reopened.get(["b", "d"]), expected(["b", "d"]))
+    assert reopened.get(["a"]) is None
+    assert sorted(p.name for p in (tmp_path / "model").glob("*.npy")) == [reopened.segments[0][0]]
+
+
+def test_appends_past_the_segment_limit_compact(tmp_path, model, monkeypatch):
+    monkeypatch.setattr(embedding_store, "MAX_SEGMENTS", 3)
+    store = EmbeddingStore("model", str(tmp_path))
+    for text in ["a", "b", "c", "d"]:
+        store.encode([text], lambda: model)
+
+    assert len(store.segments) == 1
+    assert np.array_equal(store.get(["a", "b", "c", "d"]), expected(["a", "b", "c", "d"]))
+
+
+def test_single_file_stores_are_still_read(tmp_path, model):
+    directory = tmp_path / "model"
+    directory.mkdir()
+    np.save(directory / "vectors.npy", expected(["a", "b"]))
+    (directory / "index.json").write_text(json.dumps({"model": "model", "dim": 3, "hashes": [text_hash("a"), text_hash("b")]}))
+
+    store = EmbeddingStore("model", str(tmp_path))
+    store.encode(["c"], lambda: model)
+
+    assert model.encoded == ["c"]
+    assert np.array_equal(store.get(["b", "c", "a"]), expected(["b", "c", "a"]))
+    assert store.compact() == 0
+    assert not (directory / "vectors.npy").exists()
+
+
+def test_reopening_under_another_key_while_loading_the_model(tmp_path, model):
+    EmbeddingStore("model@onnx", str(tmp_path)).encode(["a"], lambda: model)
+    store = EmbeddingStore("model@onnx", str(tmp_path))
+
+    def load_with_fallback():
+        store.open("model")
+        return model
+
+    assert np.array_equal(store.encode(["a", "b"], load_with_fallback), expected(["a", "b"]))
+    assert store.model_name == "model"
+    assert len(EmbeddingStore("model", str(tmp_path))) == 2
+    assert len(EmbeddingStore("model@onnx", str(tmp_path))) == 1
+
+
+def test_nothing_is_encoded_when_the_fallback_store_already_has_everything(tmp_path, model):
+    # Second run after a fallback: the optimised key is empty, the fallback key is warm
+    EmbeddingStore("model", str(tmp_path)).encode(["a", "b"], lambda: model)
+    store = EmbeddingStore("model@onnx", str(tmp_path))
+
+    class NoEmptyBatches(FakeModel):
+        def encode(self, texts, **kwargs):
+            if not texts:
+                raise StopIteration  # as the benchmarks' hashing encoder does
+            return super().encode(texts, **kwargs)
+
+    def load_with_fallback():
+        store.open("model")
+        return NoEmptyBatches()
+
+    assert np.array_equal(store.encode(["b", "a"], load_with_fallback), expected(["b", "a"]))
+    assert len(store.segments) == 1
+
+
+def test_vectors_view_reads_rows_on_access(tmp_path, model):
+    store = EmbeddingStore("model", str(tmp_path))
+    store.encode(["a", "bb"], lambda: model)
+    texts = ["ccc", "a", "dddd", "bb"]
+    view = store.vectors(texts, lambda: model)
+    assert len(store.segments) == 2
+    assert view.shape == (4, 3) and len(view) == 4
+    assert np.array_equal(np.asarray(view), expected(texts))
+    assert np.array_equal(view[np.array([3, 0])], expected(["bb", "ccc"]))
+    assert np.array_equal(view[1], expected(["a"])[0])
+
+    # The view keeps the segments it was created with across a compaction
+    store.compact(keep_texts=["dddd"])
+    assert np.array_equal(view[np.array([2, 1])], expected(["dddd", "a"]))
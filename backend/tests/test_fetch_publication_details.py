@@ -0,0 +1,220 @@
+import json
+import argparse
+import pandas as pd
+import pytest
+import requests
+import fetch_publication_details as fetch
+from utils.corpus_store import CorpusManifest
+
+
+def sections(pmc_id):
+    return {"abstract": "A" * 60 + pmc_id, "conclusion": "C" * 30 + pmc_id, "best_date": "2024-01-01"}
+
+
+class FakeBatches:
+    """Stands in for `fetch_batch`: records the batches asked for, failing any that contain a `down` id."""
+
+    def __init__(self, down=()):
+        self.down = set(down)
+        self.batches = []
+
+    def __call__(self, pmc_ids, session, limiter, retries=4, backoff=1.0, all_sections=False):
+        self.batches.append(list(pmc_ids))
+        if self.down & set(pmc_ids):
+            raise requests.ConnectionError("efetch unreachable")
+        return {pmc_id: sections(pmc_id) for pmc_id in pmc_ids}
+
+
+class NoLimit:
+    def acquire(self, amount=1):
+        pass
+
+
+def fetch_all(ids, checkpoint, **kwargs):
+    return fetch.fetch_all(ids, batch_size=2, concurrency=1, requests_per_second=1000,
+                           retries=0, checkpoint_path=str(checkpoint), **kwargs)
+
+
+def test_fetch_all_resumes_from_checkpoint(tmp_path, monkeypatch):
+    checkpoint = tmp_path / "checkpoint.jsonl"
+    checkpoint.write_text(
+        json.dumps({"pmc_id": "PMC1", **sections("PMC1")}) + "\n"
+        + '{"pmc_id": "PMC2", "abstr'  # half-written line from a crash
+    )
+    fake = FakeBatches()
+    monkeypatch.setattr(fetch, "fetch_batch", fake)
+
+    results, failed = fetch_all(["PMC1", "PMC2", "PMC3"], checkpoint)
+
+    assert failed == []
+    assert sorted(id for batch in fake.batches for id in batch) == ["PMC2", "PMC3"]
+    assert results == {pmc_id: sections(pmc_id) for pmc_id in ("PMC1", "PMC2", "PMC3")}
+    assert set(fetch.load_checkpoint(str(checkpoint))) == {"PMC1", "PMC2", "PMC3"}
+
+
+def test_fetch_all_without_resume_fetches_everything(tmp_path, monkeypatch):
+    checkpoint = tmp_path / "checkpoint.jsonl"
+    checkpoint.write_text(json.dumps({"pmc_id": "PMC1", **sections("PMC1")}) + "\n")
+    fake = FakeBatches()
+    monkeypatch.setattr(fetch, "fetch_batch", fake)
+
+    fetch_all(["PMC1", "PMC2"], checkpoint, resume=False)
+
+    assert fake.batches == [["PMC1", "PMC2"]]
+
+
+def test_fetch_all_returns_failed_ids_and_retries_them_next_run(tmp_path, monkeypatch):
+    checkpoint = tmp_path / "checkpoint.jsonl"
+    monkeypatch.setattr(fetch, "fetch_batch", FakeBatches(down={"PMC3"}))
+
+    results, failed = fetch_all(["PMC1", "PMC2", "PMC3", "PMC4"], checkpoint)
+
+    # The whole batch holding the failing id is reported, and none of it is checkpointed
+    assert sorted(failed) == ["PMC3", "PMC4"]
+    assert set(results) == {"PMC1", "PMC2"}
+    assert set(fetch.load_checkpoint(str(checkpoint))) == {"PMC1", "PMC2"}
+
+    fake = FakeBatches()
+    monkeypatch.setattr(fetch, "fetch_batch", fake)
+    results, failed = fetch_all(["PMC1", "PMC2", "PMC3", "PMC4"], checkpoint)
+    assert failed == []
+    assert fake.batches == [["PMC3", "PMC4"]]
+    assert set(results) == {"PMC1", "PMC2", "PMC3", "PMC4"}
+
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status}", response=response)
+
+
+def test_fetch_batch_retries_server_errors(monkeypatch):
+    calls = []
+
+    def efetch(pmc_ids, session=None, timeout=30):
+        calls.append(pmc_ids)
+        if len(calls) < 3:
+            raise http_error(503)
+        return iter([b""])
+
+    monkeypatch.setattr(fetch, "efetch", efetch)
+    monkeypatch.setattr(fetch, "parse_articles", lambda chunks, all_sections: {"PMC1": sections("PMC1")})
+
+    result = fetch.fetch_batch(["PMC1", "PMC2"], None, NoLimit(), retries=4, backoff=0)
+
+    assert len(calls) == 3
+    # Ids missing from a successful response get empty sections
+    assert result == {"PMC1": sections("PMC1"), "PMC2": fetch.EMPTY_SECTIONS}
+
+
+def test_fetch_batch_gives_up_on_client_errors(monkeypatch):
+    calls = []
+
+    def efetch(pmc_ids, session=None, timeout=30):
+        calls.append(pmc_ids)
+        raise http_error(404)
+
+    monkeypatch.setattr(fetch, "efetch", efetch)
+
+    with pytest.raises(requests.HTTPError):
+        fetch.fetch_batch(["PMC1"], None, NoLimit(), retries=4, backoff=0)
+    assert len(calls) == 1
+
+
+def write_publications(path, ids):
+    links = [f"https://www.ncbi.nlm.nih.gov/pmc/articles/{pmc_id}/" for pmc_id in ids]
+    pd.DataFrame({"Title": [f"Paper {pmc_id}" for pmc_id in ids], "Link": links}).to_csv(path, index=False)
+
+
+def test_incremental_refresh_keeps_failed_papers_pending(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    monkeypatch.setattr(fetch, "write_papers", lambda df: None)
+    args = argparse.Namespace(sequential=False, batch_size=1, concurrency=1, rate=1000, retries=0,
+                              no_resume=False, all_sections=False)
+
+    write_publications(fetch.INPUT_FILE, ["PMC1", "PMC2"])
+    monkeypatch.setattr(fetch, "fetch_batch", FakeBatches())
+    fetch.refresh_full(args)
+    assert not (tmp_path / fetch.CHECKPOINT_FILE).exists()
+
+    # PMC3 is new and PMC2's title changed, but both fetches fail
+    write_publications(fetch.INPUT_FILE, ["PMC1", "PMC2", "PMC3"])
+    publications = pd.read_csv(fetch.INPUT_FILE)
+    publications.loc[1, "Title"] = "Paper PMC2, revised"
+    publications.to_csv(fetch.INPUT_FILE, index=False)
+    monkeypatch.setattr(fetch, "fetch_batch", FakeBatches(down={"PMC2", "PMC3"}))
+    fetch.refresh_incremental(args)
+
+    output = pd.read_csv(fetch.OUTPUT_FILE)
+    assert output["pmc_id"].tolist() == ["PMC1", "PMC2"]
+    assert output["ingest_version"].tolist() == [1, 1]  # PMC2 keeps its old sections
+    assert CorpusManifest().pending == ["PMC2", "PMC3"]
+    # PMC1's result is in the output now; the pending list drives the retry
+    assert not (tmp_path / fetch.INCREMENTAL_CHECKPOINT_FILE).exists()
+
+    fake = FakeBatches()
+    monkeypatch.setattr(fetch, "fetch_batch", fake)
+    fetch.refresh_incremental(args)
+
+    assert sorted(id for batch in fake.batches for id in batch) == ["PMC2", "PMC3"]
+    output = pd.read_csv(fetch.OUTPUT_FILE)
+    assert output["pmc_id"].tolist() == ["PMC1", "PMC2", "PMC3"]
+    assert output["ingest_version"].tolist() == [1, 3, 3]
+    assert output["Title"].tolist()[1] == "Paper PMC2, revised"
+    assert CorpusManifest().pending == []
+    assert not (tmp_path / fetch.INCREMENTAL_CHECKPOINT_FILE).exists()
+
+
+def test_checkpoint_is_only_resumed_from_its_corpus_version(tmp_path, monkeypatch):
+    checkpoint = tmp_path / "checkpoint.jsonl"
+    monkeypatch.setattr(fetch, "fetch_batch", FakeBatches(down={"PMC3"}))
+    fetch_all(["PMC1", "PMC2", "PMC3"], checkpoint, corpus_version=1)
+
+    # Same version (the run was interrupted): resume
+    fake = FakeBatches()
+    monkeypatch.setattr(fetch, "fetch_batch", fake)
+    fetch_all(["PMC1", "PMC2", "PMC3"], checkpoint, corpus_version=1)
+    assert fake.batches == [["PMC3"]]
+
+    # Left behind by a run that completed (the corpus moved on): fetch everything again
+    fake = FakeBatches()
+    monkeypatch.setattr(fetch, "fetch_batch", fake)
+    fetch_all(["PMC1", "PMC2", "PMC3"], checkpoint, corpus_version=2)
+    assert fake.batches == [["PMC1", "PMC2"], ["PMC3"]]
+    assert set(fetch.load_checkpoint(str(checkpoint), 2)) == {"PMC1", "PMC2", "PMC3"}
+
+
+def test_full_refresh_writes_the_output_before_recording_the_version(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    args = argparse.Namespace(sequential=False, batch_size=1, concurrency=1, rate=1000, retries=0,
+                              no_resume=False, all_sections=False)
+    write_publications(fetch.INPUT_FILE, ["PMC1", "PMC2"])
+    monkeypatch.setattr(fetch, "fetch_batch", FakeBatches(down={"PMC2"}))
+
+    def fail(df):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(fetch, "write_papers", fail)
+    with pytest.raises(OSError):
+        fetch.refresh_full(args)
+    assert CorpusManifest().current_version == 0
+    assert (tmp_path / fetch.CHECKPOINT_FILE).exists()
+
+    # The rerun resumes PMC1 from the checkpoint of the unrecorded run
+    fake = FakeBatches(down={"PMC2"})
+    monkeypatch.setattr(fetch, "fetch_batch", fake)
+    monkeypatch.setattr(fetch, "write_papers", lambda df: None)
+    fetch.refresh_full(args)
+    assert fake.batches == [["PMC2"]]
+    assert CorpusManifest().current_version == 1
+    assert CorpusManifest().pending == ["PMC2"]
+    assert not (tmp_path / fetch.CHECKPOINT_FILE).exists()
+
+    # The next full refresh fetches every paper again
+    fake = FakeBatches()
+    monkeypatch.setattr(fetch, "fetch_batch", fake)
+    fetch.refresh_full(args)
+    assert sorted(id for batch in fake.batches for id in batch) == ["PMC1", "PMC2"]
+    assert pd.read_csv(fetch.OUTPUT_FILE)["ingest_version"].tolist() == [2, 2]
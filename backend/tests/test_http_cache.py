@@ -0,0 +1,100 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from utils.http_cache import ResponseCache, _pick_encoding
+
+
+@pytest.fixture
+def app():
+    app = FastAPI()
+    app.state.cache = ResponseCache(max_entries=2)
+    app.state.version = "v1"
+    app.state.builds = 0
+
+    @app.get("/items")
+    def items(request: Request):
+        def build():
+            app.state.builds += 1
+            return {"items": list(range(500)), "query": dict(request.query_params)}
+        return app.state.cache.respond(request, app.state.version, build)
+
+    return app
+
+
+def test_etag_revalidation_returns_304(app):
+    client = TestClient(app)
+    first = client.get("/items", params={"page": 1})
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "no-cache"
+
+    again = client.get("/items", params={"page": 1}, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert client.get("/items", params={"page": 1}, headers={"If-None-Match": f'W/{etag}, "other"'}).status_code == 304
+    assert app.state.builds == 1
+    assert app.state.cache.stats()["not_modified"] == 2
+
+
+def test_cached_body_is_reused_until_the_version_changes(app):
+    client = TestClient(app)
+    etag = client.get("/items").headers["ETag"]
+    client.get("/items")
+    assert app.state.builds == 1
+    assert app.state.cache.stats()["hits"] == 1
+
+    app.state.version = "v2"
+    fresh = client.get("/items", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["ETag"] != etag
+    assert app.state.builds == 2
+
+
+def test_query_parameters_are_part_of_the_key(app):
+    client = TestClient(app)
+    # Same parameters in another order share an entry...
+    a = client.get("/items?a=1&b=2")
+    b = client.get("/items?b=2&a=1")
+    assert a.headers["ETag"] == b.headers["ETag"]
+    # ...but a value containing & or = must not collide with separate parameters
+    c = client.get("/items", params={"a": "1&b=2"})
+    assert c.headers["ETag"] != a.headers["ETag"]
+    assert c.json()["query"] == {"a": "1&b=2"}
+    assert app.state.builds == 2
+
+
+def test_entries_are_evicted_least_recently_used_first(app):
+    client = TestClient(app)
+    for page in (1, 2, 1, 3):
+        client.get("/items", params={"page": page})
+    assert [key for key, _ in app.state.cache.entries] == ["/items?page=1", "/items?page=3"]
+
+
+def test_compression_follows_accept_encoding(app):
+    client = TestClient(app)
+    gzipped = client.get("/items", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert gzipped.headers["Vary"] == "Accept-Encoding"
+    assert gzipped.json()["items"][-1] == 499
+
+    plain = client.get("/items", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "Content-Encoding" not in plain.headers
+    assert plain.json() == gzipped.json()
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", "gzip"),
+    ("GZIP;Q=0.5", "gzip"),
+    ("gzip;q=0", "identity"),
+    ("*", "gzip"),
+    ("*;q=0", "identity"),
+    ("identity", "identity"),
+    ("", "identity"),
+])
+def test_pick_encoding(header, expected, monkeypatch):
+    monkeypatch.setattr("utils.http_cache.brotli", None)
+    assert _pick_encoding(header, 4096) == expected
+
+
+def test_small_bodies_are_not_compressed():
+    assert _pick_encoding("gzip", 100) == "identity"
@@ -0,0 +1,64 @@
+import io
+import numpy as np
+from PIL import Image
+from utils.image_manifest import ImageManifest, file_sha256, image_fingerprint
+
+
+def encode(pixels, fmt="PNG", **params):
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format=fmt, **params)
+    return buffer.getvalue()
+
+
+def gradient(width=64, height=48):
+    x = np.linspace(0, 255, width)
+    y = np.linspace(0, 120, height)[:, None]
+    return np.stack([(x + y) % 256, (255 - x + 0 * y), (y + 0 * x)], axis=-1).astype(np.uint8)
+
+
+def test_re_encoded_copy_keeps_its_dhash_but_not_its_sha():
+    png = image_fingerprint(encode(gradient()))
+    jpeg = image_fingerprint(encode(gradient(), "JPEG", quality=90))
+    assert png[0] != jpeg[0]
+    assert png[1:] == jpeg[1:] and png[2:] == (64, 48)
+
+
+def test_find_by_sha_then_by_dhash_at_the_same_size(tmp_path):
+    manifest = ImageManifest(str(tmp_path / "manifest.json"))
+    assert not manifest
+    sha256, dhash, width, height = image_fingerprint(encode(gradient()))
+    manifest.add_image(sha256, dhash, width, height, "A gradient figure")
+
+    assert manifest.find(sha256, "0" * 16, 1, 1) == ("A gradient figure", "exact")
+    assert manifest.find("other", dhash, width, height) == ("A gradient figure", "near")
+    assert manifest.find("other", dhash, width, height, near=False) == (None, None)
+    # Same layout at another size, or one bit off, needs its own description
+    assert manifest.find("other", dhash, width * 2, height * 2) == (None, None)
+    flipped = f"{int(dhash, 16) ^ 1:016x}"
+    assert manifest.find("other", flipped, width, height) == (None, None)
+
+
+def test_save_and_reload(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    manifest = ImageManifest(path)
+    manifest.pdfs["paper.pdf"] = {"sha256": "abc", "images": ["paper_p1_1.png"]}
+    manifest.add_image("sha", "00ff00ff00ff00ff", 10, 20, "Logo")
+    manifest.save()
+
+    reloaded = ImageManifest(path)
+    assert reloaded.pdfs == manifest.pdfs
+    assert reloaded.find("sha", "", 0, 0) == ("Logo", "exact")
+    assert not (tmp_path / "manifest.json.tmp").exists()
+
+
+def test_adopt_existing_metadata(tmp_path):
+    image = tmp_path / "figure.png"
+    image.write_bytes(encode(gradient()))
+    metadata = [
+        {"image": str(image), "description": "Existing description"},
+        {"image": str(tmp_path / "deleted.png"), "description": "Gone"},
+        {"image": str(image), "description": ""},
+    ]
+    manifest = ImageManifest(str(tmp_path / "manifest.json"))
+    assert manifest.adopt(metadata) == 1
+    assert manifest.find(file_sha256(str(image)), "", 0, 0) == ("Existing description", "exact")
@@ -0,0 +1,64 @@
+from utils.jats_parser import iter_articles, parse_articles
+
+ARTICLE = """
+<article>
+  <front><article-meta>
+    <article-id pub-id-type="pmid">111</article-id>
+    <article-id pub-id-type="pmc">PMC{pmc}</article-id>
+    <pub-date pub-type="collection"><year>2020</year></pub-date>
+    <pub-date pub-type="epub"><day>5</day><month>3</month><year>2019</year></pub-date>
+    <abstract><sec><title>Background</title><p>Bone   loss in
+      <italic>microgravity</italic>.</p></sec></abstract>
+    <abstract abstract-type="graphical"><p>Graphical abstract</p></abstract>
+  </article-meta></front>
+  <body>
+    <sec><label>1</label><title>Introduction</title><p>Mice flew on the ISS.</p></sec>
+    <sec><title>Results</title><p>Density fell.</p>
+      <sec><title>Bone density</title><p>Nested section.</p></sec>
+    </sec>
+    <sec><label>4</label><title> Conclusions </title><p>Countermeasures &amp; exercise help.</p>
+      <sec><title>Limitations</title><p>Small cohort.</p></sec>
+    </sec>
+  </body>
+</article>
+"""
+
+BATCH = "<pmc-articleset>" + ARTICLE.format(pmc=1) + ARTICLE.format(pmc=2) + "<article><p>no id</p></article></pmc-articleset>"
+
+
+def test_parses_abstract_conclusion_and_preferred_date():
+    record = parse_articles(ARTICLE.format(pmc=42))["PMC42"]
+    assert record == {
+        "abstract": "Background Bone loss in microgravity .",
+        "conclusion": "Countermeasures & exercise help. Limitations Small cohort.",
+        "best_date": "2019-03-05",
+    }
+
+
+def test_sec_type_and_titles_both_mark_the_conclusion():
+    xml = ('<article><front><article-meta><article-id pub-id-type="pmcid">7</article-id>'
+           '<pub-date pub-type="collection"><year>2021</year></pub-date></article-meta></front>'
+           '<body><sec sec-type="conclusions"><p>Typed conclusion.</p></sec></body></article>')
+    assert parse_articles(xml) == {"PMC7": {"abstract": "", "conclusion": "Typed conclusion.", "best_date": "2021-01-01"}}
+
+
+def test_all_sections_in_document_order():
+    record = parse_articles(ARTICLE.format(pmc=1), all_sections=True)["PMC1"]
+    assert [s["title"] for s in record["sections"]] == ["Introduction", "Bone density", "Results", "Limitations", "Conclusions"]
+    assert record["sections"][0]["text"] == "Mice flew on the ISS."
+    assert record["sections"][-1]["text"] == "Countermeasures & exercise help. Limitations Small cohort."
+
+
+def test_batches_stream_in_small_chunks():
+    data = BATCH.encode()
+    chunks = (data[i:i + 7] for i in range(0, len(data), 7))
+    articles = list(iter_articles(chunks))
+    assert [pmc_id for pmc_id, _ in articles] == ["PMC1", "PMC2", None]
+    assert articles[0][1] == articles[1][1] == parse_articles(ARTICLE.format(pmc=1))["PMC1"]
+    assert set(parse_articles(BATCH)) == {"PMC1", "PMC2"}
+
+
+def test_unknown_entities_are_skipped():
+    xml = '<!DOCTYPE article SYSTEM "JATS.dtd"><article><front><article-meta><article-id pub-id-type="pmc">3</article-id>' \
+          '<abstract><p>Dose &plusmn; error</p></abstract></article-meta></front></article>'
+    assert parse_articles(xml)["PMC3"]["abstract"] == "Dose error"
@@ -0,0 +1,39 @@
+import numpy as np
+from utils.lexical_index import BM25Index, highlight, highlight_title, tokenize
+
+TEXTS = [
+    "bone loss in mice during spaceflight",
+    "plant growth in microgravity",
+    "bone density of astronauts after long missions and bone loss countermeasures",
+]
+
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize("The Bone-loss of MICE, in orbit.") == ["bone", "loss", "mice", "orbit"]
+
+
+def test_search_ranks_by_bm25():
+    index = BM25Index(TEXTS)
+    ids, scores = index.search("bone loss", k=5)
+    assert set(ids.tolist()) == {0, 2}
+    assert (np.diff(scores) <= 0).all()
+    assert index.query_terms("the bone of unknownword") == ["bone"]
+    assert len(index.search("unknownword", k=5)[0]) == 0
+
+
+def test_from_arrays_round_trip():
+    index = BM25Index(TEXTS)
+    copy = BM25Index.from_arrays(index.arrays(), index.terms, index.n_docs)
+    assert np.array_equal(copy.scores("bone growth"), index.scores("bone growth"))
+
+
+def test_highlight_escapes_html():
+    text = "Nothing here. Effects on <b>bone</b> & muscle. Bone again."
+    assert highlight(text, ["bone"], max_snippets=1) == ["Effects on &lt;b&gt;<em>bone</em>&lt;/b&gt; &amp; muscle."]
+
+
+def test_highlight_title_keeps_the_whole_title():
+    title = "Spaceflight. Effects on Mice & <Bone>"
+    assert highlight_title(title, ["mice", "bone"]) == "Spaceflight. Effects on <em>Mice</em> &amp; &lt;<em>Bone</em>&gt;"
+    assert highlight_title(title, []) == "Spaceflight. Effects on Mice &amp; &lt;Bone&gt;"
+    assert highlight_title(None, ["bone"]) == ""
@@ -0,0 +1,53 @@
+from utils.llm_cache import LLMCache, make_key
+
+
+def messages(content):
+    return [{"role": "user", "content": content}]
+
+
+def test_make_key_ignores_whitespace_but_not_params():
+    key = make_key("llama", messages("Summarise\n   this paper "), temperature=0.2)
+    assert key == make_key("llama", messages("Summarise this paper"), temperature=0.2)
+    assert key != make_key("llama", messages("Summarise this paper"), temperature=0.7)
+    assert key != make_key("mixtral", messages("Summarise this paper"), temperature=0.2)
+
+
+def test_entries_persist_across_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    LLMCache(path).set("k", "cached answer", model="llama")
+    cache = LLMCache(path)
+    assert cache.stats()["memory_entries"] == 0
+    assert cache.get("k") == "cached answer"
+    assert cache.stats()["memory_entries"] == 1
+
+
+def test_counters_are_kept_per_endpoint(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"))
+    cache.set("k", "answer")
+    assert cache.get("k", endpoint="/ask-ai") == "answer"
+    assert cache.get("missing", endpoint="/ask-ai") is None
+    assert cache.get("missing", endpoint="/post-mission") is None
+    assert cache.stats()["endpoints"] == {
+        "/ask-ai": {"hits": 1, "misses": 1},
+        "/post-mission": {"hits": 0, "misses": 1},
+    }
+
+
+def test_memory_is_lru_bounded(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+    assert list(cache.memory) == ["a", "c"]
+    # Evicted from memory, still served from SQLite
+    assert cache.get("b") == "2"
+
+
+def test_expired_entries_are_misses_and_purged(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=-1)
+    cache.set("k", "stale")
+    assert cache.get("k") is None
+    assert "k" not in cache.memory
+    cache.purge_expired()
+    assert cache.db.execute("SELECT COUNT(*) FROM completions").fetchone()[0] == 0
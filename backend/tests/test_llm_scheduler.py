@@ -0,0 +1,103 @@
+import asyncio
+import pytest
+import utils.LLM_utils as llm_utils
+import utils.llm_scheduler as llm_scheduler
+from utils.llm_cache import LLMCache
+from utils.llm_providers import LLMResponse
+from utils.llm_scheduler import BATCH, BATCH_YIELD_SECONDS, INTERACTIVE, LLMScheduler, SharedLLMScheduler
+
+
+class FakeProvider:
+    name = "fake"
+
+    def __init__(self, content="ok", error=None):
+        self.content = content
+        self.error = error
+        self.calls = 0
+
+    def complete(self, model, messages, **params):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return LLMResponse(self.content, prompt_tokens=10, completion_tokens=5)
+
+    async def acomplete(self, model, messages, **params):
+        return self.complete(model, messages, **params)
+
+
+@pytest.fixture
+def llm(monkeypatch, tmp_path):
+    scheduler = LLMScheduler(tokens_per_minute=60000)
+    monkeypatch.setattr(llm_utils, "scheduler", scheduler)
+    monkeypatch.setattr(llm_utils, "llm_cache", LLMCache(str(tmp_path / "cache.sqlite3")))
+    return scheduler
+
+
+def test_batch_yields_to_queued_interactive_calls():
+    scheduler = LLMScheduler(requests_per_minute=60)
+    started = scheduler._enter(INTERACTIVE)
+    assert scheduler._try_acquire(1, BATCH) == BATCH_YIELD_SECONDS
+    assert scheduler._try_acquire(1, INTERACTIVE) == 0
+    scheduler._leave(INTERACTIVE, started)
+    assert scheduler._try_acquire(1, BATCH) == 0
+    with pytest.raises(ValueError):
+        scheduler.acquire(1, "urgent")
+
+
+def test_settle_refunds_unused_tokens():
+    scheduler = LLMScheduler(tokens_per_minute=600)
+    scheduler.acquire(300)
+    assert scheduler.tokens.level == pytest.approx(300, abs=1)
+    scheduler.settle(300, prompt_tokens=50, completion_tokens=50)
+    assert scheduler.tokens.level == pytest.approx(500, abs=1)
+    # Without reported usage the estimate stays charged
+    scheduler.acquire(100)
+    scheduler.settle(100)
+    assert scheduler.tokens.level == pytest.approx(400, abs=1)
+    assert scheduler.stats()["tokens_used"] == {"prompt": 50, "completion": 50, "estimated": 100}
+
+
+def test_shared_scheduler_spans_processes(tmp_path, monkeypatch):
+    # Two schedulers on one file stand in for an API worker and an ingestion script
+    path = str(tmp_path / "scheduler.sqlite3")
+    api = SharedLLMScheduler(path, requests_per_minute=60, tokens_per_minute=600)
+    script = SharedLLMScheduler(path, requests_per_minute=60, tokens_per_minute=600)
+
+    script.acquire(400, BATCH)
+    assert api.stats()["tokens_available"] == pytest.approx(200, abs=1)
+    assert api._try_acquire(400, INTERACTIVE) > 0
+    script.settle(400, prompt_tokens=100, completion_tokens=100)
+    assert api.stats()["tokens_available"] == pytest.approx(400, abs=1)
+
+    ticket = api._enter(INTERACTIVE)
+    assert script._try_acquire(1, BATCH) == BATCH_YIELD_SECONDS
+    api._leave(INTERACTIVE, ticket)
+    assert script._try_acquire(1, BATCH) == 0
+
+    # A waiter left behind by a dead process stops blocking batch calls once it expires
+    api._enter(INTERACTIVE)
+    monkeypatch.setattr(llm_scheduler, "WAITER_TTL_SECONDS", 0.0)
+    assert script._try_acquire(1, BATCH) == 0
+
+
+def test_failed_call_is_settled(llm, monkeypatch):
+    monkeypatch.setattr(llm_utils, "provider", FakeProvider(error=RuntimeError("upstream down")))
+    with pytest.raises(RuntimeError):
+        llm_utils.chat_completion("hello", max_tokens=100)
+    with pytest.raises(RuntimeError):
+        asyncio.run(llm_utils.achat_completion("hello", max_tokens=100))
+    assert llm.stats()["tokens_used"]["estimated"] == 2 * (len("hello") // 4 + 100)
+
+
+def test_completions_are_cached_unless_blank(llm, monkeypatch):
+    provider = FakeProvider(content="  ")
+    monkeypatch.setattr(llm_utils, "provider", provider)
+    assert llm_utils.chat_completion("hello") == ""
+    assert llm_utils.chat_completion("hello") == ""
+    assert provider.calls == 2
+
+    provider.content = "Answer"
+    assert llm_utils.chat_completion("hello") == "Answer"
+    assert asyncio.run(llm_utils.achat_completion("hello")) == "Answer"
+    assert provider.calls == 3
+    assert llm.stats()["tokens_used"] == {"prompt": 30, "completion": 15, "estimated": 0}
@@ -0,0 +1,32 @@
+from fastapi.testclient import TestClient
+import main
+from utils.app_state import AppState
+from utils.metrics import Registry
+
+
+def test_metrics_render_in_prometheus_text_format(monkeypatch):
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests.", ["endpoint"])
+    latency = registry.histogram("latency_seconds", "Latency.", ["endpoint"], buckets=(0.1, 1.0))
+    requests.inc(endpoint="/papers")
+    requests.inc(2, endpoint="/papers")
+    latency.observe(0.5, endpoint='say "hi"')
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests.",
+        "# TYPE requests_total counter",
+        'requests_total{endpoint="/papers"} 3',
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{endpoint="say \\"hi\\"",le="0.1"} 0',
+        'latency_seconds_bucket{endpoint="say \\"hi\\"",le="1.0"} 1',
+        'latency_seconds_bucket{endpoint="say \\"hi\\"",le="+Inf"} 1',
+        'latency_seconds_sum{endpoint="say \\"hi\\""} 0.5',
+        'latency_seconds_count{endpoint="say \\"hi\\""} 1',
+    ]
+
+    # The middleware records requests by route template
+    monkeypatch.setattr(main, "state", AppState())
+    client = TestClient(main.app)
+    client.get("/papers/42")
+    body = client.get("/metrics").text
+    assert 'http_requests_total{endpoint="/papers/{paper_id}",method="GET",status="503"}' in body
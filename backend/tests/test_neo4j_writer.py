@@ -0,0 +1,63 @@
+from utils.neo4j_writer import GraphWriter, RecordingDriver, STEPS, QUERIES, LEGACY_CLEANUP
+
+
+def normalise(query):
+    return " ".join(query.split())
+
+
+def step_of(query):
+    return next(step for step, q in QUERIES.items() if normalise(q) == query)
+
+
+def test_rows_are_sent_in_batches():
+    driver = RecordingDriver()
+    writer = GraphWriter(driver, batch_size=2)
+    rows = [{"id": i, "summary": f"cluster {i}"} for i in range(5)]
+
+    writer.write("clusters", rows)
+
+    assert [params["rows"] for _, params in driver.calls] == [rows[0:2], rows[2:4], rows[4:5]]
+    assert writer.stats["clusters"]["rows"] == 5
+    assert writer.stats["clusters"]["batches"] == 3
+
+
+def test_write_graph_follows_step_order_and_skips_empty_steps():
+    driver = RecordingDriver()
+    writer = GraphWriter(driver, batch_size=10)
+    graph = {
+        "paper_topics": [{"paper": "PMC1", "names": ["bone"]}],
+        "papers": [{"id": "PMC1", "cluster": 0, "title": "t", "year": 2020, "abstract": None}],
+        "topics": [{"cluster": 0, "name": "bone"}],
+        "clusters": [{"id": 0, "summary": "s"}],
+        "relations": [],
+    }
+
+    writer.write_graph(graph)
+
+    steps = [step_of(query) for query, _ in driver.calls]
+    assert steps == [s for s in STEPS if graph.get(s)]
+    assert "relations" not in writer.stats
+
+
+def test_cluster_and_paper_edges_are_cleared_before_they_are_relinked():
+    # Each clean-up runs in the step that MERGEs the node, before the steps that re-link it
+    clusters = normalise(QUERIES["clusters"])
+    assert "OPTIONAL MATCH (c)-[old:HAS_TOPIC|CONTAINS]->() DELETE old" in clusters
+    papers = normalise(QUERIES["papers"])
+    assert "OPTIONAL MATCH (p)-[stale:MENTIONS|REPORTS]->() DELETE stale" in papers
+    assert "OPTIONAL MATCH (p)-[old:BELONGS_TO]->(other:Cluster) WHERE other <> c DELETE old" in papers
+    assert STEPS.index("clusters") < STEPS.index("topics") < STEPS.index("entities")
+    assert STEPS.index("papers") < STEPS.index("paper_topics") < STEPS.index("paper_entities")
+
+
+def test_constraints_and_legacy_cleanup():
+    driver = RecordingDriver()
+    writer = GraphWriter(driver)
+
+    writer.ensure_constraints()
+    writer.drop_legacy_papers()
+
+    queries = [query for query, _ in driver.calls]
+    assert all(q.startswith("CREATE CONSTRAINT") for q in queries[:-1])
+    assert queries[-1] == normalise(LEGACY_CLEANUP)
+    assert "STARTS WITH 'PAPER_'" in queries[-1] and "DETACH DELETE" in queries[-1]
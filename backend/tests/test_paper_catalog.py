@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.paper_catalog import PaperCatalog, decode_cursor, encode_cursor
+
+
+def make_catalog():
+    df = pd.DataFrame({
+        "Title": pd.array(["Bone loss in mice", "Plant roots", "Astronaut sleep", "Radiation and DNA"], dtype="string"),
+        "Link": pd.array(["l0", "l1", "l2", "l3"], dtype="string"),
+        "abstract": pd.array(["Mice lose bone.", None, "Sleep in orbit.", "Cosmic rays damage DNA."], dtype="string"),
+        "conclusion": pd.array([None, "Roots bend toward light.", "Bone density unaffected.", None], dtype="string"),
+        "date": pd.to_datetime(["2015-03-01", "2018-06-15", None, "2021-01-10"]),
+        "year": pd.array([2015, 2018, None, 2021], dtype="Int16"),
+        "ingest_version": np.array([1, 1, 2, 3], dtype=np.int32),
+        "primary_category": pd.Categorical(["Biology", "Botany", "Human", "Biology"]),
+        "clean_full_text": ["a", "b", "c", "d"],
+    })
+    return PaperCatalog(df)
+
+
+def test_records_are_nan_clean_and_projected():
+    catalog = make_catalog()
+    assert catalog.get(2) == {
+        "id": 2, "Title": "Astronaut sleep", "Link": "l2", "abstract": "Sleep in orbit.",
+        "conclusion": "Bone density unaffected.", "date": None, "year": None, "ingest_version": 2,
+        "primary_category": "Human",
+    }
+    assert catalog.records([1, 0], ["abstract", "id", "year"]) == [
+        {"abstract": None, "id": 1, "year": 2018},
+        {"abstract": "Mice lose bone.", "id": 0, "year": 2015},
+    ]
+    assert catalog.get(0)["date"] == "2015-03-01"
+    assert catalog.get(4) is None
+    assert "clean_full_text" not in catalog.fields
+
+
+def test_records_do_not_share_state():
+    catalog = make_catalog()
+    catalog.get(0)["Title"] = "changed"
+    assert catalog.get(0)["Title"] == "Bone loss in mice"
+
+
+def test_query_filters_and_pages():
+    catalog = make_catalog()
+    total, items = catalog.query(category="Biology", fields=["id"])
+    assert (total, items) == (2, [{"id": 0}, {"id": 3}])
+    # Papers without a year drop out of year filters
+    assert catalog.query(year_from=2016, fields=["id"]) == (2, [{"id": 1}, {"id": 3}])
+    assert catalog.query(year_to=2018, fields=["id"])[0] == 2
+    assert catalog.query(since_version=1, fields=["id"]) == (2, [{"id": 2}, {"id": 3}])
+    assert catalog.query(category="Unknown") == (0, [])
+    assert catalog.query(offset=1, limit=2, fields=["id"]) == (4, [{"id": 1}, {"id": 2}])
+
+
+def test_query_matches_title_abstract_and_conclusion():
+    catalog = make_catalog()
+    assert catalog.query(q="BONE", fields=["id"]) == (2, [{"id": 0}, {"id": 2}])
+    assert catalog.query(q="light", fields=["id"]) == (1, [{"id": 1}])
+    assert catalog.query(q="dna", category="Biology", fields=["id"]) == (1, [{"id": 3}])
+    assert catalog.query(q="(", fields=["id"]) == (0, [])
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(40)) == 40
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(-1))
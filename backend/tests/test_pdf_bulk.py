@@ -0,0 +1,45 @@
+import io
+import json
+import zipfile
+import pytest
+from fastapi.testclient import TestClient
+import main
+import utils.pdf_report as pdf_report
+
+
+def mission(mission_type, phase="Planning"):
+    return {"mission": {"type": mission_type, "phase": phase}, "insights": {"summary": f"{mission_type} insight"}}
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+def test_bulk_zip_has_one_report_per_mission_and_lists_failures(client, monkeypatch):
+    def render(data):
+        if data.mission["type"] == "Venus":
+            raise ValueError("layout failed")
+        return f"%PDF {data.mission['type']}".encode()
+
+    monkeypatch.setattr(pdf_report, "render_report", render)
+    response = client.post("/generate-pdf/bulk", json=[mission("Mars"), mission("Venus"), mission("Moon", "")])
+    assert response.headers["content-type"] == "application/zip"
+
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert sorted(archive.namelist()) == ["errors.json", "mission-001-mars-planning.pdf", "mission-003-moon.pdf"]
+    assert archive.namelist()[-1] == "errors.json"
+    assert archive.read("mission-003-moon.pdf") == b"%PDF Moon"
+    assert json.loads(archive.read("errors.json")) == [{"mission": 2, "error": "layout failed"}]
+
+
+def test_bulk_zip_renders_real_reports(client):
+    archive = zipfile.ZipFile(io.BytesIO(client.post("/generate-pdf/bulk", json=[mission("Mars")]).content))
+    assert archive.namelist() == ["mission-001-mars-planning.pdf"]
+    assert archive.read("mission-001-mars-planning.pdf").startswith(b"%PDF")
+
+
+def test_bulk_request_limits(client, monkeypatch):
+    assert client.post("/generate-pdf/bulk", json=[]).status_code == 400
+    monkeypatch.setattr(main, "PDF_BULK_MAX_REPORTS", 2)
+    assert client.post("/generate-pdf/bulk", json=[mission("Mars")] * 3).status_code == 413
@@ -0,0 +1,63 @@
+import pytest
+from fastapi.testclient import TestClient
+import main
+from utils.app_state import AppState, STAGES
+
+
+@pytest.fixture
+def state(monkeypatch):
+    state = AppState()
+    monkeypatch.setattr(main, "state", state)
+    return state
+
+
+@pytest.fixture
+def client(state):
+    # Not entered as a context manager, so the startup warm-up does not run
+    return TestClient(main.app)
+
+
+def test_ready_is_503_until_every_stage_is_ready(client, state):
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["stages"]["model"]["status"] == "pending"
+    assert client.get("/health").status_code == 200
+
+    for name in STAGES:
+        state.stages[name]["status"] = "ready"
+    assert client.get("/ready").status_code == 200
+
+
+def test_endpoints_return_503_with_the_stages_they_wait_for(client, state):
+    response = client.get("/search", params={"q": "bone"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+    assert response.json()["detail"] == "Service warming up, waiting for: dataset, paper_embeddings"
+
+    state.stages["dataset"]["status"] = "ready"
+    assert client.get("/papers").json()["detail"] == "Service warming up, waiting for: paper_embeddings"
+    assert client.get("/ai-tabs", params={"dataset": "unknown"}).status_code == 400
+
+
+def test_a_failed_stage_only_blocks_the_stages_that_need_it(state, monkeypatch):
+    ran = []
+
+    def fail():
+        raise RuntimeError("embedding store unreadable")
+
+    monkeypatch.setattr(state, "_load_datasets", lambda: ran.append("dataset"))
+    monkeypatch.setattr(state, "_embed_categories", fail)
+    monkeypatch.setattr(state, "_embed_papers", lambda: ran.append("paper_embeddings"))
+    monkeypatch.setattr(state, "_embed_images", lambda: ran.append("image_embeddings"))
+    monkeypatch.setattr(state, "_build_lexical_index", lambda: ran.append("lexical_index"))
+    monkeypatch.setattr(state, "_load_model", lambda: setattr(state, "embedding_model", object()))
+
+    state.warm_up()
+
+    assert ran == ["dataset", "image_embeddings", "lexical_index"]
+    stages = state.status()["stages"]
+    assert stages["category_embeddings"] == {**stages["category_embeddings"], "status": "failed",
+                                             "error": "embedding store unreadable"}
+    assert stages["paper_embeddings"]["error"] == "requires dataset, category_embeddings"
+    assert state.is_ready("dataset", "image_embeddings", "lexical_index", "model")
+    assert not state.status()["ready"]
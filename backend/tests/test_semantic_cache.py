@@ -0,0 +1,58 @@
+import numpy as np
+from utils.semantic_cache import SemanticCache, mission_key, mission_numbers, mission_text
+
+MISSION = {
+    "type": "Mars", "phase": "Planning", "objective": "Scientific Research", "deltaV": 5.6, "crew": 4,
+    "fuel": "12000", "coordinates": "18.4,77.5", "context": "Sample return from Jezero crater",
+}
+
+
+def test_mission_fields_are_split_into_key_numbers_and_text():
+    assert mission_key({**MISSION, "type": " mars "}, 3) == ("mars", "planning", "scientific research", 3)
+    assert mission_numbers(MISSION) == {
+        "deltaV": (5.6,), "crew": (4.0,), "fuel": (12000.0,), "coordinates": (18.4, 77.5),
+    }
+    assert mission_text(MISSION) == "context: Sample return from Jezero crater"
+
+
+def test_lookup_requires_key_numbers_and_similarity():
+    cache = SemanticCache(threshold=0.9)
+    key = mission_key(MISSION)
+    cache.add(key, [1.0, 0.0], "result", mission_numbers(MISSION))
+
+    assert cache.lookup(key, [1.0, 0.1], mission_numbers(MISSION))[0] == "result"
+    assert cache.lookup(key, [0.0, 1.0], mission_numbers(MISSION)) == (None, 0.0, None)
+    # Same text, different crew or landing site: never served, however close the embedding
+    assert cache.lookup(key, [1.0, 0.0], mission_numbers({**MISSION, "crew": 6}))[0] is None
+    assert cache.lookup(key, [1.0, 0.0], mission_numbers({**MISSION, "coordinates": "18.5,77.5"}))[0] is None
+    assert cache.lookup(mission_key({**MISSION, "type": "Moon"}), [1.0, 0.0], mission_numbers(MISSION))[0] is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_numeric_tolerance_per_field():
+    cache = SemanticCache(threshold=0.9, tolerances={"fuel": 0.05})
+    key = mission_key(MISSION)
+    cache.add(key, [1.0, 0.0], "result", mission_numbers(MISSION))
+    assert cache.lookup(key, [1.0, 0.0], mission_numbers({**MISSION, "fuel": 12400}))[0] == "result"
+    assert cache.lookup(key, [1.0, 0.0], mission_numbers({**MISSION, "fuel": 13000}))[0] is None
+    assert cache.lookup(key, [1.0, 0.0], mission_numbers({**MISSION, "deltaV": 5.61}))[0] is None
+
+
+def test_add_replaces_shadowed_entries_and_evicts_lru():
+    cache = SemanticCache(threshold=0.9, max_entries=2)
+    numbers = mission_numbers(MISSION)
+    cache.add("k", [1.0, 0.0], "old", numbers)
+    cache.add("k", [1.0, 0.05], "new", numbers)
+    cache.add("k", [1.0, 0.0], "other crew", mission_numbers({**MISSION, "crew": 2}))
+    assert cache.stats()["entries"] == 2
+    assert cache.lookup("k", [1.0, 0.0], numbers)[0] == "new"
+
+    cache.add("other", np.array([0.0, 1.0]), "third")
+    assert cache.lookup("k", [1.0, 0.0], mission_numbers({**MISSION, "crew": 2}))[0] is None
+
+
+def test_entries_expire():
+    cache = SemanticCache(threshold=0.9, ttl_seconds=-1)
+    cache.add("k", [1.0, 0.0], "result")
+    assert cache.lookup("k", [1.0, 0.0]) == (None, None, None)
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,46 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+import main
+
+
+def parse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, "require_dataset", lambda dataset: None)
+    monkeypatch.setattr(main, "data_summary", lambda dataset: "summary")
+    return TestClient(main.app)
+
+
+def test_ask_ai_streams_tokens_then_the_full_answer(client, monkeypatch):
+    async def stream(prompt, endpoint):
+        for delta in ["Microgravity ", "affects ", "bone density. "]:
+            yield delta
+
+    monkeypatch.setattr(main, "astream_chat_completion", stream)
+    response = client.post("/ask-ai", params={"stream": True}, json={"question": "What about bones?"})
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["cache-control"] == "no-cache"
+    assert parse_events(response.text) == [
+        ("token", {"text": "Microgravity "}),
+        ("token", {"text": "affects "}),
+        ("token", {"text": "bone density. "}),
+        ("done", {"answer": "Microgravity affects bone density."}),
+    ]
+
+
+def test_stream_failure_ends_with_an_error_event(client, monkeypatch):
+    async def stream(prompt, endpoint):
+        yield "partial"
+        raise RuntimeError("rate limited")
+
+    monkeypatch.setattr(main, "astream_chat_completion", stream)
+    events = parse_events(client.post("/ask-ai", params={"stream": True}, json={"question": "q"}).text)
+    assert events == [("token", {"text": "partial"}), ("error", {"detail": "AI request failed: rate limited"})]
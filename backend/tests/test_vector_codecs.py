@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from utils.vector_codecs import CODECS, build_codec, codec_from_arrays
+from utils.vector_index import BruteForceIndex, normalize, top_k_indices
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    rng = np.random.default_rng(0)
+    # Clustered vectors, like sentence embeddings of papers on a handful of topics
+    centers = rng.standard_normal((8, 64))
+    vectors = centers[rng.integers(0, 8, 2000)] + 0.6 * rng.standard_normal((2000, 64))
+    queries = centers[rng.integers(0, 8, 50)] + 0.6 * rng.standard_normal((50, 64))
+    return vectors.astype(np.float32), queries.astype(np.float32)
+
+
+def recall(index, vectors, queries, k=10):
+    exact = normalize(vectors)
+    hits = []
+    for q in queries:
+        truth = set(top_k_indices(exact @ normalize(q), k).tolist())
+        hits.append(len(truth & set(index.search(q, k)[0].tolist())) / k)
+    return float(np.mean(hits))
+
+
+@pytest.mark.parametrize("compression, max_error", [("float16", 1e-3), ("int8", 0.05), ("pca", 0.2)])
+def test_codec_scores_approximate_cosine(corpus, compression, max_error):
+    vectors, queries = corpus
+    normalized = normalize(vectors)
+    codec = build_codec(normalized, compression, pca_dim=32)
+    q = normalize(queries[0])
+    assert np.abs(codec.scores(q) - normalized @ q).max() < max_error
+    assert codec.nbytes < normalized.nbytes
+
+
+def test_codec_round_trips_through_its_arrays(corpus):
+    vectors, queries = corpus
+    for compression in CODECS:
+        codec = build_codec(normalize(vectors), compression, pca_dim=32)
+        copy = codec_from_arrays(compression, codec.arrays())
+        assert np.array_equal(copy.scores(normalize(queries[0])), codec.scores(normalize(queries[0])))
+
+
+def test_unknown_compression_and_empty_corpus_fall_back_to_float32():
+    assert build_codec(np.ones((3, 4), dtype=np.float32), "zstd").name == "none"
+    assert build_codec(np.empty((0, 4), dtype=np.float32), "int8").name == "none"
+
+
+def test_rerank_restores_recall(corpus):
+    vectors, queries = corpus
+    assert recall(BruteForceIndex(vectors), vectors, queries) == 1.0
+    coarse = BruteForceIndex(vectors, compression="pca", pca_dim=16)
+    reranked = BruteForceIndex(vectors, compression="pca", pca_dim=16, rerank=200)
+    assert recall(coarse, vectors, queries) < 0.5
+    assert recall(reranked, vectors, queries) >= 0.95
+    assert recall(BruteForceIndex(vectors, compression="int8", rerank=50), vectors, queries) >= 0.99
+
+    # Re-ranked scores are exact cosines
+    ids, scores = reranked.search(queries[0], 5)
+    assert np.allclose(scores, normalize(vectors[ids]) @ normalize(queries[0]), atol=1e-6)
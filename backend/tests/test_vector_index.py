@@ -0,0 +1,70 @@
+import os
+import numpy as np
+import pytest
+from utils.vector_index import (
+    BruteForceIndex, IVFIndex, build_index, index_arrays, index_from_arrays, load_or_build_index,
+    normalize, top_k_indices,
+)
+
+
+@pytest.fixture(scope="module")
+def vectors():
+    return np.random.default_rng(0).standard_normal((500, 16)).astype(np.float32)
+
+
+def exact_top(vectors, query, k):
+    return top_k_indices(normalize(vectors) @ normalize(query), k)
+
+
+def test_top_k_indices_matches_a_full_sort():
+    scores = np.random.default_rng(1).standard_normal(100)
+    assert top_k_indices(scores, 5).tolist() == np.argsort(-scores)[:5].tolist()
+    assert len(top_k_indices(scores, 500)) == 100
+    assert len(top_k_indices(scores, 0)) == 0
+
+
+def test_brute_force_is_exact(vectors):
+    index = BruteForceIndex(vectors)
+    ids, scores = index.search(vectors[7], 5)
+    assert ids.tolist() == exact_top(vectors, vectors[7], 5).tolist()
+    assert ids[0] == 7 and scores[0] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_ivf_is_exact_when_probing_every_list(vectors):
+    index = IVFIndex(vectors, n_lists=10, n_probe=3)
+    query = vectors[3] + 0.1
+    assert index.search(query, 10, n_probe=10)[0].tolist() == exact_top(vectors, query, 10).tolist()
+    assert index.search(vectors[3], 1)[0].tolist() == [3]
+
+
+def test_index_round_trips_through_its_arrays(vectors):
+    index = build_index(vectors, "ivf", n_lists=10, n_probe=4)
+    copy = index_from_arrays("ivf", index_arrays(index), n_probe=4)
+    assert np.array_equal(copy.search(vectors[0], 5)[0], index.search(vectors[0], 5)[0])
+
+
+def test_hnsw_without_hnswlib_falls_back_to_ivf(vectors, monkeypatch):
+    import utils.vector_index as vector_index
+
+    monkeypatch.setattr(vector_index, "hnswlib", None)
+    assert build_index(vectors, "hnsw").backend == "ivf"
+
+
+def test_saved_index_is_reused_until_the_vectors_change(vectors, tmp_path):
+    index_dir = str(tmp_path)
+    load_or_build_index(vectors, "papers", index_dir, backend="ivf", n_lists=10)
+    saved = os.listdir(index_dir)
+    assert len(saved) == 1 and saved[0].startswith("papers-ivf-")
+
+    # Warm restart: the saved file is loaded, with the configured n_probe
+    reloaded = load_or_build_index(vectors, "papers", index_dir, backend="ivf", n_probe=10)
+    assert reloaded.n_probe == 10
+    assert os.listdir(index_dir) == saved
+
+    # New vectors get a new index file and the stale one is removed
+    load_or_build_index(vectors[:-1], "papers", index_dir, backend="ivf", n_lists=10)
+    assert len(os.listdir(index_dir)) == 1 and os.listdir(index_dir) != saved
+
+    # Brute force is never persisted
+    load_or_build_index(vectors, "images", index_dir, backend="brute")
+    assert len(os.listdir(index_dir)) == 1
@@ -1,11 +1,146 @@
-from config.config import groq_client, tooltips
+from config.config import (
+    tooltips, LLM_CACHE_ENABLED, LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_MAX_ENTRIES, LLM_CACHE_DISABLED_ENDPOINTS, LLM_MAX_CONCURRENCY,
+    LLM_PROVIDER, LLM_STUB_LATENCY_MS, LLM_STUB_JITTER_MS, LLM_MODELS, LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE,
+    LLM_SCHEDULER_SHARED, LLM_SCHEDULER_PATH,
+)
+from utils.llm_cache import LLMCache, make_key
+from utils.llm_providers import LLMResponse, create_provider
+from utils.llm_scheduler import LLMScheduler, SharedLLMScheduler, INTERACTIVE, BATCH, estimate_tokens
+from utils.metrics import llm_call, llm_cache_hit
 import re
+import asyncio
 
-def generate_mission_summary(mission_data):
+CHAT_MODEL = LLM_MODELS["chat"]
+
+provider = create_provider(LLM_PROVIDER, stub_latency_ms=LLM_STUB_LATENCY_MS, stub_jitter_ms=LLM_STUB_JITTER_MS)
+if LLM_SCHEDULER_SHARED and (LLM_REQUESTS_PER_MINUTE or LLM_TOKENS_PER_MINUTE):
+    scheduler = SharedLLMScheduler(LLM_SCHEDULER_PATH, LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE)
+else:
+    scheduler = LLMScheduler(LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE)
+
+llm_cache = None
+if LLM_CACHE_ENABLED:
+    llm_cache = LLMCache(LLM_CACHE_PATH, max_entries=LLM_CACHE_MAX_ENTRIES, ttl_seconds=LLM_CACHE_TTL_SECONDS)
+    llm_cache.purge_expired()
+
+
+# Bounds concurrent upstream calls made from the async endpoints
+llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+
+def _cache_key(messages, endpoint, model, use_cache, params):
+    if use_cache and llm_cache is not None and endpoint not in LLM_CACHE_DISABLED_ENDPOINTS:
+        return make_key(model, messages, **params)
+    return None
+
+
+def _settle(estimated, response):
+    # Runs for failed calls too (response None): they keep their estimate charged
+    if response is None:
+        scheduler.settle(estimated)
+    else:
+        scheduler.settle(estimated, response.prompt_tokens, response.completion_tokens)
+
+
+def chat_completion(prompt=None, endpoint="default", model=CHAT_MODEL, use_cache=True,
+                    priority=INTERACTIVE, messages=None, **params):
+    """
+    Chat completion through the shared LLM cache and rate-limit scheduler.
+    Pass a single `prompt` or a full `messages` list (e.g. for vision input).
+    `endpoint` names the caller for per-endpoint opt-out and hit/miss counters;
+    batch callers (ingestion scripts) should pass `priority=BATCH`.
+    """
+    messages = messages or [{"role": "user", "content": prompt}]
+    key = _cache_key(messages, endpoint, model, use_cache, params)
+    if key is not None:
+        content = llm_cache.get(key, endpoint)
+        if content is not None:
+            llm_cache_hit(endpoint, model)
+            return content
+
+    estimated = estimate_tokens(messages, params.get("max_tokens"))
+    with llm_call(endpoint, model) as call:
+        scheduler.acquire(estimated, priority)
+        response = None
+        try:
+            response = provider.complete(model, messages, **params)
+        finally:
+            _settle(estimated, response)
+        call.update(prompt_tokens=response.prompt_tokens, completion_tokens=response.completion_tokens)
+    content = (response.content or "").strip()
+
+    if key is not None and content:
+        llm_cache.set(key, content, model)
+    return content
+
+
+async def achat_completion(prompt=None, endpoint="default", model=CHAT_MODEL, use_cache=True,
+                           priority=INTERACTIVE, messages=None, **params):
+    """Async `chat_completion`: non-blocking client, at most LLM_MAX_CONCURRENCY calls in flight."""
+    messages = messages or [{"role": "user", "content": prompt}]
+    key = _cache_key(messages, endpoint, model, use_cache, params)
+    if key is not None:
+        content = await asyncio.to_thread(llm_cache.get, key, endpoint)
+        if content is not None:
+            llm_cache_hit(endpoint, model)
+            return content
+
+    estimated = estimate_tokens(messages, params.get("max_tokens"))
+    with llm_call(endpoint, model) as call:
+        async with llm_semaphore:
+            await scheduler.aacquire(estimated, priority)
+            response = None
+            try:
+                response = await provider.acomplete(model, messages, **params)
+            finally:
+                _settle(estimated, response)
+        call.update(prompt_tokens=response.prompt_tokens, completion_tokens=response.completion_tokens)
+    content = (response.content or "").strip()
+
+    if key is not None and content:
+        await asyncio.to_thread(llm_cache.set, key, content, model)
+    return content
+
+
+async def astream_chat_completion(prompt=None, endpoint="default", model=CHAT_MODEL, use_cache=True,
+                                  priority=INTERACTIVE, messages=None, **params):
     """
-    Use Groq to create a concise, semantically rich summary of a mission.
+    Streaming variant of `achat_completion`: yields text deltas as they arrive.
+    A cache hit is yielded as a single chunk; a completed, non-blank stream is cached.
     """
-    prompt = f"""
+    messages = messages or [{"role": "user", "content": prompt}]
+    key = _cache_key(messages, endpoint, model, use_cache, params)
+    if key is not None:
+        content = await asyncio.to_thread(llm_cache.get, key, endpoint)
+        if content is not None:
+            llm_cache_hit(endpoint, model)
+            yield content
+            return
+
+    parts = []
+    usage = None
+    estimated = estimate_tokens(messages, params.get("max_tokens"))
+    with llm_call(endpoint, model) as call:
+        async with llm_semaphore:
+            await scheduler.aacquire(estimated, priority)
+            try:
+                async for delta in provider.astream(model, messages, **params):
+                    parts.append(delta)
+                    yield delta
+                # Streams report no usage: same ~4 chars per token estimate as the scheduler
+                usage = LLMResponse(None, estimate_tokens(messages, 0), len("".join(parts)) // 4)
+            finally:
+                _settle(estimated, usage)
+        call.update(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+
+    content = "".join(parts).strip()
+    if key is not None and content:
+        await asyncio.to_thread(llm_cache.set, key, content, model)
+
+
+def mission_summary_prompt(mission_data):
+    return f"""
     You are given a mission described with the following fields:
 
     Mission Data:
@@ -23,14 +158,15 @@ def generate_mission_summary(mission_data):
     - Return only the summary text, as a single paragraph.
     """
 
-    response_summary = groq_client.chat.completions.create(
-                model="llama-3.1-8b-instant",
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
-    content = response_summary.choices[0].message.content.strip()
-    return content
+def generate_mission_summary(mission_data):
+    """
+    Use the LLM to create a concise, semantically rich summary of a mission.
+    """
+    return chat_completion(mission_summary_prompt(mission_data), endpoint="mission-summary")
+
+async def agenerate_mission_summary(mission_data):
+    """Async variant of `generate_mission_summary` for the async endpoints."""
+    return await achat_completion(mission_summary_prompt(mission_data), endpoint="mission-summary")
 
 def clean_groq_summary(summary: str) -> str:
     """
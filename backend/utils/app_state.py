@@ -0,0 +1,273 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+from sklearn.metrics.pairwise import cosine_similarity
+from config.config import (
+    category_names, category_texts, EMBEDDING_MODEL_NAME, EMBEDDING_CACHE_DIR,
+    EMBEDDING_BACKEND, EMBEDDING_ONNX_INT8_FILE,
+    VECTOR_INDEX_BACKEND, VECTOR_INDEX_DIR, VECTOR_INDEX_PARAMS, BM25_K1, BM25_B,
+)
+from utils.df_utils import clean_full_text
+from utils.embedding_store import EmbeddingStore
+from utils.encoder_backends import resolve_backend, store_key, load_encoder
+from utils.vector_index import load_or_build_index
+from utils.lexical_index import BM25Index
+from utils.paper_catalog import PaperCatalog
+from utils.columnar_store import load_papers, load_budget
+from utils.metrics import STARTUP_STAGE_SECONDS, STARTUP_STAGE_READY
+
+DATA_DIR = "data"
+INPUT_FILE = os.path.join(DATA_DIR, "extracted_all_with_sections.csv")
+BUDGET_FILE = os.path.join(DATA_DIR, "NASABudgetMilestonesDataset.csv")
+IMAGE_METADATA_FILE = os.path.join(DATA_DIR, "paper_images_metadata.json")
+
+# Warm-up order. Embedding stages come before the model stage: when the
+# embedding store is warm they need no model at all, so tabular endpoints
+# (categories included) can serve while the model is still loading.
+STAGES = ["dataset", "category_embeddings", "paper_embeddings", "image_embeddings", "lexical_index", "model"]
+EMBEDDING_STAGES = ["category_embeddings", "paper_embeddings", "image_embeddings"]
+
+
+def files_version(paths, *extra):
+    """Cheap dataset version: hash of each file's size and mtime plus any extra keys."""
+    digest = hashlib.sha1()
+    for path in paths:
+        st = os.stat(path)
+        digest.update(f"{path}:{st.st_size}:{st.st_mtime_ns}".encode())
+    for item in extra:
+        digest.update(str(item).encode())
+    return digest.hexdigest()[:16]
+
+
+class StageFailed(Exception):
+    pass
+
+
+class AppState:
+    """
+    Holds everything the API serves from (datasets, model, embeddings) and
+    tracks warm-up progress per stage so endpoints can check what is ready.
+    """
+
+    def __init__(self):
+        self.stages = {name: {"status": "pending", "seconds": None, "error": None} for name in STAGES}
+        for name in STAGES:
+            STARTUP_STAGE_READY.set(0, stage=name)
+        self.started_at = time.time()
+        self._model_lock = threading.Lock()
+
+        self.dataset_version = None
+        self.df = None
+        self.df_nasa_budget = None
+        self.all_images_metadata = []
+        self.embedding_model = None
+        # Resolved up front so the embedding store key matches the vectors the model will produce
+        self.embedding_backend = resolve_backend(EMBEDDING_BACKEND)
+        self.embedding_key = store_key(EMBEDDING_MODEL_NAME, self.embedding_backend)
+        self.embedding_store = None
+        # Embedding stages served from the optimised backend's store before a fallback to torch
+        self.stale_stages = []
+        self.category_embeddings = None
+        self.text_embeddings = None
+        self.image_embeddings = None
+        self.paper_index = None
+        self.image_index = None
+        self.lexical_index = None
+        self.paper_catalog = None
+
+    @property
+    def datasets(self):
+        return {
+            "nasa-budget": self.df_nasa_budget,
+            "bioscience": self.df,
+        }
+
+    def is_ready(self, *stages):
+        return all(self.stages[s]["status"] == "ready" for s in stages)
+
+    def status(self):
+        return {
+            "ready": self.is_ready(*STAGES),
+            "uptime_seconds": round(time.time() - self.started_at, 2),
+            "embedding_backend": self.embedding_backend,
+            "stages": self.stages,
+        }
+
+    def run_stage(self, name, fn):
+        stage = self.stages[name]
+        if stage["status"] == "ready":
+            return
+        stage["status"] = "running"
+        start = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            stage["status"] = "failed"
+            stage["error"] = str(e) or type(e).__name__
+            print(f"❌ Warm-up stage '{name}' failed: {stage['error']}")
+            raise StageFailed(name) from e
+        finally:
+            stage["seconds"] = round(time.perf_counter() - start, 3)
+            STARTUP_STAGE_SECONDS.set(stage["seconds"], stage=name)
+        stage["status"] = "ready"
+        STARTUP_STAGE_READY.set(1, stage=name)
+
+    def source_version(self):
+        # Categories are derived from the embedding model, so it is part of the version
+        return files_version([INPUT_FILE, BUDGET_FILE, IMAGE_METADATA_FILE], self.embedding_key)
+
+    def get_model(self):
+        """Load the SentenceTransformer on first use (thread-safe)."""
+        with self._model_lock:
+            if self.embedding_model is None:
+                self.run_stage("model", self._load_model)
+        return self.embedding_model
+
+    def _load_model(self):
+        print(f"🚀 Loading SentenceTransformer model ({self.embedding_backend} backend)...")
+        requested = self.embedding_backend
+        self.embedding_model, self.embedding_backend = load_encoder(
+            EMBEDDING_MODEL_NAME, requested, EMBEDDING_ONNX_INT8_FILE
+        )
+        if self.embedding_backend != requested:
+            # The loaded model's vectors belong under the fallback backend's key, not the optimised one
+            self.embedding_key = store_key(EMBEDDING_MODEL_NAME, self.embedding_backend)
+            if self.embedding_store is not None:
+                self.embedding_store.open(self.embedding_key)
+            self.stale_stages = [s for s in EMBEDDING_STAGES if self.stages[s]["status"] == "ready"]
+
+    def _load_datasets(self):
+        # Typed columns (datetime date, Int16 year) from a memory-mapped Parquet file
+        df = load_papers()
+        df["clean_full_text"] = clean_full_text(df).astype(df["Title"].dtype)
+
+        df_nasa_budget = load_budget()
+        if "Total Budget" in df_nasa_budget.columns:
+            df_nasa_budget["Deviation"] = df_nasa_budget["Total Budget"].pct_change().fillna(0) * 100
+
+        with open(IMAGE_METADATA_FILE, "r", encoding="utf-8") as f:
+            all_images_metadata = json.load(f)
+
+        self.dataset_version = self.source_version()
+        self.df = df
+        self.df_nasa_budget = df_nasa_budget
+        self.all_images_metadata = all_images_metadata
+        self.embedding_store = EmbeddingStore(self.embedding_key, EMBEDDING_CACHE_DIR)
+
+    def _embed_categories(self):
+        print("🔬 Generating category embeddings...")
+        self.category_embeddings = self.embedding_store.encode(category_texts, self.get_model)
+
+    def _embed_papers(self):
+        print("🧠 Generating paper embeddings...")
+        # A view on the memory-mapped store: only the indexes (and re-ranking reads) touch the float32 rows
+        self.text_embeddings = self.embedding_store.vectors(self.df["clean_full_text"].tolist(), self.get_model)
+
+        print("🪐 Performing semantic categorization...")
+        similarities = cosine_similarity(self.text_embeddings, self.category_embeddings)
+        best_idxs = np.argmax(similarities, axis=1)
+        self.df["primary_category"] = pd.Categorical.from_codes(best_idxs, categories=category_names)
+        self.paper_catalog = PaperCatalog(self.df)
+
+        self.paper_index = self._build_index("papers", self.text_embeddings)
+
+    def _image_texts(self):
+        # Caption + description
+        return [(f"{img['caption']} {img.get('description', '')}").strip() for img in self.all_images_metadata]
+
+    def embedding_texts(self):
+        """Every text the embedding stages encode (what `EmbeddingStore.compact` should keep)."""
+        if self.df is None:
+            self._load_datasets()
+        return [*category_texts, *self.df["clean_full_text"].tolist(), *self._image_texts()]
+
+    def _embed_images(self):
+        image_texts = self._image_texts()
+        print(f"🔹 Generating embeddings for {len(image_texts)} images...")
+        self.image_embeddings = self.embedding_store.vectors(image_texts, self.get_model)
+        self.image_index = self._build_index("images", self.image_embeddings)
+        print("✅ Image embeddings ready.")
+
+    def _build_lexical_index(self):
+        print("🔎 Building BM25 index...")
+        self.lexical_index = BM25Index(self.df["clean_full_text"].tolist(), k1=BM25_K1, b=BM25_B)
+
+    def _build_index(self, name, vectors):
+        return load_or_build_index(
+            vectors,
+            name,
+            VECTOR_INDEX_DIR,
+            backend=VECTOR_INDEX_BACKEND,
+            **VECTOR_INDEX_PARAMS.get(VECTOR_INDEX_BACKEND, {}),
+        )
+
+    def warm_up(self):
+        """
+        Run every stage in order. A failed stage is recorded in `stages` and
+        only blocks the stages that depend on it.
+        """
+        steps = [
+            ("dataset", self._load_datasets, []),
+            ("category_embeddings", self._embed_categories, ["dataset"]),
+            ("paper_embeddings", self._embed_papers, ["dataset", "category_embeddings"]),
+            ("image_embeddings", self._embed_images, ["dataset"]),
+            ("lexical_index", self._build_lexical_index, ["dataset"]),
+        ]
+        for name, fn, needs in steps:
+            if not self.is_ready(*needs):
+                self.stages[name].update(status="failed", error=f"requires {', '.join(needs)}")
+                continue
+            try:
+                self.run_stage(name, fn)
+            except StageFailed:
+                continue
+        try:
+            self.get_model()
+        except StageFailed:
+            pass
+        self._reembed_stale()
+        print("✅ Warm-up finished." if self.is_ready(*STAGES) else "⚠️ Warm-up finished with errors.")
+
+    def _reembed_stale(self):
+        """Re-encode the embeddings served from the optimised backend's store with the fallback model."""
+        stale, self.stale_stages = self.stale_stages, []
+        if stale:
+            print(f"🔁 Encoder fell back to {self.embedding_backend}, re-encoding {', '.join(stale)}...")
+            self.dataset_version = self.source_version()
+        embed = {
+            "category_embeddings": self._embed_categories,
+            "paper_embeddings": self._embed_papers,
+            "image_embeddings": self._embed_images,
+        }
+        for name in stale:
+            embed[name]()
+
+    def warm_up_from_snapshot(self):
+        """
+        Multi-worker mode: attach to the shared snapshot (published by the
+        first worker, or beforehand by `python -m utils.shared_snapshot`)
+        instead of building private copies of the data and embeddings.
+        Only the model is loaded per worker.
+        """
+        from utils.shared_snapshot import ensure_snapshot, attach
+
+        try:
+            path = ensure_snapshot(self)
+            attach(self, path)
+            print(f"🔗 Attached to shared snapshot {path}")
+        except Exception as e:
+            # Fall back to private copies rather than not serving at all
+            print(f"❌ Could not attach to the shared snapshot: {e}")
+            if not self.is_ready(*STAGES[:-1]):
+                self.warm_up()
+                return
+        try:
+            self.get_model()
+        except StageFailed:
+            pass
+        # The publisher loaded the model in this same environment and already re-encoded after any fallback
+        self.stale_stages = []
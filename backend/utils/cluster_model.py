@@ -0,0 +1,93 @@
+import os
+import json
+import time
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from sklearn.cluster import KMeans, MiniBatchKMeans
+
+
+class ClusterModel:
+    """
+    Persisted KMeans centroids for the knowledge graph clusters
+    (`centroids.npy` + `state.json` in `model_dir`).
+
+    New papers are assigned to their nearest centroid instead of refitting.
+    `drift()` compares the corpus' mean distance to its centroids with the
+    value measured at fit time; callers refit once it passes a threshold. On
+    refit the new clusters are matched to the old ones (Hungarian assignment
+    on centroid distance), so cluster ids survive refits.
+    """
+
+    def __init__(self, model_dir):
+        self.dir = model_dir
+        self.centroids_path = os.path.join(model_dir, "centroids.npy")
+        self.state_path = os.path.join(model_dir, "state.json")
+        self.centroids = None
+        self.state = {}
+        if os.path.exists(self.centroids_path) and os.path.exists(self.state_path):
+            self.centroids = np.load(self.centroids_path)
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                self.state = json.load(f)
+
+    def compatible(self, embedding_model, n_clusters):
+        return (
+            self.centroids is not None
+            and self.state.get("embedding_model") == embedding_model
+            and len(self.centroids) == n_clusters
+        )
+
+    def fit(self, vectors, n_clusters, embedding_model, minibatch=False, random_state=42):
+        if minibatch:
+            kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=random_state, batch_size=1024, n_init=3)
+        else:
+            kmeans = KMeans(n_clusters=n_clusters, random_state=random_state)
+        kmeans.fit(vectors)
+        centroids = kmeans.cluster_centers_.astype(np.float32)
+
+        if self.centroids is not None and self.centroids.shape == centroids.shape:
+            # order[i] = old id for new cluster i
+            cost = np.linalg.norm(centroids[:, None, :] - self.centroids[None, :, :], axis=2)
+            new_idx, old_idx = linear_sum_assignment(cost)
+            order = np.empty(n_clusters, dtype=int)
+            order[new_idx] = old_idx
+            aligned = np.empty_like(centroids)
+            aligned[order] = centroids
+            centroids = aligned
+
+        self.centroids = centroids
+        _, distances = self.assign(vectors)
+        self.state = {
+            "embedding_model": embedding_model,
+            "algorithm": "minibatch" if minibatch else "kmeans",
+            "fitted_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "fitted_papers": int(len(vectors)),
+            "fit_mean_distance": float(distances.mean()),
+            "pushed_version": None,
+        }
+
+    def assign(self, vectors):
+        """Nearest-centroid label and distance for each vector."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        # |a-b|^2 = |a|^2 - 2ab + |b|^2, without the (n, k, dim) intermediate
+        squared = (
+            (vectors ** 2).sum(axis=1)[:, None]
+            - 2 * vectors @ self.centroids.T
+            + (self.centroids ** 2).sum(axis=1)[None, :]
+        )
+        labels = squared.argmin(axis=1)
+        distances = np.sqrt(np.maximum(squared[np.arange(len(vectors)), labels], 0))
+        return labels, distances
+
+    def drift(self, vectors):
+        """Relative growth of the mean distance to the nearest centroid since the fit (0 = no drift)."""
+        _, distances = self.assign(vectors)
+        baseline = self.state.get("fit_mean_distance") or 0.0
+        return float(distances.mean() / baseline - 1) if baseline else 0.0
+
+    def save(self):
+        os.makedirs(self.dir, exist_ok=True)
+        np.save(self.centroids_path, self.centroids)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
@@ -0,0 +1,135 @@
+import os
+import pandas as pd
+from utils.corpus_store import extract_pmc_id
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # CSV only
+    pa = pq = None
+
+DATA_DIR = "data"
+PAPERS_CSV = os.path.join(DATA_DIR, "extracted_all_with_sections.csv")
+PAPERS_PARQUET = os.path.join(DATA_DIR, "papers.parquet")
+BUDGET_CSV = os.path.join(DATA_DIR, "NASABudgetMilestonesDataset.csv")
+BUDGET_PARQUET = os.path.join(DATA_DIR, "nasa_budget.parquet")
+
+# Columns the API reads; `sections` (one JSON blob per paper) is pruned
+PAPER_API_COLUMNS = ["Title", "Link", "abstract", "conclusion", "date", "year", "pmc_id", "ingest_version"]
+
+
+def papers_schema(with_sections=False):
+    fields = [
+        ("Title", pa.string()),
+        ("Link", pa.string()),
+        ("abstract", pa.string()),
+        ("conclusion", pa.string()),
+        ("date", pa.timestamp("ms")),
+        ("year", pa.int16()),
+        ("pmc_id", pa.string()),
+        ("ingest_version", pa.int32()),
+    ]
+    if with_sections:
+        fields.append(("sections", pa.string()))
+    return pa.schema(fields)
+
+
+def type_papers(df):
+    """Apply the papers schema to a frame read from CSV: real datetimes, nullable int year."""
+    df = df.copy()
+    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    df["year"] = df["date"].dt.year.astype("Int16")
+    if "pmc_id" not in df.columns:
+        df["pmc_id"] = df["Link"].map(extract_pmc_id)
+    if "ingest_version" not in df.columns:
+        df["ingest_version"] = 0
+    df["ingest_version"] = df["ingest_version"].fillna(0).astype("int32")
+    return df
+
+
+def type_budget(df):
+    df = df.copy()
+    if "Key Milestone" in df.columns:
+        df["Key Milestone"] = df["Key Milestone"].astype("category")
+    return df
+
+
+def read_budget_csv(path=BUDGET_CSV):
+    return pd.read_csv(path, quotechar='"', encoding="utf-8-sig", engine="python")
+
+
+def write_papers(df, parquet_path=PAPERS_PARQUET):
+    """Write the processed papers as Parquet; call after the CSV export so the Parquet file is newer."""
+    if pq is None:
+        return
+    typed = type_papers(df)
+    schema = papers_schema(with_sections="sections" in typed.columns)
+    table = pa.Table.from_pandas(typed[schema.names], schema=schema, preserve_index=False)
+    _write_table(table, parquet_path)
+
+
+def write_budget(df, parquet_path=BUDGET_PARQUET):
+    if pq is None:
+        return
+    _write_table(pa.Table.from_pandas(type_budget(df), preserve_index=False), parquet_path)
+
+
+def _write_table(table, path):
+    tmp_path = path + ".tmp"
+    pq.write_table(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, path)
+
+
+def _is_fresh(parquet_path, csv_path):
+    """Parquet is used unless it is missing or the CSV was edited after it was written."""
+    if not os.path.exists(parquet_path):
+        return False
+    return not os.path.exists(csv_path) or os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path)
+
+
+def _read_table(path, columns=None):
+    schema_names = pq.read_schema(path).names
+    if columns is not None:
+        columns = [c for c in columns if c in schema_names]
+    table = pq.read_table(path, columns=columns, memory_map=True)
+    # Keep strings in Arrow buffers instead of one Python object per cell
+    return table.to_pandas(types_mapper={pa.string(): pd.StringDtype("pyarrow")}.get)
+
+
+def load_papers(columns=PAPER_API_COLUMNS, csv_path=PAPERS_CSV, parquet_path=PAPERS_PARQUET):
+    """
+    Load the processed papers with the typed schema. Reads only `columns`
+    from a memory-mapped Parquet file; if the Parquet file is missing or
+    older than the CSV, the CSV is parsed once and the Parquet file rewritten.
+    """
+    if pq is None:
+        return type_papers(pd.read_csv(csv_path, usecols=lambda c: columns is None or c in columns))
+    if not _is_fresh(parquet_path, csv_path):
+        print(f"📦 Converting {csv_path} to {parquet_path}...")
+        write_papers(pd.read_csv(csv_path), parquet_path)
+    return _read_table(parquet_path, columns)
+
+
+def refresh_budget(csv_path=BUDGET_CSV, parquet_path=BUDGET_PARQUET):
+    """Rewrite the budget Parquet file if it is missing or older than its CSV. Returns whether it was written."""
+    if pq is None or _is_fresh(parquet_path, csv_path):
+        return False
+    print(f"📦 Converting {csv_path} to {parquet_path}...")
+    write_budget(read_budget_csv(csv_path), parquet_path)
+    return True
+
+
+def load_budget(csv_path=BUDGET_CSV, parquet_path=BUDGET_PARQUET):
+    if pq is None:
+        return type_budget(read_budget_csv(csv_path))
+    refresh_budget(csv_path, parquet_path)
+    return _read_table(parquet_path)
+
+
+if __name__ == "__main__":
+    # python -m utils.columnar_store: (re)build both Parquet files from the CSVs
+    if pq is None:
+        raise SystemExit("pyarrow is not installed")
+    write_papers(pd.read_csv(PAPERS_CSV))
+    write_budget(read_budget_csv())
+    print(f"✅ Wrote {PAPERS_PARQUET} and {BUDGET_PARQUET}")
@@ -0,0 +1,137 @@
+import os
+import json
+import time
+import pandas as pd
+
+DATA_DIR = "data"
+PROCESSED_FILE = os.path.join(DATA_DIR, "extracted_all_with_sections.csv")
+MANIFEST_FILE = os.path.join(DATA_DIR, "corpus_versions.json")
+
+# Rows written before versioning existed count as version 0
+LEGACY_VERSION = 0
+
+
+def extract_pmc_id(url):
+    if not isinstance(url, str):
+        return None
+    url = url.strip()
+    if "ncbi.nlm.nih.gov/pmc/articles" in url:
+        parts = url.rstrip("/").split("/")
+        pmc_part = parts[-1]
+        if pmc_part.upper().startswith("PMC"):
+            return pmc_part.upper()
+    return None
+
+
+def paper_keys(df):
+    """Stable identity of each row: its PMC id, or the link for non-PMC papers."""
+    pmc_ids = df["Link"].map(extract_pmc_id)
+    return pmc_ids.fillna(df["Link"].fillna("").str.strip())
+
+
+class CorpusManifest:
+    """
+    Version history of the processed dataset (data/corpus_versions.json).
+    Every full or incremental refresh that changes the corpus gets the next
+    version number; rows carry the version that last wrote them. `pending`
+    lists the paper keys whose fetch failed in the last refresh, so the next
+    incremental refresh retries them.
+    """
+
+    def __init__(self, path=MANIFEST_FILE):
+        self.path = path
+        self.versions = []
+        self.pending = []
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.versions = data.get("versions", [])
+            self.pending = data.get("pending", [])
+
+    @property
+    def current_version(self):
+        return self.versions[-1]["version"] if self.versions else LEGACY_VERSION
+
+    @property
+    def next_version(self):
+        """Version the next `record` call assigns (rows are tagged with it before it is recorded)."""
+        return self.current_version + 1
+
+    def record(self, mode, added=0, changed=0, removed=0, pending=()):
+        version = self.next_version
+        self.pending = sorted(pending)
+        self.versions.append({
+            "version": version,
+            "mode": mode,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "added": added,
+            "changed": changed,
+            "removed": removed,
+            "failed": len(self.pending),
+        })
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"current_version": version, "pending": self.pending, "versions": self.versions}, f, indent=2)
+        os.replace(tmp_path, self.path)
+        return version
+
+
+def load_processed(path=PROCESSED_FILE):
+    """Load the processed dataset, adding `pmc_id`/`ingest_version` to files written before versioning."""
+    df = pd.read_csv(path)
+    if "pmc_id" not in df.columns:
+        df["pmc_id"] = df["Link"].map(extract_pmc_id)
+    if "ingest_version" not in df.columns:
+        df["ingest_version"] = LEGACY_VERSION
+    df["ingest_version"] = df["ingest_version"].fillna(LEGACY_VERSION).astype(int)
+    return df
+
+
+def diff_corpus(source_df, processed_df):
+    """
+    Compare the publication list with what has been ingested.
+    Returns (new, changed, removed) sets of paper keys; a paper counts as
+    changed when its titles differ from the ingested ones.
+    """
+    # The publication list has a few PMC ids listed more than once, so compare title sets
+    def titles_by_key(df):
+        titles = {}
+        for key, title in zip(paper_keys(df), df["Title"]):
+            titles.setdefault(key, set()).add(title)
+        return titles
+
+    source_titles = titles_by_key(source_df)
+    processed_titles = titles_by_key(processed_df)
+
+    new = source_titles.keys() - processed_titles.keys()
+    removed = processed_titles.keys() - source_titles.keys()
+    changed = {
+        key for key in source_titles.keys() & processed_titles.keys()
+        if source_titles[key] != processed_titles[key]
+    }
+    return new, changed, removed
+
+
+def upsert(source_df, processed_df, updated_df, version):
+    """
+    Rebuild the processed table in publication-list order: rows in
+    `updated_df` are stamped with `version`, every other row is carried over
+    unchanged from `processed_df`, and papers no longer listed are dropped.
+    """
+    updated_df = updated_df.assign(ingest_version=version)
+    pool = pd.concat([updated_df, processed_df], ignore_index=True)
+    pool.index = paper_keys(pool)
+    pool = pool[~pool.index.duplicated(keep="first")].drop(columns=["Title", "Link"])
+    merged = pool.reindex(paper_keys(source_df)).reset_index(drop=True)
+    # Titles and links always come from the publication list itself
+    merged.insert(0, "Link", source_df["Link"].to_numpy())
+    merged.insert(0, "Title", source_df["Title"].to_numpy())
+    merged["ingest_version"] = merged["ingest_version"].astype(int)
+    return merged
+
+
+def changed_since(df, version):
+    """Rows written by a refresh newer than `version` (consumers pass the last version they processed)."""
+    if version is None or "ingest_version" not in df.columns:
+        return df
+    return df[df["ingest_version"] > version]
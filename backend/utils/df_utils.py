@@ -9,6 +9,16 @@ def clean_text(text):
     return text.lower().strip()
 
 
+def clean_full_text(df: pd.DataFrame) -> pd.Series:
+    """
+    Title + abstract + conclusion of each paper through `clean_text`: the text
+    papers are embedded and indexed from. The API and KG_ingestion share one
+    embedding store, so both must build it here to reuse each other's vectors.
+    """
+    text = df["Title"].fillna("") + " " + df["abstract"].fillna("") + " " + df["conclusion"].fillna("")
+    return text.map(clean_text)
+
+
 def generate_df_summary(df: pd.DataFrame, max_years: int = 5):
     """
     Generates a compact summary of the data for AI input using the original DataFrame.
@@ -29,7 +39,7 @@ def generate_df_summary(df: pd.DataFrame, max_years: int = 5):
         year_data = df_recent[df_recent['year'] == year]
         # Count papers per category
         counts_per_category = (
-            year_data.groupby('primary_category').size().to_dict()
+            year_data.groupby('primary_category', observed=True).size().to_dict()
         )
         # Include zero counts for missing categories
         all_categories = df_clean['primary_category'].unique()
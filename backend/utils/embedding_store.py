@@ -0,0 +1,262 @@
+import os
+import re
+import json
+import hashlib
+import argparse
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to unlocked writes
+    fcntl = None
+
+# Appends past this many segment files merge them back into one
+MAX_SEGMENTS = 32
+LEGACY_VECTORS = "vectors.npy"
+
+
+def text_hash(text: str) -> str:
+    """Stable content hash used as the cache key for a single input text."""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def _take(segments, offsets, dim, rows):
+    """Vectors of store rows `rows`, read from the memory-mapped segment arrays."""
+    if not len(rows):
+        return np.empty((0, dim), dtype=np.float32)
+    rows = np.asarray(rows)
+    segment_ids = np.searchsorted(offsets, rows, side="right") - 1
+    first = segment_ids[0]
+    start = rows[0]
+    # A contiguous, ordered block inside one segment is served straight from its memory map.
+    if (segment_ids == first).all() and (rows == np.arange(start, start + len(rows))).all():
+        local = start - offsets[first]
+        return segments[first][local:local + len(rows)]
+    out = np.empty((len(rows), dim), dtype=np.float32)
+    for s in np.unique(segment_ids):
+        mask = segment_ids == s
+        out[mask] = segments[s][rows[mask] - offsets[s]]
+    return out
+
+
+class StoredVectors:
+    """
+    Read-only matrix of stored vectors (one row per text) that never holds
+    them in memory: indexing reads just those rows from the store's
+    memory-mapped segments, and `np.asarray` gathers the whole matrix on
+    demand. It keeps the segments it was created with, so a later compaction
+    of the store does not move its rows.
+    """
+
+    def __init__(self, store, rows):
+        self.segments = [array for _, array in store.segments]
+        self.offsets = list(store.offsets)
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.shape = (len(self.rows), store.dim)
+        self.dtype = np.dtype(np.float32)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, idx):
+        rows = self.rows[idx]
+        if rows.ndim == 0:
+            return _take(self.segments, self.offsets, self.shape[1], rows.reshape(1))[0]
+        return _take(self.segments, self.offsets, self.shape[1], rows)
+
+    def __array__(self, dtype=None, copy=None):
+        vectors = _take(self.segments, self.offsets, self.shape[1], self.rows)
+        return np.asarray(vectors, dtype=dtype)
+
+
+class EmbeddingStore:
+    """
+    On-disk embedding cache keyed by model name + a hash of each input text.
+
+    Vectors are kept in append-only segment files (`vectors-<n>.npy`, opened
+    memory-mapped) and the row for every text hash is listed in `index.json`.
+    Only texts that are not in the store yet are sent to the model, and only
+    their vectors are written, so a restart costs O(changed rows) instead of
+    O(corpus). `compact()` merges the segments into one file, optionally
+    dropping vectors no longer needed.
+    """
+
+    def __init__(self, model_name: str, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.open(model_name)
+
+    def open(self, model_name: str):
+        """(Re)point the store at the cache of `model_name`, e.g. after an encoder backend fallback."""
+        self.model_name = model_name
+        self.dir = os.path.join(self.cache_dir, re.sub(r"[^\w.-]+", "__", model_name))
+        self.index_path = os.path.join(self.dir, "index.json")
+        self.lock_path = os.path.join(self.dir, ".lock")
+        os.makedirs(self.dir, exist_ok=True)
+        self._load()
+
+    def _lock(self, shared=False):
+        lock = open(self.lock_path, "w")
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        return lock
+
+    def _load(self):
+        # Shared lock: a concurrent compaction must not delete segments between reading the index and opening them
+        with self._lock(shared=True):
+            self._read()
+
+    def _read(self):
+        self.hashes = []
+        self.rows = {}
+        self.segments = []
+        self.offsets = [0]
+        self.next_segment = 0
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("model") != self.model_name:
+            return
+        # Stores written before segments existed have a single vectors.npy
+        files = meta.get("segments", [LEGACY_VECTORS])
+        try:
+            segments = [np.load(os.path.join(self.dir, name), mmap_mode="r") for name in files]
+        except (OSError, ValueError):
+            segments = None
+        if segments is None or sum(len(s) for s in segments) != len(meta["hashes"]):
+            print(f"⚠️ Embedding store {self.dir} is inconsistent, rebuilding it.")
+            return
+        self.hashes = meta["hashes"]
+        self.rows = {h: i for i, h in enumerate(self.hashes)}
+        self.segments = list(zip(files, segments))
+        self.offsets = np.cumsum([0] + [len(s) for s in segments]).tolist()
+        self.next_segment = meta.get("next_segment", 0)
+
+    @property
+    def dim(self):
+        return self.segments[0][1].shape[1] if self.segments else 0
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def missing(self, texts):
+        """Return the unique texts (in input order) that have no stored vector."""
+        seen = set()
+        missing = []
+        for text in texts:
+            h = text_hash(text)
+            if h not in self.rows and h not in seen:
+                seen.add(h)
+                missing.append(text)
+        return missing
+
+    def get(self, texts):
+        """Return stored vectors for `texts`, or None if any of them is missing."""
+        hashes = [text_hash(t) for t in texts]
+        if any(h not in self.rows for h in hashes):
+            return None
+        return self._take([self.rows[h] for h in hashes])
+
+    def encode(self, texts, load_model, **encode_kwargs):
+        """
+        Return embeddings for `texts`, encoding only the ones not stored yet.
+        `load_model` is a zero-argument callable, so the model is only loaded
+        when there is actually something to encode.
+        """
+        return np.asarray(self.vectors(texts, load_model, **encode_kwargs))
+
+    def vectors(self, texts, load_model, **encode_kwargs):
+        """Like `encode`, but returns a `StoredVectors` view that reads rows from disk on access."""
+        texts = list(texts)
+        missing = self.missing(texts)
+        if missing:
+            print(f"🧮 Encoding {len(missing)} new texts (of {len(texts)}) with {self.model_name}...")
+            model = load_model()
+            # Loading the model may have re-opened the store under another key, one that may hold them all
+            missing = self.missing(texts)
+            if missing:
+                new_vectors = model.encode(missing, convert_to_numpy=True, **encode_kwargs)
+                self._append([text_hash(t) for t in missing], np.asarray(new_vectors, dtype=np.float32))
+        return StoredVectors(self, [self.rows[text_hash(t)] for t in texts])
+
+    def _take(self, rows):
+        return _take([array for _, array in self.segments], self.offsets, self.dim, rows)
+
+    def _write_index(self, files, hashes, next_segment, dim):
+        tmp_index = self.index_path + ".tmp"
+        with open(tmp_index, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model_name, "dim": int(dim), "segments": files,
+                       "next_segment": next_segment, "hashes": hashes}, f)
+        os.replace(tmp_index, self.index_path)
+
+    def _write_segment(self, vectors):
+        name = f"vectors-{self.next_segment:06d}.npy"
+        tmp_vectors = os.path.join(self.dir, name + ".tmp.npy")
+        np.save(tmp_vectors, vectors)
+        os.replace(tmp_vectors, os.path.join(self.dir, name))
+        return name
+
+    def _append(self, hashes, new_vectors):
+        with self._lock():
+            # Another process may have written in the meantime; merge with it.
+            self._read()
+            keep = [i for i, h in enumerate(hashes) if h not in self.rows]
+            if not keep:
+                return
+            hashes = [hashes[i] for i in keep]
+            # Only the new vectors are written; existing segments are left untouched
+            name = self._write_segment(new_vectors[keep])
+            files = [f for f, _ in self.segments] + [name]
+            self._write_index(files, self.hashes + hashes, self.next_segment + 1, new_vectors.shape[1])
+            self._read()
+            if len(self.segments) > MAX_SEGMENTS:
+                self._compact()
+
+    def compact(self, keep_texts=None):
+        """
+        Merge all segments into one file. With `keep_texts`, vectors of any
+        other text are dropped (e.g. papers whose text has since changed).
+        Returns the number of vectors removed.
+        """
+        with self._lock():
+            self._read()
+            return self._compact(None if keep_texts is None else {text_hash(t) for t in keep_texts})
+
+    def _compact(self, keep_hashes=None):
+        if not self.segments:
+            return 0
+        rows = [i for i, h in enumerate(self.hashes) if keep_hashes is None or h in keep_hashes]
+        if len(self.segments) == 1 and len(rows) == len(self.hashes):
+            return 0
+        old_files = [f for f, _ in self.segments]
+        dim = self.dim
+        name = self._write_segment(self._take(rows) if rows else np.empty((0, dim), dtype=np.float32))
+        removed = len(self.hashes) - len(rows)
+        self._write_index([name], [self.hashes[i] for i in rows], self.next_segment + 1, dim)
+        # Processes still mapping the old files keep reading them until they reload
+        for old in old_files:
+            os.remove(os.path.join(self.dir, old))
+        self._read()
+        return removed
+
+
+if __name__ == "__main__":
+    # python -m utils.embedding_store [--prune]: merge the segments of the configured model's store
+    from config.config import EMBEDDING_MODEL_NAME, EMBEDDING_CACHE_DIR, EMBEDDING_BACKEND
+    from utils.encoder_backends import resolve_backend, store_key
+
+    parser = argparse.ArgumentParser(description="Compact the embedding store.")
+    parser.add_argument("--key", default=None, help="Store key (default: the configured model and backend)")
+    parser.add_argument("--prune", action="store_true",
+                        help="Also drop vectors of texts the API no longer embeds (papers, categories, images)")
+    args = parser.parse_args()
+
+    store = EmbeddingStore(args.key or store_key(EMBEDDING_MODEL_NAME, resolve_backend(EMBEDDING_BACKEND)), EMBEDDING_CACHE_DIR)
+    segments = len(store.segments)
+    keep_texts = None
+    if args.prune:
+        from utils.app_state import AppState
+
+        keep_texts = AppState().embedding_texts()
+    removed = store.compact(keep_texts)
+    print(f"✅ {store.dir}: {segments} segment(s) merged, {removed} vectors dropped, {len(store)} kept.")
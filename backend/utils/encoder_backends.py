@@ -0,0 +1,64 @@
+import importlib.util
+
+# Inference backends for the sentence-transformers encoder, all CPU:
+#   "torch"      eager PyTorch fp32 (the reference)
+#   "torch-int8" dynamic int8 quantisation of the Linear layers, no extra dependencies
+#   "onnx"       exported ONNX graph on onnxruntime
+#   "onnx-int8"  the int8-quantised ONNX graph published with the model
+# The ONNX backends need `pip install "sentence-transformers[onnx]"` (optimum with onnxruntime, matching
+# the installed transformers: optimum 1.x does not import with transformers 5).
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+REFERENCE_BACKEND = "torch"
+
+_REQUIRES = {
+    "torch": ["torch"],
+    "torch-int8": ["torch"],
+    "onnx": ["onnxruntime", "optimum"],
+    "onnx-int8": ["onnxruntime", "optimum"],
+}
+
+
+def backend_available(backend):
+    return backend in _REQUIRES and all(importlib.util.find_spec(m) is not None for m in _REQUIRES[backend])
+
+
+def resolve_backend(backend):
+    """The backend that will actually be used: `backend` if its packages are installed, else torch."""
+    if backend not in BACKENDS:
+        print(f"⚠️ Unknown embedding backend '{backend}', using {REFERENCE_BACKEND}.")
+        return REFERENCE_BACKEND
+    if backend != REFERENCE_BACKEND and not backend_available(backend):
+        print(f"⚠️ Embedding backend '{backend}' is not installed ({', '.join(_REQUIRES[backend])}), "
+              f"using {REFERENCE_BACKEND}.")
+        return REFERENCE_BACKEND
+    return backend
+
+
+def store_key(model_name, backend):
+    """
+    Embedding store / cluster model key. Optimised backends produce slightly
+    different vectors, so they get their own cache instead of mixing with the
+    reference vectors; torch keeps the plain model name (existing caches stay valid).
+    """
+    return model_name if backend == REFERENCE_BACKEND else f"{model_name}@{backend}"
+
+
+def load_encoder(model_name, backend, onnx_int8_file="onnx/model_quint8_avx2.onnx"):
+    """
+    Load `model_name` on `backend`. Returns (model, backend actually loaded);
+    any failure of an optimised backend falls back to the torch model. Every
+    backend exposes the same `encode()` as SentenceTransformer.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    if backend != REFERENCE_BACKEND:
+        try:
+            if backend == "torch-int8":
+                import torch
+                model = SentenceTransformer(model_name, device="cpu")
+                return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8), backend
+            model_kwargs = {"file_name": onnx_int8_file} if backend == "onnx-int8" else None
+            return SentenceTransformer(model_name, device="cpu", backend="onnx", model_kwargs=model_kwargs), backend
+        except Exception as e:  # missing packages, old sentence-transformers, missing ONNX file
+            print(f"⚠️ Could not load the {backend} encoder ({e}); falling back to {REFERENCE_BACKEND}.")
+    return SentenceTransformer(model_name), REFERENCE_BACKEND
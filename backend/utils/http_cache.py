@@ -0,0 +1,161 @@
+import gzip
+import json
+import hashlib
+import threading
+from urllib.parse import urlencode
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # stdlib json fallback below
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_SIZE = 1024
+
+
+def _default(obj):
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return None if np.isnan(obj) else float(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (pd.Timestamp, np.datetime64)):
+        return None if pd.isna(obj) else pd.Timestamp(obj).isoformat()
+    if obj is pd.NaT or obj is pd.NA:
+        return None
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj) -> bytes:
+    """Serialise to JSON bytes, handling NumPy/pandas scalars and NaN (as null)."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class _Entry:
+    def __init__(self, etag, body):
+        self.etag = etag
+        self.bodies = {"identity": body}
+
+    def body(self, encoding):
+        if encoding not in self.bodies:
+            raw = self.bodies["identity"]
+            if encoding == "br":
+                self.bodies[encoding] = brotli.compress(raw, quality=5)
+            else:
+                self.bodies[encoding] = gzip.compress(raw, compresslevel=6)
+        return self.bodies[encoding]
+
+
+class ResponseCache:
+    """
+    Serialised-response cache for read-only endpoints.
+
+    Entries are keyed by request key + dataset version and keep the JSON bytes
+    plus lazily compressed gzip/brotli variants. The ETag is derived from the
+    same key, so clients that send `If-None-Match` get a 304 without the body
+    being built or sent.
+    """
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    @staticmethod
+    def request_key(request: Request) -> str:
+        # Encoded, so a value containing "&" or "=" cannot collide with another parameter list
+        return request.url.path + "?" + urlencode(sorted(request.query_params.multi_items()))
+
+    def respond(self, request: Request, version: str, build, key=None):
+        """Return a cached (or freshly built) response for this request."""
+        key = key or self.request_key(request)
+        etag = '"' + hashlib.blake2b(f"{version}|{key}".encode(), digest_size=12).hexdigest() + '"'
+        headers = {
+            "ETag": etag,
+            "Cache-Control": "no-cache",  # always revalidate, the 304 is cheap
+            "Vary": "Accept-Encoding",
+        }
+
+        client_etags = _parse_etags(request.headers.get("if-none-match", ""))
+        if etag in client_etags or "*" in client_etags:
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+
+        with self.lock:
+            entry = self.entries.get((key, version))
+            if entry is not None:
+                self.entries.move_to_end((key, version))
+        if entry is None:
+            self.misses += 1
+            entry = _Entry(etag, dumps(build()))
+            with self.lock:
+                self.entries[(key, version)] = entry
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        else:
+            self.hits += 1
+
+        encoding = _pick_encoding(request.headers.get("accept-encoding", ""), len(entry.bodies["identity"]))
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=entry.body(encoding), media_type="application/json", headers=headers)
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+        }
+
+
+def _parse_etags(header):
+    return {tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()}
+
+
+def _accepted_encodings(accept_encoding):
+    """{coding: q} from an Accept-Encoding header; a missing or malformed q counts as 1."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, *params = [p.strip() for p in part.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    pass
+        accepted[coding.lower()] = q
+    return accepted
+
+
+def _pick_encoding(accept_encoding, size):
+    if size < MIN_COMPRESS_SIZE:
+        return "identity"
+    accepted = _accepted_encodings(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    # "gzip;q=0" means not acceptable; "*" covers codings that are not listed
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return "identity"
@@ -0,0 +1,55 @@
+import numpy as np
+from utils.vector_index import normalize, top_k_indices
+
+FUSIONS = ("rrf", "weighted")
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    RRF: a paper scores sum(1 / (k + rank)) over the rankings it appears in
+    (rank from 1). Needs no score calibration between BM25 and cosine.
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, idx in enumerate(ranking, start=1):
+            fused[int(idx)] = fused.get(int(idx), 0.0) + 1.0 / (k + rank)
+    return fused
+
+def _min_max(values):
+    span = values.max() - values.min() if len(values) else 0
+    return (values - values.min()) / span if span > 0 else np.ones_like(values)
+
+def weighted_fusion(ids, lexical_scores, semantic_scores, alpha):
+    """`alpha` * semantic + (1 - `alpha`) * lexical, each min-max scaled over the candidates."""
+    fused = alpha * _min_max(semantic_scores) + (1 - alpha) * _min_max(lexical_scores)
+    return {int(i): float(s) for i, s in zip(ids, fused)}
+
+
+def hybrid_rank(lexical_scores, semantic_ids, query_vector, embeddings, k, candidates=100,
+                fusion="rrf", alpha=0.5, rrf_k=60):
+    """
+    Fuse the BM25 scores of every paper (`lexical_scores`, from
+    `BM25Index.scores`) with the dense top `candidates` (`semantic_ids`).
+
+    Both scores are reported for every candidate: the cosine of lexical-only
+    hits is computed exactly from `embeddings`, the BM25 of dense-only hits
+    read from `lexical_scores`. Returns [(idx, score, lexical, semantic)],
+    best first.
+    """
+    matches = np.flatnonzero(lexical_scores)
+    lexical_ids = matches[top_k_indices(lexical_scores[matches], candidates)]
+    semantic_ids = np.asarray(semantic_ids)[:candidates]
+    ids = np.array(list(dict.fromkeys([*semantic_ids.tolist(), *lexical_ids.tolist()])), dtype=np.int64)
+    if len(ids) == 0:
+        return []
+
+    lexical = lexical_scores[ids]
+    semantic = normalize(embeddings[ids]) @ normalize(np.asarray(query_vector).reshape(-1))
+    if fusion == "weighted":
+        fused = weighted_fusion(ids, lexical, semantic, alpha)
+    else:
+        fused = reciprocal_rank_fusion([lexical_ids, semantic_ids], rrf_k)
+
+    by_id = {int(i): (float(l), float(s)) for i, l, s in zip(ids, lexical, semantic)}
+    best = sorted(fused, key=lambda i: (-fused[i], i))[:k]
+    return [(i, fused[i], *by_id[i]) for i in best]
@@ -0,0 +1,90 @@
+import io
+import os
+import json
+import hashlib
+from PIL import Image
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def image_fingerprint(image_bytes):
+    """
+    (sha256, dHash, width, height) of an encoded image. The 64-bit difference
+    hash survives re-encoding, so the same logo or figure embedded twice with
+    different bytes maps to the same value.
+    """
+    im = Image.open(io.BytesIO(image_bytes))
+    width, height = im.size
+    pixels = list(im.convert("L").resize((9, 8), Image.LANCZOS).getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left, right = pixels[row * 9 + col], pixels[row * 9 + col + 1]
+            bits = (bits << 1) | (left > right)
+    return hashlib.sha256(image_bytes).hexdigest(), f"{bits:016x}", width, height
+
+
+class ImageManifest:
+    """
+    Content-addressed record of what has been ingested
+    (data/paper_images_manifest.json):
+
+    - `pdfs`: file name -> {sha256, images}; a PDF whose hash is unchanged is skipped.
+    - `images`: image sha256 -> {dhash, width, height, description}; any image
+      with the same bytes, or the same dHash and dimensions (a re-encoded copy),
+      reuses the description instead of calling the vision model again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.pdfs = {}
+        self.images = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.pdfs = data.get("pdfs", {})
+            self.images = data.get("images", {})
+
+    def __bool__(self):
+        return bool(self.pdfs or self.images)
+
+    def find(self, sha256, dhash, width, height, near=True):
+        """Return (description, "exact" | "near") for a known image, or (None, None)."""
+        record = self.images.get(sha256)
+        if record is not None:
+            return record["description"], "exact"
+        if not near:
+            return None, None
+        # Only an identical dHash at identical dimensions: charts with a similar layout
+        # are a few bits apart but need their own description
+        for record in self.images.values():
+            if record["dhash"] == dhash and record["width"] == width and record["height"] == height:
+                return record["description"], "near"
+        return None, None
+
+    def add_image(self, sha256, dhash, width, height, description):
+        self.images[sha256] = {"dhash": dhash, "width": width, "height": height, "description": description}
+
+    def adopt(self, metadata):
+        """Seed the image table from existing metadata whose image files are still on disk."""
+        adopted = 0
+        for entry in metadata:
+            if not entry.get("description") or not os.path.exists(entry["image"]):
+                continue
+            with open(entry["image"], "rb") as f:
+                sha256, dhash, width, height = image_fingerprint(f.read())
+            self.add_image(sha256, dhash, width, height, entry["description"])
+            adopted += 1
+        return adopted
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"pdfs": self.pdfs, "images": self.images}, f, indent=2)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,262 @@
+import re
+from xml.parsers import expat
+
+# Dates in order of preference: (element, attribute, value)
+DATE_PREFERENCE = [
+    ("pub-date", "pub-type", "epub"),
+    ("pub-date", "pub-type", "collection"),
+    ("date", "date-type", "accepted"),
+]
+CONCLUSION_TITLE = re.compile(r"^\s*conclusions?\s*$", re.IGNORECASE)
+CHUNK_SIZE = 64 * 1024
+
+
+def collapse(parts):
+    return re.sub(r"\s+", " ", "".join(parts)).strip()
+
+
+def best_date(dates):
+    """Format the preferred date (epub > collection > accepted) as YYYY-MM-DD."""
+    for key in range(len(DATE_PREFERENCE)):
+        if key in dates:
+            d = dates[key]
+            year, month, day = d.get("year", ""), d.get("month", ""), d.get("day", "")
+            year = year if year.isdigit() else ""
+            month = month.zfill(2) if month.isdigit() else "01"
+            day = day.zfill(2) if day.isdigit() else "01"
+            return f"{year}-{month}-{day}"
+    return ""
+
+
+class _Section:
+    def __init__(self, depth, is_conclusion):
+        self.depth = depth
+        self.buffer = []
+        self.title = None  # None until the title (or the lack of one) is known
+        self.title_parts = None
+        self.keep = True
+        self.is_conclusion = is_conclusion
+
+
+class _Article:
+    def __init__(self, depth):
+        self.depth = depth
+        self.pmc_id = None
+        self.abstract = None
+        self.conclusion = None
+        self.dates = {}
+        self.sections = []
+
+
+class JATSParser:
+    """
+    Event-based (expat) parser for PMC efetch responses.
+
+    Articles are handled one at a time as the XML is fed in, so a batched
+    response never has to be held as one string or tree. Character data is
+    only buffered for the parts we keep: the first abstract, sections that may
+    still turn out to be the conclusion (the title comes first, so others are
+    dropped as soon as it is read) and date fields. Nested sections are
+    captured whole, and sections inside abstracts are not treated as body
+    sections. With `all_sections=True` every titled body section is also
+    returned as {"title", "text"} in document order.
+    """
+
+    def __init__(self, all_sections=False):
+        self.all_sections = all_sections
+        self.finished = []
+        self.depth = 0
+        self.article = None
+        self._reset()
+
+        self.parser = expat.ParserCreate()
+        # Never fetch the DTD; undefined named entities are skipped instead of failing
+        self.parser.UseForeignDTD(True)
+        self.parser.SetParamEntityParsing(expat.XML_PARAM_ENTITY_PARSING_NEVER)
+        self.parser.buffer_text = True
+        self.parser.StartElementHandler = self._start
+        self.parser.EndElementHandler = self._end
+        self.parser.CharacterDataHandler = self._data
+
+    def _reset(self):
+        self.sinks = []           # buffers receiving character data
+        self.secs = []            # open body <sec> elements
+        self.title_sec = None     # section whose <title> is being read
+        self.label_sec = None     # section whose <label> is being skipped
+        self.in_meta = False      # inside <article-meta>, where the article's own dates live
+        self.abstract = None      # buffer of the first abstract while open
+        self.abstract_depth = None
+        self.abstracts_open = 0
+        self.date = None          # [preference key, depth, fields, current field]
+        self.article_id = None    # buffer of a pmc <article-id> while open
+
+    def feed(self, chunk, final=False):
+        """Feed a chunk of XML and return the (pmc_id, sections) completed by it."""
+        self.parser.Parse(chunk, final)
+        finished, self.finished = self.finished, []
+        return finished
+
+    def _settle_title(self, sec, title):
+        sec.title = title
+        if not sec.is_conclusion and CONCLUSION_TITLE.match(title):
+            sec.is_conclusion = True
+        sec.keep = self.all_sections or (sec.is_conclusion and self.article.conclusion is None)
+        if sec.keep:
+            self.sinks.append(sec.buffer)
+        else:
+            sec.buffer.clear()
+
+    def _start(self, tag, attrs):
+        self.depth += 1
+        article = self.article
+        if article is None:
+            if tag == "article":
+                self.article = _Article(self.depth)
+            return
+        for sink in self.sinks:
+            sink.append(" ")
+
+        # A section's title must be its first child (after an optional label)
+        if self.secs and self.title_sec is None and self.label_sec is None:
+            sec = self.secs[-1]
+            if sec.title is None and self.depth == sec.depth + 1:
+                if tag == "title":
+                    sec.title_parts = []
+                    self.title_sec = sec
+                    # the title is not part of the section's own text
+                    self.sinks.remove(sec.buffer)
+                    self.sinks.append(sec.title_parts)
+                    return
+                self.sinks.remove(sec.buffer)
+                if tag == "label":
+                    # section numbers are not part of the text either
+                    self.label_sec = sec
+                    return
+                self._settle_title(sec, "")
+
+        if tag == "article-meta":
+            self.in_meta = True
+        elif tag == "article-id":
+            if article.pmc_id is None and attrs.get("pub-id-type") in ("pmc", "pmcid"):
+                self.article_id = []
+        elif tag == "abstract":
+            self.abstracts_open += 1
+            if article.abstract is None and self.abstract is None:
+                self.abstract = []
+                self.abstract_depth = self.depth
+                self.sinks.append(self.abstract)
+        elif tag == "sec":
+            if not self.abstracts_open:
+                sec = _Section(self.depth, "conclusion" in (attrs.get("sec-type") or "").lower())
+                self.secs.append(sec)
+                self.sinks.append(sec.buffer)
+        elif self.date is None:
+            if self.in_meta:
+                for key, (element, attr, value) in enumerate(DATE_PREFERENCE):
+                    if tag == element and attrs.get(attr) == value and key not in article.dates:
+                        self.date = [key, self.depth, {}, None]
+                        break
+        elif tag in ("year", "month", "day") and self.depth == self.date[1] + 1:
+            self.date[2][tag] = []
+            self.date[3] = tag
+
+    def _data(self, text):
+        if self.article is None:
+            return
+        for sink in self.sinks:
+            sink.append(text)
+        if self.article_id is not None:
+            self.article_id.append(text)
+        if self.date is not None and self.date[3] is not None:
+            self.date[2][self.date[3]].append(text)
+
+    def _end(self, tag):
+        depth = self.depth
+        self.depth -= 1
+        article = self.article
+        if article is None:
+            return
+        if depth == article.depth:
+            self._finish_article()
+            return
+        for sink in self.sinks:
+            sink.append(" ")
+
+        if tag == "article-meta":
+            self.in_meta = False
+        elif tag == "label" and self.label_sec is not None and depth == self.label_sec.depth + 1:
+            self.sinks.append(self.label_sec.buffer)
+            self.label_sec = None
+        elif tag == "article-id" and self.article_id is not None:
+            digits = re.sub(r"\D", "", "".join(self.article_id))
+            article.pmc_id = "PMC" + digits if digits else None
+            self.article_id = None
+        elif tag == "abstract":
+            self.abstracts_open -= 1
+            if depth == self.abstract_depth:
+                self.sinks.remove(self.abstract)
+                article.abstract = collapse(self.abstract)
+                self.abstract = None
+                self.abstract_depth = None
+        elif tag == "title" and self.title_sec is not None and depth == self.title_sec.depth + 1:
+            sec = self.title_sec
+            self.title_sec = None
+            self.sinks.remove(sec.title_parts)
+            self._settle_title(sec, collapse(sec.title_parts))
+            sec.title_parts = None
+        elif tag == "sec" and self.secs and depth == self.secs[-1].depth:
+            sec = self.secs.pop()
+            if sec.buffer in self.sinks:
+                self.sinks.remove(sec.buffer)
+            if sec.keep:
+                text = collapse(sec.buffer)
+                if sec.is_conclusion and article.conclusion is None:
+                    article.conclusion = text
+                if self.all_sections and sec.title:
+                    article.sections.append({"title": sec.title, "text": text})
+        elif self.date is not None:
+            if depth == self.date[1]:
+                key, _, fields, _ = self.date
+                article.dates[key] = {name: "".join(parts).strip() for name, parts in fields.items()}
+                self.date = None
+            elif tag == self.date[3]:
+                self.date[3] = None
+
+    def _finish_article(self):
+        article = self.article
+        record = {
+            "abstract": article.abstract or "",
+            "conclusion": article.conclusion or "",
+            "best_date": best_date(article.dates),
+        }
+        if self.all_sections:
+            record["sections"] = article.sections
+        self.finished.append((article.pmc_id, record))
+        self.article = None
+        self._reset()
+
+
+def iter_articles(source, all_sections=False):
+    """
+    Yield (pmc_id, sections) for every <article> in `source`: a str/bytes
+    document, a binary file object or an iterable of byte chunks such as
+    `response.iter_content()`. `pmc_id` is None if the article has no pmc
+    article-id.
+    """
+    parser = JATSParser(all_sections=all_sections)
+    if isinstance(source, str):
+        source = source.encode("utf-8")
+    if isinstance(source, bytes):
+        chunks = (source[i:i + CHUNK_SIZE] for i in range(0, len(source), CHUNK_SIZE))
+    elif hasattr(source, "read"):
+        chunks = iter(lambda: source.read(CHUNK_SIZE), b"")
+    else:
+        chunks = source
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.feed(b"", final=True)
+
+
+def parse_articles(source, all_sections=False):
+    """Parse a (batched) efetch response into {PMC id: sections}."""
+    return {pmc_id: sections for pmc_id, sections in iter_articles(source, all_sections) if pmc_id}
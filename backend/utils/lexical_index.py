@@ -0,0 +1,148 @@
+import re
+import html
+import numpy as np
+from utils.df_utils import clean_text
+from utils.vector_index import top_k_indices
+
+# Dropped from the index: they match nearly every paper and only lengthen postings scans
+STOPWORDS = frozenset(
+    "a an and are as at be been but by for from had has have in into is it its of on or that the "
+    "their there these this those to was were which with".split()
+)
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+
+def tokenize(text):
+    """Same normalisation as `clean_full_text` (lower-case, punctuation to spaces), minus stopwords."""
+    return [t for t in clean_text(text).split() if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    In-memory inverted index scored with Okapi BM25.
+
+    Postings are stored column-wise (CSR over terms): for term `t`,
+    `doc_ids[offsets[t]:offsets[t + 1]]` (int32) are the papers containing
+    it. Next to each doc id is its float16 impact, the BM25 term-frequency
+    part `tf * (k1 + 1) / (tf + k1 * (1 - b + b * len / avg_len))`, computed
+    at build time, so a query is one `idf * impacts` scan per query term plus
+    a partial top-k.
+    """
+
+    ARRAYS = ("offsets", "doc_ids", "impacts", "idf")
+
+    def __init__(self, texts, k1=1.2, b=0.75):
+        from scipy import sparse
+        from sklearn.feature_extraction.text import CountVectorizer
+
+        texts = ["" if t is None else str(t) for t in texts]
+        vectorizer = CountVectorizer(
+            token_pattern=r"(?u)\b\w+\b", lowercase=False, stop_words=list(STOPWORDS), dtype=np.int32,
+        )
+        try:
+            counts = vectorizer.fit_transform(texts)
+            terms = vectorizer.get_feature_names_out().tolist()
+        except ValueError:  # empty vocabulary: no papers, or only stopwords
+            counts, terms = sparse.csr_matrix((len(texts), 0), dtype=np.int32), []
+
+        n_docs = len(texts)
+        doc_len = np.asarray(counts.sum(axis=1)).ravel()
+        postings = counts.tocsc()
+        avg_len = doc_len.mean() if n_docs and doc_len.sum() else 1.0
+        norms = k1 * (1 - b + b * doc_len / avg_len)
+        tf = postings.data.astype(np.float32)
+        doc_freq = np.diff(postings.indptr)
+        arrays = {
+            "offsets": postings.indptr.astype(np.int64),
+            "doc_ids": postings.indices.astype(np.int32),
+            "impacts": (tf * (k1 + 1) / (tf + norms[postings.indices])).astype(np.float16),
+            "idf": np.log1p((n_docs - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32),
+        }
+        self._set(arrays, terms, n_docs)
+
+    def _set(self, arrays, terms, n_docs):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.terms = terms
+        self.vocabulary = {term: i for i, term in enumerate(terms)}
+        self.n_docs = n_docs
+
+    def __len__(self):
+        return self.n_docs
+
+    def arrays(self):
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    @classmethod
+    def from_arrays(cls, arrays, terms, n_docs):
+        """Rebuild around existing (e.g. memory-mapped) arrays without copying them."""
+        index = cls.__new__(cls)
+        index._set(arrays, terms, n_docs)
+        return index
+
+    def query_terms(self, query):
+        """Distinct query tokens that occur in the corpus, in query order."""
+        return [t for t in dict.fromkeys(tokenize(query)) if t in self.vocabulary]
+
+    def scores(self, query):
+        """BM25 score of every paper for `query` (0 where no query term occurs)."""
+        scores = np.zeros(len(self), dtype=np.float32)
+        for term in self.query_terms(query):
+            t = self.vocabulary[term]
+            start, end = self.offsets[t], self.offsets[t + 1]
+            # doc ids are unique within a postings list, so fancy-index += is safe
+            scores[self.doc_ids[start:end]] += self.idf[t] * self.impacts[start:end]
+        return scores
+
+    def search(self, query, k):
+        """Top-k papers with a non-zero score, best first: (indices, scores)."""
+        scores = self.scores(query)
+        matches = np.flatnonzero(scores)
+        best = matches[top_k_indices(scores[matches], k)]
+        return best, scores[best]
+
+
+def _term_pattern(terms):
+    return re.compile(r"\b(" + "|".join(re.escape(t) for t in terms) + r")\b", re.IGNORECASE)
+
+def _mark(text, pattern, tag):
+    """HTML-escape `text` segment by segment, wrapping each match of `pattern` in `<tag>`."""
+    parts = pattern.split(text)  # the capturing group puts matches at odd positions
+    return "".join(
+        f"<{tag}>{html.escape(part)}</{tag}>" if i % 2 else html.escape(part)
+        for i, part in enumerate(parts)
+    )
+
+
+def highlight_title(title, terms, tag="em"):
+    """The whole title, HTML-escaped, with query terms wrapped in `<tag>` (no sentence split or cut)."""
+    title = "" if title is None else str(title)
+    return _mark(title, _term_pattern(terms), tag) if terms else html.escape(title)
+
+
+def highlight(text, terms, max_snippets=2, width=200, tag="em"):
+    """
+    Up to `max_snippets` sentences of `text` with the most distinct query
+    terms, in document order, HTML-escaped with terms wrapped in `<tag>`.
+    Long sentences are cut to about `width` characters around their first match.
+    """
+    if not text or not terms:
+        return []
+    pattern = _term_pattern(terms)
+    scored = []
+    for position, sentence in enumerate(SENTENCE_SPLIT.split(str(text))):
+        found = pattern.findall(sentence)
+        if found:
+            scored.append((len({f.lower() for f in found}), -position, sentence))
+    best = sorted(scored, reverse=True)[:max_snippets]
+
+    snippets = []
+    for _, _, sentence in sorted(best, key=lambda s: -s[1]):
+        prefix = suffix = ""
+        if len(sentence) > width:
+            first = pattern.search(sentence).start()
+            start = max(0, min(first - width // 4, len(sentence) - width))
+            prefix, suffix = ("…" if start else ""), ("…" if start + width < len(sentence) else "")
+            sentence = sentence[start:start + width]
+        snippets.append(prefix + _mark(sentence, pattern, tag) + suffix)
+    return snippets
@@ -0,0 +1,108 @@
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict, defaultdict
+
+
+def normalize_prompt(content):
+    """Collapse whitespace so re-indented but otherwise identical prompts share a key."""
+    if isinstance(content, str):
+        return re.sub(r"\s+", " ", content).strip()
+    return json.dumps(content, sort_keys=True)
+
+
+def make_key(model, messages, **params):
+    payload = {
+        "model": model,
+        "messages": [{"role": m["role"], "content": normalize_prompt(m["content"])} for m in messages],
+        "params": params,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Two-level completion cache: a size-bounded in-memory LRU in front of a
+    SQLite table that survives restarts and is shared by every worker on the
+    host. Entries expire after `ttl_seconds`. Hit/miss counters are kept per
+    endpoint so `/cache-stats` can show where the cache pays off.
+    """
+
+    def __init__(self, path, max_entries=1024, ttl_seconds=86400):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.counters = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                content TEXT,
+                created_at REAL,
+                expires_at REAL
+            )
+        """)
+        self.db.commit()
+
+    def get(self, key, endpoint="default"):
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None and entry[0] > now:
+                self.memory.move_to_end(key)
+                self.counters[endpoint]["hits"] += 1
+                return entry[1]
+            try:
+                row = self.db.execute(
+                    "SELECT content, expires_at FROM completions WHERE key = ? AND expires_at > ?",
+                    (key, now),
+                ).fetchone()
+            except sqlite3.Error as e:
+                print(f"⚠️ LLM cache read failed: {e}")
+                row = None
+            if row is None:
+                self.memory.pop(key, None)
+                self.counters[endpoint]["misses"] += 1
+                return None
+            self._remember(key, row[0], row[1])
+            self.counters[endpoint]["hits"] += 1
+            return row[0]
+
+    def set(self, key, content, model=""):
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        with self.lock:
+            self._remember(key, content, expires_at)
+            try:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO completions (key, model, content, created_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, model, content, now, expires_at),
+                )
+                self.db.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️ LLM cache write failed: {e}")
+
+    def _remember(self, key, content, expires_at):
+        self.memory[key] = (expires_at, content)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def purge_expired(self):
+        with self.lock:
+            self.db.execute("DELETE FROM completions WHERE expires_at <= ?", (time.time(),))
+            self.db.commit()
+
+    def stats(self):
+        return {
+            "memory_entries": len(self.memory),
+            "endpoints": {name: dict(c) for name, c in self.counters.items()},
+        }
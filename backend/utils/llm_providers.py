@@ -0,0 +1,137 @@
+import os
+import re
+import json
+import random
+import asyncio
+import hashlib
+import time
+
+
+class LLMResponse:
+    def __init__(self, content, prompt_tokens=None, completion_tokens=None):
+        self.content = content
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+
+
+class GroqProvider:
+    """Groq chat completions (sync, async and streaming). Clients are created on first use."""
+
+    name = "groq"
+
+    def __init__(self, api_key=None):
+        self.api_key = api_key or os.getenv("GROQ_API_KEY")
+        self._client = None
+        self._async_client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from groq import Groq
+            self._client = Groq(api_key=self.api_key)
+        return self._client
+
+    @property
+    def async_client(self):
+        if self._async_client is None:
+            from groq import AsyncGroq
+            self._async_client = AsyncGroq(api_key=self.api_key)
+        return self._async_client
+
+    @staticmethod
+    def _to_response(response):
+        usage = getattr(response, "usage", None)
+        return LLMResponse(
+            response.choices[0].message.content,
+            getattr(usage, "prompt_tokens", None),
+            getattr(usage, "completion_tokens", None),
+        )
+
+    def complete(self, model, messages, **params):
+        return self._to_response(self.client.chat.completions.create(model=model, messages=messages, **params))
+
+    async def acomplete(self, model, messages, **params):
+        response = await self.async_client.chat.completions.create(model=model, messages=messages, **params)
+        return self._to_response(response)
+
+    async def astream(self, model, messages, **params):
+        stream = await self.async_client.chat.completions.create(
+            model=model, messages=messages, stream=True, **params
+        )
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
+
+
+class StubProvider:
+    """
+    Deterministic offline provider for local runs and load tests.
+
+    The reply is derived from a hash of the model and messages, so the same
+    prompt always gets the same answer. Prompts that ask for JSON get a small
+    JSON object in the shape the KG ingestion expects. `latency_ms` (plus up
+    to `jitter_ms`) simulates upstream latency.
+    """
+
+    name = "stub"
+
+    def __init__(self, latency_ms=0, jitter_ms=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+
+    def _delay(self, seed):
+        jitter = random.Random(seed).uniform(0, self.jitter_ms) if self.jitter_ms else 0
+        return (self.latency_ms + jitter) / 1000.0
+
+    @staticmethod
+    def _prompt_text(messages):
+        parts = []
+        for m in messages:
+            content = m["content"]
+            if isinstance(content, str):
+                parts.append(content)
+            else:
+                parts.extend(p.get("text", "") for p in content if isinstance(p, dict))
+        return " ".join(parts)
+
+    def _reply(self, model, messages):
+        text = self._prompt_text(messages)
+        seed = hashlib.sha256((model + json.dumps(messages, sort_keys=True)).encode()).hexdigest()
+        words = sorted(set(re.findall(r"[a-z]{5,}", text.lower())))
+        picked = random.Random(seed).sample(words, min(8, len(words))) if words else ["stub"]
+        if "json" in text.lower():
+            content = json.dumps({
+                "cluster_summary": f"Stub summary about {', '.join(picked[:3])}.",
+                "topics": picked[:3],
+                "entities": [{"name": w, "type": "Concept"} for w in picked[3:6]],
+                "relations": [{"source": picked[3], "target": picked[4], "type": "related_to"}] if len(picked) > 4 else [],
+            })
+        else:
+            content = f"[stub {seed[:8]}] " + " ".join(picked)
+        prompt_tokens = len(text) // 4
+        return seed, LLMResponse(content, prompt_tokens, len(content) // 4)
+
+    def complete(self, model, messages, **params):
+        seed, response = self._reply(model, messages)
+        time.sleep(self._delay(seed))
+        return response
+
+    async def acomplete(self, model, messages, **params):
+        seed, response = self._reply(model, messages)
+        await asyncio.sleep(self._delay(seed))
+        return response
+
+    async def astream(self, model, messages, **params):
+        seed, response = self._reply(model, messages)
+        await asyncio.sleep(self._delay(seed))
+        for i, word in enumerate(response.content.split(" ")):
+            yield word if i == 0 else " " + word
+
+
+def create_provider(name, stub_latency_ms=0, stub_jitter_ms=0):
+    if name == "groq":
+        return GroqProvider()
+    if name == "stub":
+        return StubProvider(latency_ms=stub_latency_ms, jitter_ms=stub_jitter_ms)
+    raise ValueError(f"Unknown LLM provider: {name}")
@@ -0,0 +1,228 @@
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+from contextlib import contextmanager
+from utils.rate_limit import TokenBucket
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)
+
+# How long a batch caller backs off while interactive calls are queued
+BATCH_YIELD_SECONDS = 0.05
+# A queued call refreshes its row in the shared waiters table on every poll
+# (at least once a second); rows older than this belong to dead processes
+WAITER_TTL_SECONDS = 5.0
+
+
+def estimate_tokens(messages, max_tokens=None):
+    """Rough token estimate (~4 chars per token) used to charge the TPM bucket up front."""
+    chars = 0
+    for m in messages:
+        content = m["content"]
+        if isinstance(content, str):
+            chars += len(content)
+        else:
+            chars += sum(len(part.get("text", "")) for part in content if isinstance(part, dict))
+    return chars // 4 + (256 if max_tokens is None else max_tokens)
+
+
+class LLMScheduler:
+    """
+    Rate-limit-aware gate in front of the LLM provider.
+
+    Every call takes one request from the RPM bucket and its estimated tokens
+    from the TPM bucket; the estimate is corrected with the real usage once the
+    response arrives. Interactive callers always go before batch callers
+    (ingestion scripts), which back off while any interactive call is queued.
+    A limit of 0 disables that bucket.
+    """
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.lock = threading.Lock()
+        self.waiting = {p: 0 for p in PRIORITIES}
+        self.counters = {
+            p: {"granted": 0, "waited_seconds": 0.0, "max_wait_seconds": 0.0}
+            for p in PRIORITIES
+        }
+        # "estimated": tokens charged for calls that reported no usage
+        self.tokens_used = {"prompt": 0, "completion": 0, "estimated": 0}
+
+    def _try_acquire(self, tokens, priority, ticket=None):
+        with self.lock:
+            if priority != INTERACTIVE and self.waiting[INTERACTIVE]:
+                return BATCH_YIELD_SECONDS
+            wait = 0.0
+            if self.requests is not None:
+                wait = max(wait, self.requests.wait_time(1))
+            if self.tokens is not None:
+                wait = max(wait, self.tokens.wait_time(tokens))
+            if wait > 0:
+                return wait
+            if self.requests is not None:
+                self.requests.take(1)
+            if self.tokens is not None:
+                self.tokens.take(tokens)
+            return 0.0
+
+    def _enter(self, priority):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        with self.lock:
+            self.waiting[priority] += 1
+        return {"started": time.monotonic(), "id": uuid.uuid4().hex}
+
+    def _leave(self, priority, ticket):
+        waited = time.monotonic() - ticket["started"]
+        with self.lock:
+            self.waiting[priority] -= 1
+            counters = self.counters[priority]
+            counters["granted"] += 1
+            counters["waited_seconds"] += waited
+            counters["max_wait_seconds"] = max(counters["max_wait_seconds"], waited)
+
+    def acquire(self, tokens, priority=INTERACTIVE):
+        ticket = self._enter(priority)
+        try:
+            while (wait := self._try_acquire(tokens, priority, ticket)) > 0:
+                time.sleep(min(wait, 1.0))
+        finally:
+            self._leave(priority, ticket)
+
+    async def aacquire(self, tokens, priority=INTERACTIVE):
+        ticket = self._enter(priority)
+        try:
+            while (wait := self._try_acquire(tokens, priority, ticket)) > 0:
+                await asyncio.sleep(min(wait, 1.0))
+        finally:
+            self._leave(priority, ticket)
+
+    def _refund(self, tokens):
+        if self.tokens is not None:
+            self.tokens.give(tokens)
+
+    def _available(self):
+        return {
+            "requests": self.requests.level if self.requests else None,
+            "tokens": self.tokens.level if self.tokens else None,
+        }
+
+    def settle(self, estimated, prompt_tokens=None, completion_tokens=None):
+        """
+        Correct the TPM bucket with the real usage reported by the provider.
+        Without usage (e.g. a failed call) the estimate stays charged.
+        """
+        with self.lock:
+            if prompt_tokens is None or completion_tokens is None:
+                self.tokens_used["estimated"] += estimated
+                return
+            self.tokens_used["prompt"] += prompt_tokens
+            self.tokens_used["completion"] += completion_tokens
+        self._refund(estimated - (prompt_tokens + completion_tokens))
+
+    def stats(self):
+        available = self._available()
+        with self.lock:
+            return {
+                "queued": dict(self.waiting),
+                "priorities": {p: dict(c) for p, c in self.counters.items()},
+                "tokens_used": dict(self.tokens_used),
+                "requests_available": round(available["requests"], 2) if available["requests"] is not None else None,
+                "tokens_available": round(available["tokens"], 2) if available["tokens"] is not None else None,
+            }
+
+
+class SharedLLMScheduler(LLMScheduler):
+    """
+    `LLMScheduler` whose RPM/TPM buckets live in a SQLite file shared by every
+    process on the host, so the API workers and the ingestion scripts draw
+    from one upstream quota. Queued calls are listed in a waiters table, so
+    batch callers in any process also yield to interactive calls queued in
+    any other. Queueing counters in `stats()` stay per process.
+    """
+
+    def __init__(self, path, requests_per_minute=0, tokens_per_minute=0):
+        super().__init__()
+        self.limits = {
+            name: float(limit)
+            for name, limit in (("requests", requests_per_minute), ("tokens", tokens_per_minute)) if limit
+        }
+        self.db_lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, level REAL, updated REAL)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS waiters (id TEXT PRIMARY KEY, priority TEXT, seen REAL)")
+
+    @contextmanager
+    def _transaction(self):
+        with self.db_lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                yield time.time()
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+
+    def _levels(self, now):
+        """Current bucket levels, refilled continuously up to one minute's worth (as TokenBucket)."""
+        levels = {}
+        for name, limit in self.limits.items():
+            row = self.db.execute("SELECT level, updated FROM buckets WHERE name = ?", (name,)).fetchone()
+            levels[name] = limit if row is None else min(limit, row[0] + max(0.0, now - row[1]) * limit / 60.0)
+        return levels
+
+    def _store(self, levels, now):
+        self.db.executemany(
+            "INSERT OR REPLACE INTO buckets (name, level, updated) VALUES (?, ?, ?)",
+            [(name, level, now) for name, level in levels.items()],
+        )
+
+    def _enter(self, priority):
+        ticket = super()._enter(priority)
+        with self._transaction() as now:
+            self.db.execute("DELETE FROM waiters WHERE seen < ?", (now - WAITER_TTL_SECONDS,))
+            self.db.execute("INSERT INTO waiters (id, priority, seen) VALUES (?, ?, ?)", (ticket["id"], priority, now))
+        return ticket
+
+    def _leave(self, priority, ticket):
+        with self._transaction():
+            self.db.execute("DELETE FROM waiters WHERE id = ?", (ticket["id"],))
+        super()._leave(priority, ticket)
+
+    def _try_acquire(self, tokens, priority, ticket=None):
+        amounts = {"requests": 1, "tokens": tokens}
+        with self._transaction() as now:
+            if ticket is not None:
+                self.db.execute("UPDATE waiters SET seen = ? WHERE id = ?", (now, ticket["id"]))
+            if priority != INTERACTIVE and self.db.execute(
+                "SELECT 1 FROM waiters WHERE priority = ? AND seen >= ? LIMIT 1",
+                (INTERACTIVE, now - WAITER_TTL_SECONDS),
+            ).fetchone():
+                return BATCH_YIELD_SECONDS
+            levels = self._levels(now)
+            wait = 0.0
+            for name, limit in self.limits.items():
+                amount = min(amounts[name], limit)
+                if levels[name] < amount:
+                    wait = max(wait, (amount - levels[name]) / (limit / 60.0))
+            if wait > 0:
+                return wait
+            self._store({name: levels[name] - min(amounts[name], limit) for name, limit in self.limits.items()}, now)
+            return 0.0
+
+    def _refund(self, tokens):
+        if "tokens" not in self.limits:
+            return
+        with self._transaction() as now:
+            levels = self._levels(now)
+            self._store({"tokens": min(self.limits["tokens"], levels["tokens"] + tokens)}, now)
+
+    def _available(self):
+        with self._transaction() as now:
+            levels = self._levels(now)
+        return {name: levels.get(name) for name in ("requests", "tokens")}
@@ -0,0 +1,225 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # per-request profiling unavailable
+    Profiler = None
+
+# Latency buckets in seconds, from cached lookups up to slow LLM calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def _samples(self):
+        return [f"{self.name}{_labels(self.labelnames, k)} {v}" for k, v in sorted(self.values.items())]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+    def _samples(self):
+        return [f"{self.name}{_labels(self.labelnames, k)} {v}" for k, v in sorted(self.values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            counts, total, count = self.values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self.values[key] = (counts, total + value, count + 1)
+
+    def _samples(self):
+        lines = []
+        for key, (counts, total, count) in sorted(self.values.items()):
+            for bound, n in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', bound)])} {n}")
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    """Process-local metrics in the Prometheus text exposition format (no client library needed)."""
+
+    def __init__(self):
+        self.metrics = []
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._add(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.counter("http_requests_total", "HTTP requests by route and status.", ["endpoint", "method", "status"])
+HTTP_LATENCY = registry.histogram("http_request_duration_seconds", "HTTP request latency, until the last body chunk is sent.",
+                                  ["endpoint", "method"])
+STAGE_LATENCY = registry.histogram("stage_duration_seconds", "Latency of instrumented pipeline stages.", ["stage"])
+LLM_REQUESTS = registry.counter("llm_requests_total", "LLM completions by caller and outcome (ok, cache_hit, error).",
+                                ["endpoint", "model", "outcome"])
+LLM_LATENCY = registry.histogram("llm_request_duration_seconds", "Upstream LLM call latency, queueing included.",
+                                 ["endpoint", "model"])
+LLM_TOKENS = registry.counter("llm_tokens_total", "LLM tokens by kind (prompt, completion); streams are estimated.",
+                              ["endpoint", "model", "kind"])
+STARTUP_STAGE_SECONDS = registry.gauge("startup_stage_seconds", "Duration of each warm-up stage.", ["stage"])
+STARTUP_STAGE_READY = registry.gauge("startup_stage_ready", "1 once a warm-up stage is ready, 0 while pending or failed.", ["stage"])
+
+
+@contextmanager
+def timed(stage):
+    """Record the duration of the `with` block under `stage` (works in threads and coroutines)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - started, stage=stage)
+
+
+@contextmanager
+def llm_call(endpoint, model):
+    """
+    Time one upstream LLM call. The block may set `call["prompt_tokens"]` and
+    `call["completion_tokens"]`; an exception counts as an error.
+    """
+    call = {}
+    started = time.perf_counter()
+    try:
+        yield call
+    except BaseException:
+        LLM_REQUESTS.inc(endpoint=endpoint, model=model, outcome="error")
+        raise
+    finally:
+        LLM_LATENCY.observe(time.perf_counter() - started, endpoint=endpoint, model=model)
+    LLM_REQUESTS.inc(endpoint=endpoint, model=model, outcome="ok")
+    for kind in ("prompt", "completion"):
+        if call.get(f"{kind}_tokens"):
+            LLM_TOKENS.inc(call[f"{kind}_tokens"], endpoint=endpoint, model=model, kind=kind)
+
+
+def llm_cache_hit(endpoint, model):
+    LLM_REQUESTS.inc(endpoint=endpoint, model=model, outcome="cache_hit")
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: counts and times every HTTP request by route template
+    (so `/papers/{paper_id}` is one series). With `profile_dir` set, a request
+    carrying `X-Profile: 1` runs under pyinstrument's sampling profiler and
+    the HTML report is written there (file name in the `X-Profile` response
+    header).
+    """
+
+    def __init__(self, app, profile_dir=None):
+        self.app = app
+        self.profile_dir = profile_dir
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500}
+        profiler, profile_path = self._profiler(scope)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if profile_path:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-profile", os.path.basename(profile_path).encode())
+                    ]
+            await send(message)
+
+        if profiler:
+            profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or "unmatched"
+            HTTP_LATENCY.observe(time.perf_counter() - started, endpoint=endpoint, method=scope["method"])
+            HTTP_REQUESTS.inc(endpoint=endpoint, method=scope["method"], status=status["code"])
+            if profiler:
+                profiler.stop()
+                with open(profile_path, "w", encoding="utf-8") as f:
+                    f.write(profiler.output_html())
+
+    def _profiler(self, scope):
+        if not self.profile_dir or Profiler is None:
+            return None, None
+        headers = dict(scope.get("headers") or [])
+        if headers.get(b"x-profile", b"").lower() not in (b"1", b"true"):
+            return None, None
+        os.makedirs(self.profile_dir, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{scope['path'].strip('/').replace('/', '_') or 'root'}-{time.perf_counter_ns() % 10**6}.html"
+        return Profiler(async_mode="enabled"), os.path.join(self.profile_dir, name)
@@ -0,0 +1,180 @@
+import time
+
+# Every MERGE/MATCH below looks nodes up by these keys
+CONSTRAINTS = [
+    "CREATE CONSTRAINT cluster_id IF NOT EXISTS FOR (c:Cluster) REQUIRE c.id IS UNIQUE",
+    "CREATE CONSTRAINT topic_name IF NOT EXISTS FOR (t:Topic) REQUIRE t.name IS UNIQUE",
+    "CREATE CONSTRAINT entity_name IF NOT EXISTS FOR (e:Entity) REQUIRE e.name IS UNIQUE",
+    "CREATE CONSTRAINT paper_id IF NOT EXISTS FOR (p:Paper) REQUIRE p.id IS UNIQUE",
+]
+
+QUERIES = {
+    "clusters": """
+        UNWIND $rows AS row
+        MERGE (c:Cluster {id: row.id})
+        SET c.summary = row.summary
+        WITH c
+        // the topics/entities steps re-link the cluster to its new summary
+        OPTIONAL MATCH (c)-[old:HAS_TOPIC|CONTAINS]->()
+        DELETE old
+    """,
+    "topics": """
+        UNWIND $rows AS row
+        MATCH (c:Cluster {id: row.cluster})
+        MERGE (t:Topic {name: row.name})
+        MERGE (c)-[:HAS_TOPIC]->(t)
+    """,
+    "entities": """
+        UNWIND $rows AS row
+        MATCH (c:Cluster {id: row.cluster})
+        MERGE (en:Entity {name: row.name})
+        SET en.type = row.type
+        MERGE (c)-[:CONTAINS]->(en)
+    """,
+    "relations": """
+        UNWIND $rows AS row
+        MATCH (a:Entity {name: row.source}), (b:Entity {name: row.target})
+        MERGE (a)-[:RELATION {type: row.type}]->(b)
+    """,
+    "papers": """
+        UNWIND $rows AS row
+        MATCH (c:Cluster {id: row.cluster})
+        MERGE (p:Paper {id: row.id})
+        SET p.title = row.title, p.year = row.year, p.abstract = row.abstract
+        MERGE (p)-[:BELONGS_TO]->(c)
+        WITH p, c
+        // a refit can move a paper to another cluster
+        OPTIONAL MATCH (p)-[old:BELONGS_TO]->(other:Cluster)
+        WHERE other <> c
+        DELETE old
+        WITH DISTINCT p
+        // the paper_topics/paper_entities steps re-link it to its cluster's summary
+        OPTIONAL MATCH (p)-[stale:MENTIONS|REPORTS]->()
+        DELETE stale
+    """,
+    # One row per paper with its cluster's topic/entity names, instead of one call per pair
+    "paper_topics": """
+        UNWIND $rows AS row
+        MATCH (p:Paper {id: row.paper})
+        UNWIND row.names AS name
+        MATCH (t:Topic {name: name})
+        MERGE (p)-[:MENTIONS]->(t)
+    """,
+    "paper_entities": """
+        UNWIND $rows AS row
+        MATCH (p:Paper {id: row.paper})
+        UNWIND row.names AS name
+        MATCH (en:Entity {name: name})
+        MERGE (p)-[:REPORTS]->(en)
+    """,
+}
+
+# Papers used to be keyed by row number (PAPER_<row>), which shifts between refreshes;
+# they are keyed by PMC id or link now, so any node left with a row id is stale
+LEGACY_CLEANUP = """
+    MATCH (p:Paper)
+    WHERE p.id STARTS WITH 'PAPER_'
+    DETACH DELETE p
+"""
+
+# Later steps MATCH nodes created by earlier ones
+STEPS = list(QUERIES)
+
+
+def _run_batch(tx, query, rows):
+    tx.run(query, rows=rows).consume()
+
+
+class GraphWriter:
+    """
+    Bulk Neo4j loader: each step sends its rows as a `$rows` parameter list to
+    an UNWIND query, `batch_size` rows per write transaction, and records
+    row/batch counts and timings for a throughput report.
+    """
+
+    def __init__(self, driver, batch_size=500, database=None):
+        self.driver = driver
+        self.batch_size = batch_size
+        self.database = database
+        self.stats = {}
+
+    def _session(self):
+        return self.driver.session(database=self.database) if self.database else self.driver.session()
+
+    def ensure_constraints(self):
+        with self._session() as session:
+            for statement in CONSTRAINTS:
+                session.run(statement).consume()
+
+    def drop_legacy_papers(self):
+        """Remove Paper nodes still keyed by row number (a no-op once they are gone)."""
+        with self._session() as session:
+            session.run(LEGACY_CLEANUP).consume()
+
+    def write(self, step, rows):
+        query = QUERIES[step]
+        stats = self.stats.setdefault(step, {"rows": 0, "batches": 0, "seconds": 0.0})
+        start = time.perf_counter()
+        with self._session() as session:
+            for i in range(0, len(rows), self.batch_size):
+                batch = rows[i:i + self.batch_size]
+                session.execute_write(_run_batch, query, batch)
+                stats["batches"] += 1
+        stats["rows"] += len(rows)
+        stats["seconds"] += time.perf_counter() - start
+
+    def write_graph(self, graph):
+        """Write every step of `graph` ({step: rows}) in dependency order."""
+        for step in STEPS:
+            rows = graph.get(step, [])
+            if rows:
+                self.write(step, rows)
+
+    def report(self):
+        total_rows = sum(s["rows"] for s in self.stats.values())
+        total_seconds = sum(s["seconds"] for s in self.stats.values())
+        for step, s in self.stats.items():
+            rate = s["rows"] / s["seconds"] if s["seconds"] else 0.0
+            print(f"   {step:<15}{s['rows']:>8} rows{s['batches']:>6} batches{s['seconds']:>8.2f}s{rate:>10.0f} rows/s")
+        rate = total_rows / total_seconds if total_seconds else 0.0
+        print(f"   {'total':<15}{total_rows:>8} rows{'':>14}{total_seconds:>8.2f}s{rate:>10.0f} rows/s")
+
+
+class RecordingDriver:
+    """
+    In-process stand-in for `neo4j.Driver` (dry runs and tests): implements
+    the session/transaction calls GraphWriter uses and records every query
+    with its parameters instead of sending it.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def session(self, **kwargs):
+        return _RecordingSession(self.calls)
+
+    def close(self):
+        pass
+
+
+class _RecordingSession:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, parameters=None, **params):
+        self.calls.append((" ".join(query.split()), {**(parameters or {}), **params}))
+        return _Result()
+
+    def execute_write(self, fn, *args, **kwargs):
+        return fn(self, *args, **kwargs)
+
+
+class _Result:
+    def consume(self):
+        return None
@@ -0,0 +1,116 @@
+import json
+import base64
+import numpy as np
+import pandas as pd
+
+# Columns that are only used internally and never sent to the frontend
+INTERNAL_COLUMNS = ["clean_full_text"]
+# Long text columns: read from the table for the requested rows only
+HEAVY_COLUMNS = ["abstract", "conclusion", "sections"]
+# Columns the `q` filter matches against
+SEARCH_COLUMNS = ["Title", "abstract", "conclusion"]
+
+
+def encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"o": offset}).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    offset = json.loads(base64.urlsafe_b64decode(padded.encode()))["o"]
+    if not isinstance(offset, int) or offset < 0:
+        raise ValueError("invalid cursor")
+    return offset
+
+
+class PaperCatalog:
+    """
+    Read-only view of the papers table for the `/papers` endpoint.
+
+    The short fields (id, title, link, date, year, category, ...) are
+    precomputed once as NaN-clean record dicts, and the filter columns as
+    compact arrays. The long text columns (abstract, conclusion, sections)
+    stay in the table and are read for the requested rows only, so workers
+    attached to a memory-mapped snapshot don't copy them into Python objects.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.columns = [c for c in df.columns if c not in INTERNAL_COLUMNS]
+        self.fields = ["id"] + self.columns
+        self.heavy_columns = [c for c in self.columns if c in HEAVY_COLUMNS]
+        self.light = self._build_records(range(len(df)), [c for c in self.columns if c not in HEAVY_COLUMNS])
+        categories = df["primary_category"].astype("category")
+        self.category_codes = categories.cat.codes.to_numpy()
+        self.category_index = {name: code for code, name in enumerate(categories.cat.categories)}
+        self.year_column = pd.to_numeric(df["year"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+        self.search_columns = [df[c] for c in SEARCH_COLUMNS if c in df.columns]
+        # Corpus version that last wrote each row (0 for files written before versioning)
+        if "ingest_version" in df.columns:
+            self.version_column = df["ingest_version"].fillna(0).to_numpy(dtype=int)
+        else:
+            self.version_column = np.zeros(len(df), dtype=int)
+        self.categories = sorted(pd.unique(df["primary_category"].dropna()).tolist())
+
+    def __len__(self):
+        return len(self.df)
+
+    def _build_records(self, rows, columns):
+        """NaN-clean record dicts ("id" first) for the given row positions and columns."""
+        page = self.df.iloc[list(rows)][columns]
+        if "date" in page.columns and pd.api.types.is_datetime64_any_dtype(page["date"]):
+            page = page.assign(date=page["date"].dt.strftime("%Y-%m-%d"))
+        page = page.astype(object).where(page.notna(), None)
+        records = []
+        for row, record in zip(rows, page.to_dict(orient="records")):
+            # Assigning these back to the frame would turn them into floats/NaN again
+            if record.get("year") is not None:
+                record["year"] = int(record["year"])
+            records.append({"id": int(row), **record})
+        return records
+
+    def records(self, rows, fields=None):
+        """Record dicts for the given row positions, projected to `fields` (default: all)."""
+        fields = fields or self.fields
+        heavy = {
+            c: [None if pd.isna(v) else v for v in self.df[c].iloc[rows].tolist()]
+            for c in self.heavy_columns if c in fields
+        }
+        records = []
+        for i, row in enumerate(rows):
+            record = self.light[row]
+            if heavy:
+                record = {**record, **{c: values[i] for c, values in heavy.items()}}
+            records.append({f: record[f] for f in fields})
+        return records
+
+    def get(self, paper_id: int):
+        if 0 <= paper_id < len(self):
+            return self.records([paper_id])[0]
+        return None
+
+    def _matches(self, q):
+        """Rows whose title, abstract or conclusion contains `q` (case-insensitive)."""
+        found = np.zeros(len(self), dtype=bool)
+        for column in self.search_columns:
+            found |= column.str.contains(q, case=False, regex=False, na=False).to_numpy(dtype=bool)
+        return found
+
+    def query(self, offset=0, limit=20, category=None, year_from=None, year_to=None, q=None, fields=None,
+              since_version=None):
+        """Filter, page and project the catalog. Returns (total, items)."""
+        mask = np.ones(len(self), dtype=bool)
+        if category:
+            mask &= self.category_codes == self.category_index.get(category, -2)
+        # NaN years compare False, so papers without a date drop out of year filters
+        if year_from is not None:
+            mask &= self.year_column >= year_from
+        if year_to is not None:
+            mask &= self.year_column <= year_to
+        if since_version is not None:
+            mask &= self.version_column > since_version
+        if q:
+            mask &= self._matches(q)
+
+        matches = np.flatnonzero(mask)
+        return len(matches), self.records(matches[offset:offset + limit], fields)
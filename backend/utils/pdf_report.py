@@ -0,0 +1,175 @@
+import io
+import re
+import json
+import asyncio
+import zipfile
+import threading
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from reportlab.lib.enums import TA_LEFT
+from config.config import PDF_WORKERS, PDF_BULK_WORKERS
+from utils.LLM_utils import parse_markdown
+from utils.metrics import timed
+
+HEADINGS = ("Mission Information:", "Mission Insights:", "Relevant Publications:", "Tooltips / Notes:")
+
+# ReportLab holds the GIL while it lays out pages, so this bounds how many renders compete
+# with the event loop (and with each other) rather than making a single render faster.
+pool = ThreadPoolExecutor(max_workers=PDF_WORKERS, thread_name_prefix="pdf")
+# Bulk archives render here, so a 100-report request cannot delay single /generate-pdf renders
+bulk_pool = ThreadPoolExecutor(max_workers=PDF_BULK_WORKERS, thread_name_prefix="pdf-bulk")
+_local = threading.local()
+
+
+@lru_cache(maxsize=1)
+def stylesheet():
+    styles = getSampleStyleSheet()
+    styles['Normal'].alignment = TA_LEFT
+    return styles
+
+def _static_flowables():
+    """
+    Title, headings and spacers are the same in every report; each pool thread
+    builds them once. Paragraphs keep layout state while a document is built,
+    so they are not shared between threads.
+    """
+    if not hasattr(_local, "flowables"):
+        styles = stylesheet()
+        flowables = {"title": Paragraph("Mission Details", styles['Title'])}
+        for heading in HEADINGS:
+            flowables[heading] = Paragraph(heading, styles['Heading2'])
+        flowables["no_papers"] = Paragraph("No relevant publications found.", styles['Normal'])
+        flowables["gap"] = Spacer(1, 12)
+        flowables["small_gap"] = Spacer(1, 2)
+        _local.flowables = flowables
+    return _local.flowables
+
+
+def render_report(data) -> bytes:
+    """Render one `MissionData` to PDF bytes. Blocking: run it in `pool`."""
+    with timed("pdf.render"):
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(
+            buffer,
+            pagesize=A4,
+            rightMargin=30,
+            leftMargin=30,
+            topMargin=30,
+            bottomMargin=18
+        )
+        normal = stylesheet()['Normal']
+        static = _static_flowables()
+        elements = [static["title"], static["gap"]]
+
+        # Mission Information
+        elements.append(static["Mission Information:"])
+        for key, val in data.mission.items():
+            elements.append(Paragraph(f"<b>{key}:</b> {val}", normal))
+        elements.append(static["gap"])
+
+        # Mission Insights
+        elements.append(static["Mission Insights:"])
+        mission_insight = data.insights.get("missionInsight") or "No insights available."
+        elements.append(Paragraph(parse_markdown(mission_insight), normal))
+        elements.append(static["gap"])
+
+        # Relevant Publications
+        elements.append(static["Relevant Publications:"])
+        if data.topPapers:
+            for paper in data.topPapers:
+                if paper.link:
+                    elements.append(Paragraph(f'<a href="{paper.link}">{paper.title}</a>', normal))
+                else:
+                    elements.append(Paragraph(paper.title, normal))
+                elements.append(static["small_gap"])
+        else:
+            elements.append(static["no_papers"])
+        elements.append(static["gap"])
+
+        # Tooltips / Notes
+        if data.tooltips:
+            elements.append(static["Tooltips / Notes:"])
+            for key, val in data.tooltips.items():
+                elements.append(Paragraph(f"<b>{key}:</b> {val}", normal))
+            elements.append(static["gap"])
+
+        doc.build(elements)
+        return buffer.getvalue()
+
+async def arender_report(data) -> bytes:
+    return await asyncio.get_running_loop().run_in_executor(pool, render_report, data)
+
+
+def report_filename(data, number):
+    """`mission-003-mars-planning.pdf`: position in the request, then type and phase if set."""
+    parts = [str(data.mission.get(k, "")) for k in ("type", "phase")]
+    slug = re.sub(r"[^a-z0-9]+", "-", "-".join(p for p in parts if p).lower()).strip("-")
+    return f"mission-{number:03d}{'-' + slug[:40] if slug else ''}.pdf"
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable file for `zipfile`: collects output until `drain()`."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+async def stream_report_zip(missions):
+    """
+    Render `missions` in the bulk pool and yield a ZIP archive chunk by chunk,
+    each report as soon as it finishes (so entries are in completion order).
+    Reports that fail to render are listed in `errors.json` at the end of the
+    archive.
+    """
+    loop = asyncio.get_running_loop()
+    # Only as many renders in flight as the pool has threads: concurrent bulk requests
+    # take turns instead of one queueing all of its reports ahead of the others
+    queue = iter(enumerate(missions, start=1))
+    futures = {}
+
+    def submit():
+        item = next(queue, None)
+        if item is not None:
+            futures[loop.run_in_executor(bulk_pool, render_report, item[1])] = item
+
+    for _ in range(PDF_BULK_WORKERS):
+        submit()
+    sink = _ChunkSink()
+    errors = []
+    try:
+        # PDF page streams are already compressed
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+            while futures:
+                done, _ = await asyncio.wait(futures, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    number, data = futures.pop(future)
+                    submit()
+                    try:
+                        archive.writestr(report_filename(data, number), future.result())
+                    except Exception as e:
+                        errors.append({"mission": number, "error": str(e)})
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+            if errors:
+                archive.writestr("errors.json", json.dumps(sorted(errors, key=lambda e: e["mission"]), indent=2))
+        yield sink.drain()
+    finally:
+        # Client went away: nothing beyond the in-flight renders was submitted
+        for future in futures:
+            future.cancel()
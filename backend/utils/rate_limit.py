@@ -0,0 +1,55 @@
+import time
+import asyncio
+import threading
+
+
+class TokenBucket:
+    """
+    Classic token bucket refilled continuously at `rate_per_minute`.
+    `capacity` defaults to one minute's worth, i.e. bursts up to the limit.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(capacity or rate_per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount=1):
+        """Seconds until `amount` can be taken (0 if it can be taken now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount=1):
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def give(self, amount):
+        """Return (or, with a negative amount, charge) tokens after the fact."""
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+    def try_acquire(self, amount=1):
+        """Take `amount` if available; otherwise return the seconds to wait."""
+        with self.lock:
+            wait = self.wait_time(amount)
+            if wait == 0:
+                self.take(amount)
+            return wait
+
+    def acquire(self, amount=1):
+        while (wait := self.try_acquire(amount)) > 0:
+            time.sleep(min(wait, 1.0))
+
+    async def aacquire(self, amount=1):
+        while (wait := self.try_acquire(amount)) > 0:
+            await asyncio.sleep(min(wait, 1.0))
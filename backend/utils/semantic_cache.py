@@ -0,0 +1,139 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# Mission fields that must match exactly; numeric fields are compared by value, the rest by embedding
+EXACT_FIELDS = ("type", "phase", "objective")
+# A numeric field: a number, or a string of numbers such as coordinates ("18.4,77.5")
+NUMBERS = re.compile(r"^\s*[-+]?\d*\.?\d+(?:[eE][-+]?\d+)?(?:\s*[,;/ ]\s*[-+]?\d*\.?\d+(?:[eE][-+]?\d+)?)*\s*$")
+
+
+def _numbers(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return (float(value),)
+    if isinstance(value, str) and NUMBERS.match(value):
+        return tuple(float(v) for v in re.split(r"\s*[,;/ ]\s*", value.strip()))
+    return None
+
+
+def mission_key(mission, *extra):
+    """Exact-match part of the key: categorical fields (case/whitespace-insensitive) plus e.g. the dataset version."""
+    return tuple(str(mission.get(f, "")).strip().lower() for f in EXACT_FIELDS) + extra
+
+
+def mission_numbers(mission):
+    """{field: numbers} of the numeric fields, which a cached mission must match by value."""
+    numbers = {}
+    for field, value in mission.items():
+        if field not in EXACT_FIELDS and (parsed := _numbers(value)) is not None:
+            numbers[field] = parsed
+    return numbers
+
+
+def mission_text(mission):
+    """
+    Deterministic text of the free-text fields (context, notes, ...), embedded
+    without an LLM call, so that a hit skips both the summary and the insight
+    completions. Numbers are left out: embeddings barely tell "crew: 4" from
+    "crew: 6", so they are matched by `mission_numbers` instead.
+    """
+    numbers = mission_numbers(mission)
+    return "; ".join(f"{k}: {mission[k]}" for k in sorted(mission) if k not in EXACT_FIELDS and k not in numbers)
+
+
+class SemanticCache:
+    """
+    Result cache for near-identical inputs. An entry is served when its exact
+    key matches, its numbers match the query's ({field: values}: exactly, or
+    within the relative `tolerances` given per field) and the cosine
+    similarity of its vector to the query vector is at least `threshold`;
+    the most similar entry wins. LRU-bounded to `max_entries`, entries expire
+    after `ttl_seconds`.
+    """
+
+    def __init__(self, threshold=0.97, max_entries=256, ttl_seconds=3600, tolerances=None):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.tolerances = tolerances or {}
+        self.entries = OrderedDict()  # id -> (key, unit vector, result, created_at, numbers)
+        self.next_id = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    @staticmethod
+    def _unit(vector):
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _same_numbers(self, a, b):
+        if a.keys() != b.keys():
+            return False
+        for field, values in a.items():
+            other = b[field]
+            if len(values) != len(other):
+                return False
+            tolerance = self.tolerances.get(field, 0.0)
+            if any(abs(x - y) > tolerance * max(abs(x), abs(y)) for x, y in zip(values, other)):
+                return False
+        return True
+
+    def lookup(self, key, vector, numbers=None):
+        """Return (result, similarity, age in seconds) of the best match, or (None, best similarity, None)."""
+        query = self._unit(vector)
+        numbers = numbers or {}
+        now = time.time()
+        with self.lock:
+            expired = [i for i, e in self.entries.items() if now - e[3] > self.ttl_seconds]
+            for i in expired:
+                del self.entries[i]
+            candidates = [(i, e) for i, e in self.entries.items() if e[0] == key and self._same_numbers(e[4], numbers)]
+            if not candidates:
+                self.misses += 1
+                return None, None, None
+            similarities = np.stack([e[1] for _, e in candidates]) @ query
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                self.misses += 1
+                return None, similarity, None
+            entry_id, entry = candidates[best]
+            self.entries.move_to_end(entry_id)
+            self.hits += 1
+            return entry[2], similarity, now - entry[3]
+
+    def add(self, key, vector, result, numbers=None):
+        """Store `result`, replacing entries it would shadow (same key and numbers, within the threshold)."""
+        unit = self._unit(vector)
+        numbers = numbers or {}
+        with self.lock:
+            shadowed = [
+                i for i, e in self.entries.items()
+                if e[0] == key and self._same_numbers(e[4], numbers) and float(e[1] @ unit) >= self.threshold
+            ]
+            for i in shadowed:
+                del self.entries[i]
+            self.entries[self.next_id] = (key, unit, result, time.time(), numbers)
+            self.next_id += 1
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def bypass(self):
+        with self.lock:
+            self.bypassed += 1
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+        }
@@ -0,0 +1,174 @@
+import os
+import json
+import time
+import shutil
+import numpy as np
+import pandas as pd
+from config.config import SNAPSHOT_DIR, VECTOR_INDEX_BACKEND, VECTOR_INDEX_PARAMS
+from utils.vector_index import index_arrays, index_from_arrays
+from utils.paper_catalog import PaperCatalog
+from utils.lexical_index import BM25Index
+from utils.metrics import STARTUP_STAGE_READY
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, racing workers publish the same files
+    fcntl = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # pickled frames, copied into each worker
+    pa = None
+
+MATRICES = ("category_embeddings", "text_embeddings", "image_embeddings")
+INDEXES = {"papers": ("paper_index", "text_embeddings"), "images": ("image_index", "image_embeddings")}
+# Bumped when the snapshot layout changes, so workers never attach to an older one
+FORMAT_VERSION = 2
+# Stages an attached worker has without computing anything; "model" still loads per worker
+SNAPSHOT_STAGES = ["dataset", "category_embeddings", "paper_embeddings", "image_embeddings", "lexical_index"]
+
+
+def snapshot_path(state, snapshot_dir=SNAPSHOT_DIR):
+    """Directory of the snapshot for the current input files, embedding backend and index backend."""
+    index = VECTOR_INDEX_BACKEND
+    compression = VECTOR_INDEX_PARAMS.get(VECTOR_INDEX_BACKEND, {}).get("compression", "none")
+    if compression != "none":
+        index += f"-{compression}"
+    return os.path.join(snapshot_dir, f"{state.source_version()}-{index}-f{FORMAT_VERSION}")
+
+
+def _write_frame(df, path):
+    if pa is None:
+        df.to_pickle(path)
+        return
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _read_frame(path):
+    if pa is None:
+        return pd.read_pickle(path)
+    # Arrow IPC is read straight out of the mapped file; strings stay in those buffers
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    strings = {pa.string(): pd.StringDtype("pyarrow"), pa.large_string(): pd.StringDtype("pyarrow")}
+    return table.to_pandas(types_mapper=strings.get)
+
+
+def publish(state, path):
+    """
+    Write a warmed-up state's read-only data to `path`: raw .npy matrices
+    (memory-mappable), the index arrays, and the tables as Arrow IPC files.
+    `manifest.json` is written last and the directory renamed into place,
+    so a snapshot that exists is complete.
+    """
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    for name in MATRICES:
+        np.save(os.path.join(tmp_path, f"{name}.npy"), np.ascontiguousarray(getattr(state, name), dtype=np.float32))
+    indexes = {}
+    for name, (attr, _) in INDEXES.items():
+        index = getattr(state, attr)
+        arrays = index_arrays(index)
+        if arrays is None:
+            continue  # hnsw: each worker loads the saved index file
+        for key, array in arrays.items():
+            np.save(os.path.join(tmp_path, f"{name}_index.{key}.npy"), np.ascontiguousarray(array))
+        indexes[name] = {"backend": index.backend, "compression": getattr(index, "compression", "none"), "arrays": sorted(arrays)}
+    for key, array in state.lexical_index.arrays().items():
+        np.save(os.path.join(tmp_path, f"lexical_index.{key}.npy"), np.ascontiguousarray(array))
+    with open(os.path.join(tmp_path, "lexical_terms.json"), "w", encoding="utf-8") as f:
+        json.dump(state.lexical_index.terms, f)
+
+    _write_frame(state.df, os.path.join(tmp_path, "papers.arrow"))
+    _write_frame(state.df_nasa_budget, os.path.join(tmp_path, "budget.arrow"))
+    with open(os.path.join(tmp_path, "images.json"), "w", encoding="utf-8") as f:
+        json.dump(state.all_images_metadata, f)
+    with open(os.path.join(tmp_path, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "dataset_version": state.dataset_version,
+            "embedding_key": state.embedding_key,
+            "created_at": time.time(),
+            "indexes": indexes,
+        }, f, indent=2)
+
+    try:
+        os.replace(tmp_path, path)
+    except OSError:  # published concurrently (no fcntl)
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def attach(state, path):
+    """Point `state` at a published snapshot: matrices are memory-mapped read-only, nothing is recomputed."""
+    with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    df = _read_frame(os.path.join(path, "papers.arrow"))
+    df_nasa_budget = _read_frame(os.path.join(path, "budget.arrow"))
+    with open(os.path.join(path, "images.json"), "r", encoding="utf-8") as f:
+        all_images_metadata = json.load(f)
+    matrices = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in MATRICES}
+    with open(os.path.join(path, "lexical_terms.json"), "r", encoding="utf-8") as f:
+        lexical_terms = json.load(f)
+    lexical_arrays = {key: np.load(os.path.join(path, f"lexical_index.{key}.npy"), mmap_mode="r")
+                      for key in BM25Index.ARRAYS}
+
+    for name, value in matrices.items():
+        setattr(state, name, value)
+    for name, (attr, vectors) in INDEXES.items():
+        spec = manifest["indexes"].get(name)
+        if spec is None:
+            setattr(state, attr, state._build_index(name, matrices[vectors]))
+            continue
+        arrays = {key: np.load(os.path.join(path, f"{name}_index.{key}.npy"), mmap_mode="r") for key in spec["arrays"]}
+        params = {**VECTOR_INDEX_PARAMS.get(spec["backend"], {}), "compression": spec.get("compression", "none")}
+        setattr(state, attr, index_from_arrays(spec["backend"], arrays, exact=matrices[vectors], **params))
+
+    state.df = df
+    state.df_nasa_budget = df_nasa_budget
+    state.all_images_metadata = all_images_metadata
+    state.paper_catalog = PaperCatalog(df)
+    state.lexical_index = BM25Index.from_arrays(lexical_arrays, lexical_terms, len(df))
+    state.dataset_version = manifest["dataset_version"]
+    for stage in SNAPSHOT_STAGES:
+        state.stages[stage].update(status="ready", error=None)
+        STARTUP_STAGE_READY.set(1, stage=stage)
+
+
+def remove_stale(snapshot_dir, keep):
+    """Delete older snapshots; workers still attached keep their mappings until they exit."""
+    for name in os.listdir(snapshot_dir):
+        old = os.path.join(snapshot_dir, name)
+        if os.path.isdir(old) and old != keep and ".tmp" not in name:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def ensure_snapshot(state, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Return the path of an up-to-date snapshot, building it if there is none.
+    The first process to get here warms `state` up and publishes while
+    holding a file lock; the others wait for it and then only attach.
+    """
+    path = snapshot_path(state, snapshot_dir)
+    if os.path.exists(os.path.join(path, "manifest.json")):
+        return path
+    os.makedirs(snapshot_dir, exist_ok=True)
+    with open(os.path.join(snapshot_dir, ".lock"), "w") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        if not os.path.exists(os.path.join(path, "manifest.json")):
+            print(f"📤 Publishing shared snapshot to {path}...")
+            state.warm_up()
+            if not state.is_ready(*SNAPSHOT_STAGES):
+                raise RuntimeError("warm-up failed, snapshot not published")
+            publish(state, path)
+            remove_stale(snapshot_dir, path)
+    return path
+
+
+if __name__ == "__main__":
+    # python -m utils.shared_snapshot: loader process, publishes the snapshot before the workers start
+    from utils.app_state import AppState
+    print(f"✅ Snapshot ready at {ensure_snapshot(AppState())}")
@@ -0,0 +1,121 @@
+import numpy as np
+
+COMPRESSIONS = ("none", "float16", "int8", "pca")
+# Rows upcast to float32 at a time while scanning compressed vectors (the block stays in cache)
+SCAN_BLOCK = 1024
+
+
+def _scan(codes, weights, block=SCAN_BLOCK):
+    """`codes @ weights` for a low-precision matrix, upcasting one block of rows at a time."""
+    scores = np.empty(len(codes), dtype=np.float32)
+    for start in range(0, len(codes), block):
+        scores[start:start + block] = codes[start:start + block].astype(np.float32) @ weights
+    return scores
+
+
+class _Codec:
+    name = None
+    ARRAYS = ()  # the first one has a row per vector
+
+    def __len__(self):
+        return len(getattr(self, self.ARRAYS[0]))
+
+    def arrays(self):
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    @property
+    def nbytes(self):
+        return sum(np.asarray(a).nbytes for a in self.arrays().values())
+
+
+class Float32Codec(_Codec):
+    """Uncompressed: the normalised vectors themselves (4 bytes per dimension)."""
+
+    name = "none"
+    ARRAYS = ("vectors",)
+
+    def __init__(self, vectors, **params):
+        self.vectors = vectors
+
+    def scores(self, q):
+        return self.vectors @ q
+
+
+class Float16Codec(_Codec):
+    """
+    Half precision (2 bytes per dimension); cosine error around 1e-3. NumPy
+    has no fast float16 upcast, so the scan is several times slower than
+    float32's: int8 is the better trade when latency matters.
+    """
+
+    name = "float16"
+    ARRAYS = ("codes",)
+
+    def __init__(self, vectors, **params):
+        self.codes = vectors.astype(np.float16)
+
+    def scores(self, q):
+        return _scan(self.codes, q)
+
+
+class Int8Codec(_Codec):
+    """
+    Per-dimension scalar quantisation (1 byte per dimension): each dimension's
+    [min, max] range is split into 256 levels, x ~ offset + scale * (code + 128).
+    The query is folded into the scale so scoring needs no dequantised copy.
+    """
+
+    name = "int8"
+    ARRAYS = ("codes", "offset", "scale")
+
+    def __init__(self, vectors, **params):
+        low, high = vectors.min(axis=0), vectors.max(axis=0)
+        self.offset = low.astype(np.float32)
+        self.scale = np.maximum((high - low) / 255.0, 1e-12).astype(np.float32)
+        levels = np.rint((vectors - self.offset) / self.scale) - 128
+        self.codes = np.clip(levels, -128, 127).astype(np.int8)
+
+    def scores(self, q):
+        weights = (self.scale * q).astype(np.float32)
+        return _scan(self.codes, weights) + float((self.offset + 128 * self.scale) @ q)
+
+
+class PCACodec(_Codec):
+    """
+    Projection onto the top `pca_dim` principal components (float32): x ~
+    mean + components.T @ z, so x . q ~ z . (components @ q) + mean . q.
+    """
+
+    name = "pca"
+    ARRAYS = ("codes", "mean", "components")
+
+    def __init__(self, vectors, pca_dim=128, **params):
+        from sklearn.decomposition import PCA
+
+        n_components = max(1, min(pca_dim, vectors.shape[1], len(vectors)))
+        pca = PCA(n_components=n_components, svd_solver="randomized", random_state=42).fit(vectors)
+        self.mean = pca.mean_.astype(np.float32)
+        self.components = pca.components_.astype(np.float32)
+        self.codes = np.ascontiguousarray(((vectors - self.mean) @ self.components.T).astype(np.float32))
+
+    def scores(self, q):
+        return self.codes @ (self.components @ q) + float(self.mean @ q)
+
+
+CODECS = {codec.name: codec for codec in (Float32Codec, Float16Codec, Int8Codec, PCACodec)}
+
+
+def build_codec(vectors, compression="none", **params):
+    if compression not in CODECS:
+        print(f"⚠️ Unknown vector compression '{compression}', storing float32.")
+        compression = "none"
+    if len(vectors) == 0:
+        compression = "none"
+    return CODECS[compression](vectors, **params)
+
+def codec_from_arrays(compression, arrays):
+    """Rebuild a codec around existing (e.g. memory-mapped) arrays without copying them."""
+    codec = CODECS[compression].__new__(CODECS[compression])
+    for name, array in arrays.items():
+        setattr(codec, name, array)
+    return codec
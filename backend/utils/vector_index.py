@@ -0,0 +1,257 @@
+import os
+import hashlib
+import numpy as np
+from utils.vector_codecs import CODECS, build_codec, codec_from_arrays
+
+try:
+    import hnswlib
+except ImportError:  # optional, only needed for VECTOR_INDEX_BACKEND=hnsw
+    hnswlib = None
+
+
+def normalize(vectors):
+    """L2-normalise rows so a dot product equals cosine similarity."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def top_k_indices(scores, k):
+    """Indices of the k highest scores, best first, without a full sort."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        idxs = np.argpartition(-scores, k - 1)[:k]
+    else:
+        idxs = np.arange(len(scores))
+    return idxs[np.argsort(-scores[idxs], kind="stable")]
+
+
+def fingerprint(vectors):
+    """Content hash of a matrix, used to tell whether a saved index is stale."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    digest = hashlib.blake2b(vectors.tobytes(), digest_size=16)
+    digest.update(str(vectors.shape).encode())
+    return digest.hexdigest()
+
+
+class BruteForceIndex:
+    """
+    Cosine search over pre-normalised vectors with partial top-k selection.
+
+    With a `compression` (float16, int8 or pca, see utils/vector_codecs.py)
+    the scan runs over the compressed vectors, and `rerank` > 0 rescores
+    that many of the best candidates exactly against the float32 `vectors`.
+    The index keeps only a reference to them (typically the memory-mapped
+    embedding store), so a query reads just those rows.
+    """
+
+    backend = "brute"
+
+    def __init__(self, vectors, compression="none", pca_dim=128, rerank=0):
+        self.codec = build_codec(normalize(vectors), compression, pca_dim=pca_dim)
+        self.rerank = rerank
+        self.exact = vectors if rerank and self.codec.name != "none" else None
+
+    @property
+    def compression(self):
+        return self.codec.name
+
+    def __len__(self):
+        return len(self.codec)
+
+    def search(self, query, k):
+        q = normalize(np.asarray(query).reshape(-1))
+        scores = self.codec.scores(q)
+        if self.exact is None:
+            idxs = top_k_indices(scores, k)
+            return idxs, scores[idxs]
+        # Sorted rows keep reads from a memory-mapped matrix sequential
+        rows = np.sort(top_k_indices(scores, max(k, self.rerank)))
+        exact = normalize(self.exact[rows]) @ q
+        best = top_k_indices(exact, k)
+        return rows[best], exact[best]
+
+    def save(self, path):
+        np.savez(path, backend=self.backend, compression=self.compression, **self.codec.arrays())
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            compression = str(data["compression"]) if "compression" in data else "none"
+            arrays = {name: data[name] for name in CODECS[compression].ARRAYS}
+        return cls.from_arrays(arrays, compression)
+
+    @classmethod
+    def from_arrays(cls, arrays, compression="none", rerank=0, exact=None):
+        index = cls.__new__(cls)
+        index.codec = codec_from_arrays(compression, arrays)
+        index.rerank = rerank
+        index.exact = exact if rerank and compression != "none" else None
+        return index
+
+
+class IVFIndex:
+    """
+    Inverted-file ANN index: vectors are bucketed by their nearest KMeans
+    centroid and a query only scans the `n_probe` closest buckets. Raising
+    `n_probe` trades speed for recall (n_probe == n_lists is exact).
+    """
+
+    backend = "ivf"
+
+    def __init__(self, vectors, n_lists=None, n_probe=8, seed=42):
+        from sklearn.cluster import KMeans
+
+        vectors = normalize(vectors)
+        n_lists = min(n_lists or max(1, int(np.sqrt(len(vectors)))), len(vectors))
+        kmeans = KMeans(n_clusters=n_lists, n_init=1, random_state=seed).fit(vectors)
+
+        order = np.argsort(kmeans.labels_, kind="stable")
+        counts = np.bincount(kmeans.labels_, minlength=n_lists)
+        self.centroids = normalize(kmeans.cluster_centers_)
+        self.ids = order.astype(np.int64)
+        self.vectors = vectors[order]
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self.n_probe = n_probe
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def search(self, query, k, n_probe=None):
+        q = normalize(np.asarray(query).reshape(-1))
+        lists = top_k_indices(self.centroids @ q, n_probe or self.n_probe)
+        rows = np.concatenate([np.arange(self.offsets[i], self.offsets[i + 1]) for i in lists])
+        scores = self.vectors[rows] @ q
+        best = top_k_indices(scores, k)
+        return self.ids[rows[best]], scores[best]
+
+    def save(self, path):
+        np.savez(
+            path,
+            backend=self.backend,
+            centroids=self.centroids,
+            ids=self.ids,
+            vectors=self.vectors,
+            offsets=self.offsets,
+            n_probe=self.n_probe,
+        )
+
+    @classmethod
+    def load(cls, path):
+        index = cls.__new__(cls)
+        with np.load(path) as data:
+            index.centroids = data["centroids"]
+            index.ids = data["ids"]
+            index.vectors = data["vectors"]
+            index.offsets = data["offsets"]
+            index.n_probe = int(data["n_probe"])
+        return index
+
+
+class HNSWIndex:
+    """Graph-based ANN index backed by hnswlib; `ef_search` tunes recall."""
+
+    backend = "hnsw"
+
+    def __init__(self, vectors, m=16, ef_construction=200, ef_search=64):
+        vectors = normalize(vectors)
+        self.index = hnswlib.Index(space="ip", dim=vectors.shape[1])
+        self.index.init_index(max_elements=len(vectors), ef_construction=ef_construction, M=m)
+        self.index.add_items(vectors, np.arange(len(vectors)))
+        self.index.set_ef(ef_search)
+
+    def __len__(self):
+        return self.index.get_current_count()
+
+    def search(self, query, k):
+        q = normalize(np.asarray(query).reshape(1, -1))
+        k = min(k, len(self))
+        labels, distances = self.index.knn_query(q, k=k)
+        # hnswlib's "ip" space returns 1 - dot product
+        return labels[0].astype(np.int64), 1.0 - distances[0]
+
+    def save(self, path):
+        self.index.save_index(path)
+
+    @classmethod
+    def load(cls, path, dim, ef_search=64):
+        index = cls.__new__(cls)
+        index.index = hnswlib.Index(space="ip", dim=dim)
+        index.index.load_index(path)
+        index.index.set_ef(ef_search)
+        return index
+
+
+def index_arrays(index):
+    """The arrays an index is made of ({name: array}), or None for indexes that live inside a library (hnsw)."""
+    if index.backend == "brute":
+        return index.codec.arrays()
+    if index.backend == "ivf":
+        return {"centroids": index.centroids, "ids": index.ids, "vectors": index.vectors, "offsets": index.offsets}
+    return None
+
+
+def index_from_arrays(backend, arrays, **params):
+    """
+    Rebuild an index around existing arrays (e.g. memory-mapped) without
+    copying them. A compressed brute-force index takes its `compression`,
+    `rerank` and the float32 `exact` vectors to re-rank against as params.
+    """
+    if backend == "brute":
+        return BruteForceIndex.from_arrays(
+            arrays, params.get("compression", "none"), params.get("rerank", 0), params.get("exact")
+        )
+    index = IVFIndex.__new__(IVFIndex)
+    for name, array in arrays.items():
+        setattr(index, name, array)
+    if backend == "ivf":
+        index.n_probe = params.get("n_probe", 8)
+    return index
+
+
+def build_index(vectors, backend="brute", **params):
+    """Build a vector index; unknown or unavailable backends fall back sensibly."""
+    if backend == "hnsw" and hnswlib is None:
+        print("⚠️ hnswlib is not installed, falling back to the IVF index.")
+        backend, params = "ivf", {}
+    if backend == "hnsw":
+        return HNSWIndex(vectors, **params)
+    if backend == "ivf" and len(vectors) > 0:
+        return IVFIndex(vectors, **params)
+    return BruteForceIndex(vectors, **(params if backend == "brute" else {}))
+
+
+def load_or_build_index(vectors, name, index_dir, backend="brute", **params):
+    """
+    Return a saved index for `vectors` if one exists and still matches their
+    content, otherwise build it and save it next to the embedding store.
+    Brute force is cheap to rebuild and is never persisted.
+    """
+    if backend == "brute" or len(vectors) == 0:
+        return build_index(vectors, "brute", **(params if backend == "brute" else {}))
+    if backend == "hnsw" and hnswlib is None:
+        print("⚠️ hnswlib is not installed, falling back to the IVF index.")
+        backend, params = "ivf", {}
+
+    os.makedirs(index_dir, exist_ok=True)
+    ext = "bin" if backend == "hnsw" else "npz"
+    prefix = f"{name}-{backend}-"
+    path = os.path.join(index_dir, f"{prefix}{fingerprint(vectors)}.{ext}")
+    if os.path.exists(path):
+        if backend == "hnsw":
+            return HNSWIndex.load(path, dim=vectors.shape[1], ef_search=params.get("ef_search", 64))
+        index = IVFIndex.load(path)
+        index.n_probe = params.get("n_probe", index.n_probe)
+        return index
+
+    print(f"🗂️ Building {backend} index for {name} ({len(vectors)} vectors)...")
+    index = build_index(vectors, backend, **params)
+    index.save(path)
+    # Drop indexes built for older versions of the same vectors
+    for old in os.listdir(index_dir):
+        if old.startswith(prefix) and os.path.join(index_dir, old) != path:
+            os.remove(os.path.join(index_dir, old))
+    return index
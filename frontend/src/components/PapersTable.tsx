@@ -1,4 +1,4 @@
-import React, { useEffect, useState, useMemo } from "react";
+import React, { useEffect, useState } from "react";
 import axios from "axios";
 import {
   Table,
@@ -18,52 +18,64 @@ import {
   SelectValue,
 } from "@/components/ui/select";
 
+const API_URL = "http://127.0.0.1:8000";
+const LIST_FIELDS = "id,Title,Link,date,year,primary_category";
+// Wait for a pause in typing before querying the server
+const SEARCH_DEBOUNCE_MS = 250;
+
 export default function PapersTable() {
   const [papers, setPapers] = useState<any[]>([]);
+  const [total, setTotal] = useState(0);
+  const [categories, setCategories] = useState<string[]>([]);
+  const [details, setDetails] = useState<Record<number, any>>({});
   const [expanded, setExpanded] = useState<Record<number, boolean>>({});
   const [search, setSearch] = useState("");
+  const [debouncedSearch, setDebouncedSearch] = useState("");
   const [categoryFilter, setCategoryFilter] = useState<string | null>(null);
   const [currentPage, setCurrentPage] = useState(1);
   const pageSize = 10;
 
   useEffect(() => {
+    const timer = setTimeout(() => setDebouncedSearch(search), SEARCH_DEBOUNCE_MS);
+    return () => clearTimeout(timer);
+  }, [search]);
+
+  // Filtering and paging happen on the server; only the visible page is fetched.
+  // A newer query aborts the previous request, so a slow stale response can't overwrite it.
+  useEffect(() => {
+    const controller = new AbortController();
     axios
-      .get("http://127.0.0.1:8000/papers")
-      .then((res) => setPapers(res.data));
-  }, []);
+      .get(`${API_URL}/papers`, {
+        params: {
+          offset: (currentPage - 1) * pageSize,
+          limit: pageSize,
+          fields: LIST_FIELDS,
+          q: debouncedSearch || undefined,
+          category: categoryFilter || undefined,
+        },
+        signal: controller.signal,
+      })
+      .then((res) => {
+        setPapers(res.data.items);
+        setTotal(res.data.total);
+        setCategories(res.data.categories);
+      })
+      .catch((err) => {
+        if (!axios.isCancel(err)) console.error(err);
+      });
+    return () => controller.abort();
+  }, [currentPage, debouncedSearch, categoryFilter]);
 
-  const toggleExpand = (index: number) => {
+  const toggleExpand = (index: number, paperId: number) => {
+    if (!expanded[index] && !details[paperId]) {
+      axios
+        .get(`${API_URL}/papers/${paperId}`)
+        .then((res) => setDetails((prev) => ({ ...prev, [paperId]: res.data })));
+    }
     setExpanded((prev) => ({ ...prev, [index]: !prev[index] }));
   };
 
-  const categories = useMemo(() => {
-    const unique = new Set(papers.map((p) => p.primary_category));
-    return Array.from(unique);
-  }, [papers]);
-
-  const filtered = useMemo(() => {
-    let temp = [...papers];
-    if (search) {
-      const s = search.toLowerCase();
-      temp = temp.filter(
-        (p) =>
-          (p.Title && p.Title.toLowerCase().includes(s)) ||
-          (p.abstract && p.abstract.toLowerCase().includes(s)) ||
-          (p.conclusion && p.conclusion.toLowerCase().includes(s))
-      );
-    }
-    if (categoryFilter) {
-      temp = temp.filter((p) => p.primary_category === categoryFilter);
-    }
-    return temp;
-  }, [papers, search, categoryFilter]);
-
-  const paginated = useMemo(() => {
-    const start = (currentPage - 1) * pageSize;
-    return filtered.slice(start, start + pageSize);
-  }, [filtered, currentPage]);
-
-  const totalPages = Math.ceil(filtered.length / pageSize);
+  const totalPages = Math.max(1, Math.ceil(total / pageSize));
 
   return (
     <div className="bg-gray-900 p-4 rounded-xl shadow-lg space-y-4">
@@ -120,7 +132,7 @@ export default function PapersTable() {
             </TableRow>
           </TableHeader>
           <TableBody>
-            {paginated.map((paper, index) => (
+            {papers.map((paper, index) => (
               <React.Fragment key={(currentPage - 1) * pageSize + index}>
                 <TableRow>
                   <TableCell>
@@ -157,7 +169,10 @@ export default function PapersTable() {
                       variant="outline"
                       className="text-black"
                       onClick={() =>
-                        toggleExpand((currentPage - 1) * pageSize + index)
+                        toggleExpand(
+                          (currentPage - 1) * pageSize + index,
+                          paper.id
+                        )
                       }
                     >
                       {expanded[(currentPage - 1) * pageSize + index]
@@ -173,27 +188,32 @@ export default function PapersTable() {
                     <TableCell colSpan={6} className="p-0 bg-gray-800">
                       {/* Scrollable container */}
                       <div className="max-h-80 overflow-y-auto p-4 bg-gray-900">
-                        {paper.abstract && (
+                        {!details[paper.id] && (
+                          <p className="text-gray-400 italic">Loading...</p>
+                        )}
+                        {details[paper.id]?.abstract && (
                           <div className="mb-4">
                             <strong className="text-lg text-white">
                               Abstract:
                             </strong>
                             <p className="text-gray-300 break-words">
-                              {paper.abstract}
+                              {details[paper.id].abstract}
                             </p>
                           </div>
                         )}
-                        {paper.conclusion && (
+                        {details[paper.id]?.conclusion && (
                           <div className="mb-4">
                             <strong className="text-lg text-white">
                               Conclusion:
                             </strong>
                             <p className="text-gray-300 break-words">
-                              {paper.conclusion}
+                              {details[paper.id].conclusion}
                             </p>
                           </div>
                         )}
-                        {!paper.abstract && !paper.conclusion && (
+                        {details[paper.id] &&
+                          !details[paper.id].abstract &&
+                          !details[paper.id].conclusion && (
                           <p className="text-gray-400 italic">
                             No details available
                           </p>